@@ -2,12 +2,80 @@
 """
 Mock Unity Server - Simulates the Unity plugin for testing purposes
 """
-import json
-import socket
-import threading
+import asyncio
+import logging
 import time
+from functools import lru_cache
 from typing import Dict, Any, Callable
 
+try:
+    import numpy as np
+except ImportError:  # numpy is only used to build the position table
+    np = None
+
+from src.unity_integration.protocol import (
+    HEADER_SIZE, CODEC_JSON, CODEC_MSGPACK, DecodeError, RawResponse, decode_payload,
+    encode_envelope_frame, encode_frame, encode_payload, parse_header, tune_socket
+)
+from src.unity_integration.schemas import TYPE_DECODERS
+from src.utils.event_loop import use_uvloop
+
+logger = logging.getLogger(__name__)
+
+# Bind the codec once so the per-message loop skips the module attribute lookup
+_encode_frame = encode_frame
+_decode_payload = decode_payload
+_parse_header = parse_header
+
+# Simulated per-agent x/z offsets, precomputed for the usual range of agent ids.
+# Stored as Python floats so lookups need no conversion before encoding.
+MAX_PRECOMPUTED_AGENTS = 4096
+if np is not None:
+    _AGENT_OFFSETS = (np.arange(MAX_PRECOMPUTED_AGENTS, dtype=np.float64) * 1.5).tolist()
+else:
+    _AGENT_OFFSETS = [i * 1.5 for i in range(MAX_PRECOMPUTED_AGENTS)]
+_AGENT_POSITIONS = [(offset, 0.0, offset) for offset in _AGENT_OFFSETS]
+
+# Static level layout shared by every get_level_data response
+_LEVEL_LAYOUT = {
+    'bounds': {'min': (-100, -10, -100), 'max': (100, 10, 100)},
+    'obstacles': [
+        {'type': 'wall', 'position': (10, 0, 10), 'size': (2, 4, 2)},
+        {'type': 'wall', 'position': (-10, 0, 10), 'size': (2, 4, 2)},
+    ],
+    'collectibles': [
+        {'type': 'health', 'position': (5, 1, 5)},
+        {'type': 'coin', 'position': (-5, 1, -5)},
+    ],
+    'enemies': [
+        {'type': 'guard', 'position': (0, 0, 0), 'patrol_path': [(0,0,0), (5,0,5), (0,0,10)]},
+    ],
+    'checkpoints': [
+        {'name': 'start', 'position': (0, 0, 0)},
+        {'name': 'mid', 'position': (10, 0, 10)},
+    ]
+}
+
+# Level names come from clients, so only the most recently requested bodies are kept
+LEVEL_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=LEVEL_CACHE_SIZE)
+def _encoded_level_data(level_name: str, codec: int) -> bytes:
+    """level_data body for a level in a codec; it never changes, so it is encoded once"""
+    return encode_payload({
+        'level_name': level_name,
+        'level_data': {'level_name': level_name, **_LEVEL_LAYOUT}
+    }, codec)
+
+
+def _agent_position(agent_id) -> tuple:
+    """Simulated position for an agent; each agent gets a slightly different one"""
+    if isinstance(agent_id, int) and 0 <= agent_id < MAX_PRECOMPUTED_AGENTS:
+        return _AGENT_POSITIONS[agent_id]
+    offset = float(agent_id) * 1.5
+    return (offset, 0.0, offset)
+
 
 class MockUnityServer:
     """
@@ -17,119 +85,150 @@ class MockUnityServer:
     def __init__(self, host: str = 'localhost', port: int = 8080):
         self.host = host
         self.port = port
-        self.socket = None
+        self.server = None
+        self.loop = None
+        self._shutdown_event = None  # asyncio.Event owned by the serving loop
         self.is_running = False
-        self.clients = []  # Connected AI system clients
-        
-    def start_server(self):
-        """Start the mock Unity socket server"""
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.bind((self.host, self.port))
-        self.socket.listen(5)
+        # Stream writers of connected AI system clients in connection order; keys of an
+        # insertion-ordered dict so a disconnect removes its writer in O(1)
+        self.clients: Dict[asyncio.StreamWriter, None] = {}
+        self._handler_tasks = set()
         
-        self.is_running = True
-        
-        print(f"Mock Unity Server started on {self.host}:{self.port}")
+        # Response bodies are built once and only their variable fields are
+        # rewritten per request. Responses are encoded before the handler yields
+        # to the event loop, so sharing one instance between clients is safe.
+        self._state = {
+            'position': (0.0, 0.0, 0.0),
+            'health': 100,
+            'in_combat': False,
+            'current_objective': 'explore',
+            'level_progress': 0.2,
+            'time_in_level': 0.0,
+            'is_dead': False,
+            'current_area': "starting_area",
+            'puzzle_active': False,
+            'enemies_nearby': 0,
+            'collectibles_found': 0
+        }
+        self._state_data = {'agent_id': -1, 'state': self._state}
+        self._state_response = {'id': '', 'type': 'state_response', 'data': self._state_data}
         
-        # Start listening for connections
-        server_thread = threading.Thread(target=self._accept_connections, daemon=True)
-        server_thread.start()
+        self._handlers: Dict[str, Callable] = {
+            'action': self._handle_action,
+            'get_state': self._handle_get_state,
+            'get_states': self._handle_get_states,
+            'set_setting': self._handle_set_setting,
+            'get_level_data': self._handle_get_level_data,
+        }
         
-        # Keep the server running
+    def start_server(self):
+        """Start the mock Unity socket server"""
+        use_uvloop()
         try:
-            while self.is_running:
-                time.sleep(1)
+            asyncio.run(self._serve())
         except KeyboardInterrupt:
-            print("\nShutting down Mock Unity Server...")
+            logger.info("Shutting down Mock Unity Server...")
             self.stop_server()
     
+    async def _serve(self):
+        """Serve every AI system client from a single event loop until stopped"""
+        self.loop = asyncio.get_running_loop()
+        self._shutdown_event = asyncio.Event()
+        self.server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, reuse_address=True
+        )
+        self.is_running = True
+        
+        logger.info("Mock Unity Server started on %s:%s", self.host, self.port)
+        
+        # Keep the server running until stop_server signals shutdown
+        async with self.server:
+            await self._shutdown_event.wait()
+            
+            # Closing the transports wakes every handler with EOF so they exit cleanly
+            for writer in list(self.clients):
+                writer.close()
+            await asyncio.gather(*self._handler_tasks, return_exceptions=True)
+    
     def stop_server(self):
         """Stop the socket server"""
         self.is_running = False
-        if self.socket:
-            self.socket.close()
-        print("Mock Unity Server stopped")
+        # stop_server may be called from another thread than the one running the loop
+        if self.server and self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.server.close)
+            self.loop.call_soon_threadsafe(self._shutdown_event.set)
+        logger.info("Mock Unity Server stopped")
     
-    def _accept_connections(self):
-        """Accept incoming connections from AI system"""
-        while self.is_running:
-            try:
-                client_socket, address = self.socket.accept()
-                print(f"New connection from {address}")
-                
-                # Start a thread to handle this client
-                client_thread = threading.Thread(
-                    target=self._handle_client,
-                    args=(client_socket, address),
-                    daemon=True
-                )
-                client_thread.start()
-                
-                self.clients.append(client_socket)
-                
-            except Exception as e:
-                if self.is_running:
-                    print(f"Error accepting connections: {str(e)}")
-    
-    def _handle_client(self, client_socket: socket.socket, address: tuple):
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         """Handle communication with a single AI system client"""
-        while self.is_running:
-            try:
-                data = client_socket.recv(4096)
-                if not data:
+        address = writer.get_extra_info('peername')
+        tune_socket(writer.get_extra_info('socket'))
+        logger.info("New connection from %s", address)
+        self.clients[writer] = None
+        task = asyncio.current_task()
+        self._handler_tasks.add(task)
+        
+        try:
+            while self.is_running:
+                header = await reader.readexactly(HEADER_SIZE)
+                codec, length = _parse_header(header)
+                if codec not in (CODEC_JSON, CODEC_MSGPACK):
+                    logger.warning("Received unframed data from client %s, closing connection", address)
                     break
+                payload = await reader.readexactly(length)
                 
-                message_str = data.decode('utf-8')
-                message = json.loads(message_str)
+                try:
+                    message = _decode_payload(payload, codec)
+                except DecodeError:
+                    logger.warning("Received undecodable message from client %s", address)
+                    continue
                 
-                print(f"Received message: {message}")
-                response = self._process_message(message)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Received message: %s", message)
+                response = self._process_message(message, codec)
                 
                 if response:
-                    response_str = json.dumps(response)
-                    client_socket.send(response_str.encode('utf-8'))
-                    print(f"Sent response: {response}")
+                    # Reply with the codec the client used; cached responses are already frames
+                    if isinstance(response, RawResponse):
+                        writer.write(response)
+                    else:
+                        writer.write(_encode_frame(response, codec))
+                    await writer.drain()
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Sent response: %s", response)
                     
-            except json.JSONDecodeError:
-                print(f"Received invalid JSON from client {address}")
-            except Exception as e:
-                print(f"Error handling client {address}: {str(e)}")
-                break
-        
-        # Remove client when connection is closed
-        if client_socket in self.clients:
-            self.clients.remove(client_socket)
-        client_socket.close()
+        except asyncio.IncompleteReadError:
+            pass  # Client closed the connection
+        except Exception as e:
+            logger.error("Error handling client %s: %s", address, e)
+        finally:
+            # Remove client when connection is closed
+            self.clients.pop(writer, None)
+            self._handler_tasks.discard(task)
+            writer.close()
     
-    def _process_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+    def _process_message(self, message: Dict[str, Any], codec: int = CODEC_JSON) -> Dict[str, Any]:
         """Process a message from the AI system"""
-        msg_id = message.get('id', '')
         msg_type = message.get('type', '')
-        data = message.get('data', {})
         
-        if msg_type == 'action':
-            return self._handle_action(msg_id, data)
-        elif msg_type == 'get_state':
-            return self._handle_get_state(msg_id, data)
-        elif msg_type == 'set_setting':
-            return self._handle_set_setting(msg_id, data)
-        elif msg_type == 'get_level_data':
-            return self._handle_get_level_data(msg_id, data)
+        # Generated decoders unpack the fields each handler needs; handlers get
+        # those fields followed by the request codec
+        decoder = TYPE_DECODERS.get(msg_type)
+        handler = self._handlers.get(msg_type)
+        if decoder is not None and handler is not None:
+            return handler(*decoder(message), codec)
         else:
             return {
-                'id': msg_id,
+                'id': message.get('id', ''),
                 'type': 'error',
                 'data': {'error': f'Unknown message type: {msg_type}'}
             }
     
-    def _handle_action(self, msg_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_action(self, msg_id: str, agent_id: int, action: str, params: Dict[str, Any],
+                       codec: int = CODEC_JSON) -> Dict[str, Any]:
         """Handle an action request from an AI agent"""
-        agent_id = data.get('agent_id', -1)
-        action = data.get('action', '')
-        params = data.get('params', {})
-        
-        print(f"Executing action '{action}' for agent {agent_id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Executing action '%s' for agent %s", action, agent_id)
         
         # Simulate different actions
         if action == 'move_forward':
@@ -153,48 +252,40 @@ class MockUnityServer:
             }
         }
     
-    def _handle_get_state(self, msg_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_get_state(self, msg_id: str, agent_id: int, codec: int = CODEC_JSON) -> Dict[str, Any]:
         """Handle a request for current game state"""
-        agent_id = data.get('agent_id', -1)
+        self._state['position'] = _agent_position(agent_id)
+        self._state['time_in_level'] = time.time()
+        self._state_data['agent_id'] = agent_id
+        self._state_response['id'] = msg_id
         
-        # Return a simulated game state
-        state = {
-            'position': (0.0, 0.0, 0.0),
-            'health': 100,
-            'in_combat': False,
-            'current_objective': 'explore',
-            'level_progress': 0.2,
-            'time_in_level': time.time(),
-            'is_dead': False,
-            'current_area': "starting_area",
-            'puzzle_active': False,
-            'enemies_nearby': 0,
-            'collectibles_found': 0
-        }
-        
-        # Simulate some movement to make the demo more interesting
-        # Each agent gets a slightly different position
-        state['position'] = (
-            float(agent_id) * 1.5,
-            0.0,
-            float(agent_id) * 1.5
-        )
+        return self._state_response
+    
+    def _handle_get_states(self, msg_id: str, agent_ids: list, codec: int = CODEC_JSON) -> Dict[str, Any]:
+        """Handle a batched state request for several agents in one round trip"""
+        now = time.time()
         
         return {
             'id': msg_id,
-            'type': 'state_response',
+            'type': 'states_response',
             'data': {
-                'agent_id': agent_id,
-                'state': state
+                'agent_ids': agent_ids,
+                'states': [self._build_state(agent_id, now) for agent_id in agent_ids]
             }
         }
     
-    def _handle_set_setting(self, msg_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_state(self, agent_id: int, now: float) -> Dict[str, Any]:
+        """Build an independent state dict for one agent of a batched response"""
+        state = dict(self._state)
+        state['position'] = _agent_position(agent_id)
+        state['time_in_level'] = now
+        return state
+    
+    def _handle_set_setting(self, msg_id: str, setting_name: str, value: Any,
+                            codec: int = CODEC_JSON) -> Dict[str, Any]:
         """Handle a request to change a game setting"""
-        setting_name = data.get('setting', '')
-        value = data.get('value', None)
-        
-        print(f"Setting {setting_name} to {value}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Setting %s to %s", setting_name, value)
         
         return {
             'id': msg_id,
@@ -206,45 +297,21 @@ class MockUnityServer:
             }
         }
     
-    def _handle_get_level_data(self, msg_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_get_level_data(self, msg_id: str, level_name: str,
+                               codec: int = CODEC_JSON) -> RawResponse:
         """Handle a request for level-specific data"""
-        level_name = data.get('level_name', 'default_level')
-        
-        level_data = {
-            'level_name': level_name,
-            'bounds': {'min': (-100, -10, -100), 'max': (100, 10, 100)},
-            'obstacles': [
-                {'type': 'wall', 'position': (10, 0, 10), 'size': (2, 4, 2)},
-                {'type': 'wall', 'position': (-10, 0, 10), 'size': (2, 4, 2)},
-            ],
-            'collectibles': [
-                {'type': 'health', 'position': (5, 1, 5)},
-                {'type': 'coin', 'position': (-5, 1, -5)},
-            ],
-            'enemies': [
-                {'type': 'guard', 'position': (0, 0, 0), 'patrol_path': [(0,0,0), (5,0,5), (0,0,10)]},
-            ],
-            'checkpoints': [
-                {'name': 'start', 'position': (0, 0, 0)},
-                {'name': 'mid', 'position': (10, 0, 10)},
-            ]
-        }
-        
-        return {
-            'id': msg_id,
-            'type': 'level_data_response',
-            'data': {
-                'level_name': level_name,
-                'level_data': level_data
-            }
-        }
+        # Only the envelope around the cached body is built per request
+        return encode_envelope_frame(msg_id, 'level_data_response',
+                                     _encoded_level_data(level_name, codec), codec)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     # Start the mock Unity server
     server = MockUnityServer()
     try:
         server.start_server()
     except KeyboardInterrupt:
-        print("\nReceived interrupt signal")
+        logger.info("Received interrupt signal")
         server.stop_server()
\ No newline at end of file
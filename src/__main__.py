@@ -4,10 +4,11 @@ Main entry point for the AI-Driven Playtesting System
 import argparse
 import os
 from src.agents.agent_manager import AgentManager
+from src.agents.process_fleet import run_agent_fleet
 from src.swarm.swarm_orchestrator import SwarmOrchestrator
 from src.analytics.analytics_engine import AnalyticsEngine
 from src.reporting.report_generator import ReportGenerator
-from src.reporting.llm_analyzer import LLMAnalyzer
+from src.reporting.llm_analyzer import LLMAnalyzer, LLM_CACHE_DIR
 
 
 def main():
@@ -15,9 +16,17 @@ def main():
     parser.add_argument("--game-path", required=True, help="Path to the Unity game executable")
     parser.add_argument("--agents", type=int, default=1, help="Number of AI agents to simulate")
     parser.add_argument("--multiplayer", action="store_true", help="Run multiplayer swarm test")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Run each agent in its own process, this many at a time (0 = single process)")
     parser.add_argument("--duration", type=int, default=300, help="Test duration in seconds")
     parser.add_argument("--output", default="./reports", help="Output directory for reports")
+    parser.add_argument("--action-log-dir",
+                        help="Stream every agent's full action log to msgpack files in this directory")
+    parser.add_argument("--pipeline-io", action="store_true",
+                        help="Overlap each agent's Unity round trips with its next decision")
     parser.add_argument("--api-key", help="OpenAI API Key for qualitative analysis")
+    parser.add_argument("--pretty-json", action="store_true",
+                        help="Also write an indented copy of the structured report for debugging")
     
     args = parser.parse_args()
     
@@ -32,14 +41,16 @@ def main():
         # Initialize LLM Analyzer
         llm_analyzer = None
         api_key = args.api_key or os.environ.get("OPENAI_API_KEY")
+        # Cached LLM responses live with the reports rather than in the working directory
+        llm_cache_dir = os.path.join(args.output, LLM_CACHE_DIR)
         
         if api_key:
             print("LLM Analysis: ENABLED (API Key detected)")
-            llm_analyzer = LLMAnalyzer(api_key=api_key)
+            llm_analyzer = LLMAnalyzer(api_key=api_key, cache_dir=llm_cache_dir)
         else:
             # Try to init without explicit key (might pick up from internal config)
             try:
-                analyzer_candidate = LLMAnalyzer()
+                analyzer_candidate = LLMAnalyzer(cache_dir=llm_cache_dir)
                 # Check if it actually found a key in config
                 import openai
                 if openai.api_key:
@@ -50,7 +61,8 @@ def main():
             except Exception:
                  print("LLM Analysis: DISABLED (Initialization failed)")
 
-        report_generator = ReportGenerator(output_dir=args.output, llm_analyzer=llm_analyzer)
+        report_generator = ReportGenerator(output_dir=args.output, llm_analyzer=llm_analyzer,
+                                           pretty_json=args.pretty_json)
         
         if args.multiplayer:
             # Run swarm test
@@ -62,6 +74,17 @@ def main():
                 analytics_engine=analytics_engine
             )
             results = swarm_orchestrator.run_swarm_test()
+        elif args.processes > 0:
+            # Spread independent agents across CPU cores
+            print("Running single-player test across worker processes...")
+            results = run_agent_fleet(
+                game_path=args.game_path,
+                num_agents=args.agents,
+                duration=args.duration,
+                max_workers=args.processes,
+                action_log_dir=args.action_log_dir,
+                pipeline_io=args.pipeline_io
+            )
         else:
             # Run single-player test
             print("Running single-player test...")
@@ -69,7 +92,9 @@ def main():
                 game_path=args.game_path,
                 num_agents=args.agents,
                 duration=args.duration,
-                analytics_engine=analytics_engine
+                analytics_engine=analytics_engine,
+                action_log_dir=args.action_log_dir,
+                pipeline_io=args.pipeline_io
             )
             results = agent_manager.run_playtesting()
         
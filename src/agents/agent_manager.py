@@ -1,12 +1,16 @@
 """
 Agent Manager - Controls the overall agent simulation process
 """
+import asyncio
+import os
 import time
-import threading
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from .base_agent import BaseAgent
 from ..analytics.analytics_engine import AnalyticsEngine
 from ..unity_integration.unity_integration_manager import UnityIntegrationManager
+from ..utils.action_log import action_log_path
+from ..utils.event_loop import Ticker, use_uvloop
 
 
 class AgentManager:
@@ -14,11 +18,16 @@ class AgentManager:
     Manages multiple AI agents running playtesting simulations
     """
     
-    def __init__(self, game_path: str, num_agents: int, duration: int, analytics_engine: AnalyticsEngine):
+    def __init__(self, game_path: str, num_agents: int, duration: int, analytics_engine: AnalyticsEngine,
+                 action_log_dir: Optional[str] = None, pipeline_io: bool = False):
         self.game_path = game_path
         self.num_agents = num_agents
         self.duration = duration  # in seconds
         self.analytics_engine = analytics_engine
+        # When set, every agent also streams its full action log to a file here
+        self.action_log_dir = action_log_dir
+        # Overlap each agent's Unity round trips with its next decision
+        self.pipeline_io = pipeline_io
         self.unity_manager = UnityIntegrationManager(game_path, analytics_engine)
         self.agents: List[BaseAgent] = []
         self.results: List[Dict[str, Any]] = []
@@ -34,6 +43,8 @@ class AgentManager:
             # Import here to avoid circular imports
             from .base_agent import AgentPersonality
             personalities = list(AgentPersonality)
+            if self.action_log_dir:
+                os.makedirs(self.action_log_dir, exist_ok=True)
             
             for i in range(self.num_agents):
                 # Distribute personalities evenly across agents
@@ -44,7 +55,9 @@ class AgentManager:
                     game_path=self.game_path,
                     analytics_engine=self.analytics_engine,
                     unity_manager=self.unity_manager,
-                    personality=personality
+                    personality=personality,
+                    action_log_path=action_log_path(self.action_log_dir, i) if self.action_log_dir else None,
+                    pipeline_io=self.pipeline_io
                 )
                 self.agents.append(agent)
                 
@@ -56,67 +69,90 @@ class AgentManager:
     def run_playtesting(self):
         """Run the playtesting simulation with all agents and real-time monitoring"""
         print(f"Initializing {self.num_agents} agents...")
+        error = None
         try:
             self.initialize_agents()
             self.running = True
             
-            # Start all agents in separate threads
-            threads = []
-            for agent in self.agents:
-                thread = threading.Thread(target=agent.run)
-                thread.daemon = True
-                thread.start()
-                threads.append(thread)
-            
-            # Monitor test with real-time anomaly detection
-            start_time = time.time()
-            check_interval = 5  # Check every 5 seconds
-            
-            while time.time() - start_time < self.duration:
-                time.sleep(check_interval)
-                
-                # Check if test should be stopped early due to anomalies
-                if self.analytics_engine.should_stop_test():
-                    print("Stopping test early: Too many agents are stuck")
-                    break
-                    
-                # Print progress
-                elapsed = time.time() - start_time
-                print(f"Test progress: {elapsed:.0f}/{self.duration}s, "
-                      f"Anomalies detected: {len(self.analytics_engine.anomalies)}")
-            
-            # Stop all agents
-            self.stop_agents()
-            
-            # Wait for all threads to finish with timeout
-            for thread in threads:
-                thread.join(timeout=5)
-                if thread.is_alive():
-                    print(f"Warning: Agent thread did not finish gracefully")
+            # Drive every agent cooperatively from a single event loop
+            use_uvloop()
+            asyncio.run(self._run_async())
         
         except Exception as e:
             print(f"Error during playtesting execution: {str(e)}")
             self.stop_agents()
-            self.results = []
-            for agent in self.agents:
-                try:
-                    self.results.append(agent.get_results())
-                except:
-                    self.results.append({'agent_id': agent.agent_id, 'actions': [], 'errors': [str(e)]})
-            return self.results
+            error = e
         finally:
-            if not hasattr(self, 'results') or not self.results:
-                self.results = []
-                for agent in self.agents:
-                    try:
-                        self.results.append(agent.get_results())
-                    except:
-                        self.results.append({'agent_id': agent.agent_id, 'actions': []})
+            # Collect results exactly once, whether or not the run failed
+            self._collect_results(error)
         
-        # Collect results
-        self.results = [agent.get_results() for agent in self.agents]
         return self.results
     
+    def _collect_results(self, error: Exception = None):
+        """Gather every agent's results, recording a placeholder for agents that fail to report"""
+        self.results = []
+        for agent in self.agents:
+            try:
+                self.results.append(agent.get_results())
+            except Exception:
+                placeholder = {'agent_id': agent.agent_id, 'actions': []}
+                if error is not None:
+                    placeholder['errors'] = [str(error)]
+                self.results.append(placeholder)
+    
+    async def _run_async(self):
+        """Run all agents concurrently until the duration elapses or the monitor stops them"""
+        finished = asyncio.Event()
+        monitor = asyncio.ensure_future(self._monitor(finished))
+        # One timer paces every agent instead of a sleep per agent
+        ticker = Ticker(0.1)
+        ticking = asyncio.ensure_future(ticker.run())
+        # One step thread per agent; the loop's default pool caps out at min(32, cpus + 4)
+        executor = ThreadPoolExecutor(max_workers=max(1, len(self.agents)), thread_name_prefix="agent-step")
+        # An agent that fails must not take the others down with it
+        agents = asyncio.gather(*[agent.run_async(ticker, executor) for agent in self.agents],
+                                return_exceptions=True)
+        try:
+            # Shielded so the timeout stops the agents below instead of cancelling them mid-step
+            await asyncio.wait_for(asyncio.shield(agents), self.duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            finished.set()
+            ticker.stop()
+            await ticking
+            self.stop_agents()
+            # Closing the connection releases any step still waiting on a Unity response
+            self.unity_manager.cleanup()
+            # Every in-flight step finishes before the results are collected
+            await agents
+            executor.shutdown()
+            await monitor
+    
+    async def _monitor(self, finished: asyncio.Event):
+        """Real-time anomaly monitoring while the agents are running"""
+        start_time = time.time()
+        check_interval = 5  # Check every 5 seconds
+        
+        while self.running:
+            # Wake on the check interval, or immediately once the agents are done
+            try:
+                await asyncio.wait_for(finished.wait(), check_interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            
+            # Check if test should be stopped early due to anomalies
+            if self.analytics_engine.should_stop_test():
+                print("Stopping test early: Too many agents are stuck")
+                self.stop_agents()
+                break
+                
+            # Print progress
+            elapsed = time.time() - start_time
+            print(f"Test progress: {elapsed:.0f}/{self.duration}s, "
+                  f"Anomalies detected: {len(self.analytics_engine.anomalies)}")
+    
     def stop_agents(self):
         """Stop all running agents"""
         self.running = False
@@ -1,37 +1,80 @@
 import asyncio
-from typing import List
+from typing import List, Optional
 from .base_agent import BaseAgent
+from ..analytics.realtime_detector import RealtimeDetector
 from ..unity_integration.websocket_client import WebSocketClient
+from ..utils.event_loop import Ticker
 
 class AsyncAgentManager:
-    def __init__(self, agents: List[BaseAgent], game_client: WebSocketClient):
+    def __init__(self, agents: List[BaseAgent], game_client: WebSocketClient, tick_interval: float = 0.1):
         self.agents = agents
         self.game_client = game_client
+        self.tick_interval = tick_interval
+        # One shared clock paces every agent loop
+        self.ticker = Ticker(tick_interval)
         self.running = False
+        self.detector: Optional[RealtimeDetector] = None
+    
+    def set_detector(self, detector: RealtimeDetector):
+        """
+        Check every agent's latest position for soft-locks after each tick; the
+        swarm stops once the detector reports most agents stuck.
+        """
+        self.detector = detector
         
     async def run_agent(self, agent: BaseAgent):
         """Run single agent asynchronously"""
         while self.running:
             try:
-                state = await self.game_client.receive_state()
+                state, = await self.game_client.get_states([agent.agent_id])
                 action = agent.decide_action(state)
                 await self.game_client.send_action(action)
-                await asyncio.sleep(0.1)  # Prevent overwhelming
+                await self.ticker.wait()  # Prevent overwhelming
             except Exception as e:
                 print(f"Agent {agent.id} error: {e}")
                 await asyncio.sleep(1)
     
+    async def run_tick(self):
+        """One swarm tick: one batched state request, then every agent acts on its own state"""
+        states = await self.game_client.get_states([agent.agent_id for agent in self.agents])
+        for agent, state in zip(self.agents, states):
+            await self.game_client.send_action(agent.decide_action(state))
+        if self.detector is not None:
+            self._detect_anomalies(states)
+    
+    def _detect_anomalies(self, states: List[dict]):
+        """Feed each agent's position from its own state to the detector in one batched update"""
+        ids, positions = [], []
+        for agent, state in zip(self.agents, states):
+            position = state.get('player_position')
+            if position is not None:
+                ids.append(agent.agent_id)
+                positions.append(tuple(position))
+        self.detector.update_batch(ids, positions)
+        if self.detector.should_stop_test():
+            print("Most agents are stuck, stopping the swarm")
+            self.running = False
+    
+    async def _run_ticks(self):
+        """Drive all agents on one global tick until stopped"""
+        while self.running:
+            try:
+                await self.run_tick()
+                await self.ticker.wait()
+            except Exception as e:
+                print(f"Swarm tick error: {e}")
+                await asyncio.sleep(1)
+    
     async def run_swarm(self, duration: int):
-        """Run all agents concurrently"""
+        """Run all agents on a shared tick for the specified duration"""
         self.running = True
+        ticker = asyncio.ensure_future(self.ticker.run())
         
-        # Start all agents
-        tasks = [self.run_agent(agent) for agent in self.agents]
-        
-        # Run for specified duration
         try:
-            await asyncio.wait_for(asyncio.gather(*tasks), timeout=duration)
+            await asyncio.wait_for(self._run_ticks(), timeout=duration)
         except asyncio.TimeoutError:
             pass
         finally:
             self.running = False
+            self.ticker.stop()
+            await ticker
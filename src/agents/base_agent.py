@@ -1,13 +1,164 @@
 """
 Base Agent - The fundamental AI agent that interacts with the game
 """
+import asyncio
+import threading
 import time
-import random
+from concurrent.futures import ThreadPoolExecutor
+import re
+from collections import deque
 from enum import Enum
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 from ..utils.game_state import GameState
+from ..utils.action_log import ActionLogWriter
 from ..analytics.analytics_engine import AnalyticsEngine
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional, the selection kernel then runs as plain Python
+    njit = None
+
+
+# Actions available in each behavioral context, built once. Every context extends
+# the base actions; idle and unknown contexts use the base actions alone.
+_BASE_ACTIONS = ('move_forward', 'move_backward', 'jump', 'crouch', 'interact', 'look_around')
+_ACTIONS_BY_CONTEXT = {
+    'combat': _BASE_ACTIONS + ('attack', 'defend', 'dodge', 'move_forward', 'move_backward'),
+    'puzzle': _BASE_ACTIONS + ('interact', 'examine', 'think', 'look_around'),
+    # Maybe interact with health items
+    'critical_health': _BASE_ACTIONS + ('defend', 'move_backward', 'crouch', 'interact'),
+    'stuck': _BASE_ACTIONS + ('jump', 'move_backward', 'crouch', 'look_around'),
+    # Take a break, look for alternatives
+    'frustrated': _BASE_ACTIONS + ('think', 'look_around', 'interact', 'crouch'),
+    'exploring': _BASE_ACTIONS + ('move_forward', 'look_around', 'interact', 'jump'),
+    # Push toward objective
+    'goal_oriented': _BASE_ACTIONS + ('move_forward', 'interact', 'attack'),
+}
+
+# Action groups used by the selection strategy
+_DEFENSIVE = frozenset({'defend', 'dodge', 'move_backward'})
+_AGGRESSIVE = frozenset({'attack', 'move_forward'})
+_EXPLORATION = frozenset({'move_forward', 'look_around', 'interact'})
+_CAUTIOUS_BAN = frozenset({'attack', 'move_forward', 'jump'})
+
+# Actions logged as engagement events
+_HIGH_ENGAGEMENT = frozenset({'attack', 'jump', 'dodge'})
+_PROGRESSION = frozenset({'move_forward', 'explore'})
+
+# Integer action ids for the selection kernel; an action group is a bitmask of ids
+ACTION_NAMES = tuple(sorted({a for actions in _ACTIONS_BY_CONTEXT.values() for a in actions}))
+ACTION_IDS = {name: i for i, name in enumerate(ACTION_NAMES)}
+
+
+def _action_mask(actions) -> int:
+    mask = 0
+    for action in actions:
+        mask |= 1 << ACTION_IDS[action]
+    return mask
+
+
+_DEFENSIVE_MASK = _action_mask(_DEFENSIVE)
+_AGGRESSIVE_MASK = _action_mask(_AGGRESSIVE)
+_EXPLORATION_MASK = _action_mask(_EXPLORATION)
+_CAUTIOUS_BAN_MASK = _action_mask(_CAUTIOUS_BAN)
+
+# Per context: (actions, kernel strategy, candidate ids with repeats kept as weights, candidate mask)
+_STRATEGY_DEFAULT, _STRATEGY_CAUTIOUS, _STRATEGY_COMBAT = 0, 1, 2
+_STRATEGY_BY_CONTEXT = {'critical_health': _STRATEGY_CAUTIOUS, 'frustrated': _STRATEGY_CAUTIOUS,
+                        'combat': _STRATEGY_COMBAT}
+
+
+def _kernel_args(context: str, actions: tuple) -> tuple:
+    ids = tuple(ACTION_IDS[a] for a in actions)
+    return actions, _STRATEGY_BY_CONTEXT.get(context, _STRATEGY_DEFAULT), ids, _action_mask(actions)
+
+
+_KERNEL_ARGS_BY_CONTEXT = {context: _kernel_args(context, actions)
+                           for context, actions in _ACTIONS_BY_CONTEXT.items()}
+_KERNEL_ARGS_BASE = _kernel_args('', _BASE_ACTIONS)
+
+
+def _choose_from_mask(mask, r):
+    """Uniformly pick one of the ids set in mask, using the uniform draw r"""
+    count = 0
+    m = mask
+    while m:
+        m &= m - 1
+        count += 1
+    k = int(r * count)
+    i = 0
+    while True:
+        if mask & 1:
+            if k == 0:
+                return i
+            k -= 1
+        mask >>= 1
+        i += 1
+
+
+def _pick_action(strategy, possible_ids, possible_mask, caution, exploration, health,
+                 r_gate, r_explore, r_explore_gate, r_pick):
+    """
+    Per-tick action selection on integer ids and bitmasks. Mirrors the
+    string-based strategy: group choices are uniform over distinct actions,
+    the fallback is weighted by how often an action appears in the context.
+    The caller supplies the uniform draws, one per decision point, so the
+    kernel itself holds no random state.
+    """
+    if strategy == 1:
+        # In critical situations, be more cautious
+        if r_gate < caution:
+            cautious = possible_mask & ~_CAUTIOUS_BAN_MASK
+            if cautious:
+                return _choose_from_mask(cautious, r_pick)
+    elif strategy == 2:
+        # In combat, balance aggression with defense based on health
+        if health < 50:
+            defensive = possible_mask & _DEFENSIVE_MASK
+            if defensive and r_gate < 0.7:  # 70% chance of defensive action
+                return _choose_from_mask(defensive, r_pick)
+        else:
+            aggressive = possible_mask & _AGGRESSIVE_MASK
+            if aggressive and r_gate < 0.6:  # 60% chance of aggressive action
+                return _choose_from_mask(aggressive, r_pick)
+    
+    if r_explore < exploration:
+        exploration_favorable = possible_mask & _EXPLORATION_MASK
+        if exploration_favorable and r_explore_gate < 0.7:
+            return _choose_from_mask(exploration_favorable, r_pick)
+    
+    # Default: random selection from possible actions
+    return possible_ids[int(r_pick * len(possible_ids))]
+
+
+if njit is not None:
+    # Compiled on first use and cached on disk so later runs skip the compile
+    _choose_from_mask = njit(cache=True)(_choose_from_mask)
+    _pick_action = njit(cache=True)(_pick_action)
+
+# Candidate actions of the randomized objective handlers
+_EXPLORE_OBJECTIVE_ACTIONS = ('move_forward', 'look_around', 'interact')
+_SOLVE_OBJECTIVE_ACTIONS = ('interact', 'examine', 'think')
+
+# Objective keyword categories in priority order, each mapped to its BaseAgent handler
+_OBJECTIVE_PATTERNS = (
+    (re.compile(r'defeat|kill|eliminate|attack', re.IGNORECASE), '_pursue_defeat'),
+    (re.compile(r'explore|find|locate|discover', re.IGNORECASE), '_pursue_explore'),
+    (re.compile(r'collect|gather|pickup|obtain', re.IGNORECASE), '_pursue_collect'),
+    (re.compile(r'reach|go_to|travel|get_to', re.IGNORECASE), '_pursue_reach'),
+    (re.compile(r'solve|complete|finish|puzzle', re.IGNORECASE), '_pursue_solve'),
+)
+
+# Upper bound on the per-agent action log (about 2.7 hours at 10 ticks/sec)
+MAX_LOGGED_ACTIONS = 100000
+
+# Buffered engagement events per analytics call (about 3 seconds of ticks)
+LOG_FLUSH_EVERY = 32
+
+# Uniform draws generated per refill of an agent's random buffer
+RANDOM_BUFFER_SIZE = 4096
+
 
 class AgentPersonality(Enum):
     CAUTIOUS = "cautious"
@@ -16,19 +167,51 @@ class AgentPersonality(Enum):
     SPEEDRUNNER = "speedrunner"
 
 
+# Small-int id of each personality, cached on the agent in place of enum comparisons
+PERSONA_ID = {personality: i for i, personality in enumerate(AgentPersonality)}
+
+# (exploration_bias, caution_level, focus_duration) by persona id; RANDOM draws its own
+_PERSONA_TRAITS = tuple(
+    {
+        AgentPersonality.CAUTIOUS: (0.3, 0.9, 10),
+        AgentPersonality.AGGRESSIVE: (0.8, 0.2, 3),
+        AgentPersonality.RANDOM: None,
+        AgentPersonality.SPEEDRUNNER: (0.1, 0.3, 2),
+    }[personality]
+    for personality in AgentPersonality
+)
+
+
 class BaseAgent:
     """
     Base AI agent that simulates player behavior in games
     """
     
     def __init__(self, agent_id: int, game_path: str, analytics_engine: AnalyticsEngine, 
-                 unity_manager=None, personality: AgentPersonality = None):
+                 unity_manager=None, personality: AgentPersonality = None,
+                 action_log_path: Optional[str] = None, pipeline_io: bool = False):
         self.agent_id = agent_id
         self.game_path = game_path
         self.analytics_engine = analytics_engine
         self.unity_manager = unity_manager
         self.game_state = GameState()
         self.is_running = False
+        self.tick_period = 0.1  # Seconds between decisions, simulates realistic input timing
+        # Set by stop() so a threaded run() wakes from its input delay immediately
+        self._stop_event = threading.Event()
+        # Overlap the Unity round trips with the next decision (see _exchange_pipelined);
+        # actions are then decided on state that is one tick old
+        self.pipeline_io = pipeline_io
+        self._io: Optional[ThreadPoolExecutor] = None
+        self._pending_io = None
+        # Engagement events are buffered and handed to the analytics engine in batches
+        self._log_buffer: List[tuple] = []
+        self._log_flush_every = LOG_FLUSH_EVERY
+        # Per-agent generator seeded by agent_id so runs are reproducible; draws are
+        # made in blocks and kept as Python floats for cheap indexing
+        self._rng = np.random.default_rng(agent_id)
+        self._rand_buf = self._rng.random(RANDOM_BUFFER_SIZE).tolist()
+        self._rand_i = 0
         
         # Assign personality if not provided
         if personality is None:
@@ -40,111 +223,245 @@ class BaseAgent:
         # Adjust behavior parameters based on personality
         self._set_personality_traits()
         
-        self.results: Dict[str, Any] = {
-            'agent_id': agent_id,
-            'personality': self.personality.value,
-            'actions': [],
-            'time_spent': 0,
-            'retries': 0,
-            'deaths': 0,
-            'level_progress': 0,
-            'issues_detected': [],
-            'engagement_metrics': {}
-        }
+        # Session results live in plain attributes on the hot path and are
+        # assembled into the results dict on request
+        # Ring buffer of action records; once full, the oldest record is recycled
+        self._actions_log = deque(maxlen=MAX_LOGGED_ACTIONS)
+        # Optional on-disk copy of every record, for sessions longer than the ring buffer
+        self._action_log_writer = ActionLogWriter(action_log_path) if action_log_path else None
+        self._time_spent = 0
+        self._retries = 0
+        self._deaths = 0
+        self._level_progress = 0
+        self._issues = []
+        self._engagement_metrics = {}
+        # Last objective seen by pursue_objective and the handler it maps to
+        self._objective = None
+        self._objective_handler = None
         
     def _set_personality_traits(self):
         """Set behavior parameters based on agent personality"""
-        if self.personality == AgentPersonality.CAUTIOUS:
-            self.exploration_bias = 0.3
-            self.caution_level = 0.9
-            self.focus_duration = 10
-        elif self.personality == AgentPersonality.AGGRESSIVE:
-            self.exploration_bias = 0.8
-            self.caution_level = 0.2
-            self.focus_duration = 3
-        elif self.personality == AgentPersonality.RANDOM:
-            self.exploration_bias = random.uniform(0.1, 0.9)
-            self.caution_level = random.uniform(0.1, 0.9)
-            self.focus_duration = random.randint(1, 8)
-        elif self.personality == AgentPersonality.SPEEDRUNNER:
-            self.exploration_bias = 0.1
-            self.caution_level = 0.3
-            self.focus_duration = 2
+        self._persona_id = PERSONA_ID[self.personality]
+        traits = _PERSONA_TRAITS[self._persona_id]
+        if traits is None:
+            self.exploration_bias = self._rng.uniform(0.1, 0.9)
+            self.caution_level = self._rng.uniform(0.1, 0.9)
+            self.focus_duration = int(self._rng.integers(1, 9))
+        else:
+            self.exploration_bias, self.caution_level, self.focus_duration = traits
         
     def run(self):
         """Main execution loop for the agent"""
         self.is_running = True
-        start_time = time.time()
-        # Cache start_time to avoid repeated function calls
-        session_start_time = start_time
+        self._stop_event.clear()
+        # Monotonic clock so wall-clock adjustments cannot stretch or skip ticks
+        session_start_time = time.monotonic()
+        period = self.tick_period
+        ticks = 0
         
         print(f"Agent {self.agent_id} starting playtesting...")
         
         try:
             while self.is_running:
-                try:
-                    # Update game state from Unity
-                    self.update_game_state()
-                    
-                    # Decide next action based on game state
-                    action = self.decide_action()
-                    
-                    # Execute action in the game
-                    self.execute_action(action)
-                    
-                    # Cache current time to avoid multiple calls
-                    current_time = time.time()
-                    
-                    # Log the action - using more efficient data structure
-                    self.results['actions'].append((
-                        current_time - session_start_time,  # timestamp
-                        action,
-                        self.game_state.to_dict()
-                    ))
-                    
-                    # Check for anomalies and issues
-                    self.detect_anomalies()
-                    
-                except Exception as e:
-                    print(f"Error in agent {self.agent_id} during execution: {str(e)}")
-                    # Add error to results for reporting
-                    current_time = time.time()
-                    error_record = (
-                        current_time - session_start_time,  # timestamp
-                        str(e),
-                        self.game_state.to_dict()
-                    )
-                    self.results['actions'].append(error_record)
+                self._step(session_start_time)
                 
-                # Small delay to simulate realistic input timing
-                time.sleep(0.1)
+                # Sleep until the next tick deadline rather than a fixed delay, so the
+                # time spent in the step does not add up as drift
+                ticks += 1
+                delay = session_start_time + ticks * period - time.monotonic()
+                if delay > 0:
+                    if self._stop_event.wait(delay):
+                        break
+                elif delay < -period:
+                    # Fell behind by more than a tick: drop the missed ticks instead of bursting
+                    ticks = int((time.monotonic() - session_start_time) / period)
         except KeyboardInterrupt:
             print(f"Agent {self.agent_id} interrupted by user")
         except Exception as e:
             print(f"Critical error in agent {self.agent_id}: {str(e)}")
         finally:
-            self.results['time_spent'] = time.time() - session_start_time
+            self._drain_io()
+            self._time_spent = time.monotonic() - session_start_time
+            self._flush_logs()
+            if self._action_log_writer is not None:
+                self._action_log_writer.close()
             print(f"Agent {self.agent_id} finished playtesting")
     
-    def update_game_state(self):
-        """Update the agent's understanding of the current game state"""
+    async def run_async(self, ticker=None, executor=None):
+        """
+        Cooperative variant of run() for driving many agents from one event loop.
+        The blocking Unity round trip of each step runs on the given executor,
+        or on the loop's default thread pool. The input delay waits for the
+        shared ticker when one is given, otherwise it is an asyncio sleep.
+        """
+        self.is_running = True
+        session_start_time = time.monotonic()
+        period = self.tick_period
+        ticks = 0
+        loop = asyncio.get_running_loop()
+        
+        print(f"Agent {self.agent_id} starting playtesting...")
+        
         try:
-            if self.unity_manager:
-                # Get the actual game state from Unity
-                unity_state = self.unity_manager.get_game_state(self.agent_id)
-                self.game_state.update_from_unity(unity_state)
+            while self.is_running:
+                await loop.run_in_executor(executor, self._step, session_start_time)
+                
+                # Small delay to simulate realistic input timing
+                if ticker is not None:
+                    await ticker.wait()
+                else:
+                    ticks += 1
+                    delay = session_start_time + ticks * period - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    elif delay < -period:
+                        ticks = int((time.monotonic() - session_start_time) / period)
+        except asyncio.CancelledError:
+            self.is_running = False
+            raise
+        except Exception as e:
+            print(f"Critical error in agent {self.agent_id}: {str(e)}")
+        finally:
+            self._drain_io()
+            self._time_spent = time.monotonic() - session_start_time
+            self._flush_logs()
+            if self._action_log_writer is not None:
+                self._action_log_writer.close()
+            print(f"Agent {self.agent_id} finished playtesting")
+    
+    def _step(self, session_start_time: float):
+        """Run a single observe/decide/act iteration and record it"""
+        # Read the clocks once per tick: wall time for analytics events, and
+        # monotonic time (like session_start_time) for the action log
+        now = time.time()
+        current_time = time.monotonic()
+        try:
+            if self.pipeline_io and self.unity_manager:
+                action = self._exchange_pipelined(now)
             else:
-                # Fallback to simulation if Unity is not available
-                self.game_state.update_from_game()
+                # Update game state from Unity
+                ok, error = self.update_game_state(now)
+                if not ok:
+                    print(f"Error updating game state for agent {self.agent_id}: {error}")
+                
+                # Decide next action based on game state
+                action = self.decide_action()
+                
+                # Execute action in the game
+                ok, error = self.execute_action(action, now)
+                if not ok:
+                    self._on_action_failed(action, error)
+            
+            self._log_action(action, current_time - session_start_time)
+            
+            # Check for anomalies and issues
+            self.detect_anomalies(now)
+            
         except Exception as e:
-            print(f"Error updating game state for agent {self.agent_id}: {str(e)}")
-            # Still update time to prevent issues
-            import time
-            self.game_state.time_in_level = time.time()
-            # Add to tracking list to prevent stuck detection issues
-            self.game_state.previous_positions.append(self.game_state.position)
-            if len(self.game_state.previous_positions) > self.game_state.max_stuck_positions:
-                self.game_state.previous_positions.pop(0)
+            print(f"Error in agent {self.agent_id} during execution: {str(e)}")
+            # Add error to results for reporting
+            record = {
+                'timestamp': current_time - session_start_time,
+                'error': str(e),
+                'game_state': self.game_state.snapshot(),
+                'is_error': True
+            }
+            self._actions_log.append(record)
+            if self._action_log_writer is not None:
+                self._action_log_writer.write(record['timestamp'], None, record['game_state'].as_tuple(),
+                                              record['error'])
+    
+    def _log_action(self, action: str, timestamp: float):
+        """
+        Log the action with a tuple-backed state snapshot that only becomes a
+        dict if it is read. Records are never modified once logged, since
+        results handed out earlier share them.
+        """
+        record = {
+            'timestamp': timestamp,
+            'action': action,
+            'game_state': self.game_state.snapshot(),
+            'is_error': False
+        }
+        self._actions_log.append(record)
+        if self._action_log_writer is not None:
+            self._action_log_writer.write(timestamp, action, record['game_state'].as_tuple())
+    
+    def _exchange_pipelined(self, now: float) -> str:
+        """
+        Double-buffered variant of the update/decide/execute sequence. The action
+        is decided on the state fetched in the background during the previous
+        tick; then this tick's action send and next-state fetch are queued on the
+        agent's I/O thread and overlap with logging and the tick delay. An action's
+        effects are recorded once its send result is consumed, on the next tick.
+        """
+        if self._pending_io is None:
+            # Nothing prefetched yet, so the first tick fetches inline
+            ok, error = self.update_game_state(now)
+        else:
+            state_future, send_future, sent_action, sent_at = self._pending_io
+            self._finish_send(send_future, sent_action, sent_at)
+            try:
+                self.game_state.update_from_unity(state_future.result())
+                ok, error = True, None
+            except Exception as e:
+                ok, error = self._state_update_failed(e, now)
+        if not ok:
+            print(f"Error updating game state for agent {self.agent_id}: {error}")
+        
+        action = self.decide_action()
+        
+        if self._io is None:
+            self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"agent-{self.agent_id}-io")
+        # One I/O thread keeps the order: the action is sent before the next state is read
+        send_future = self._io.submit(self._send_action, action)
+        state_future = self._io.submit(self.unity_manager.get_game_state, self.agent_id)
+        self._pending_io = (state_future, send_future, action, now)
+        return action
+    
+    def _finish_send(self, send_future, action: str, now: float):
+        """Consume a pipelined send: report a failure, or record the action's effects like execute_action"""
+        ok, error = send_future.result()
+        if ok:
+            self._record_action_effects(action, now)
+        else:
+            self._on_action_failed(action, error)
+    
+    def _drain_io(self):
+        """Wait for the last pipelined exchange and stop the agent's I/O thread"""
+        if self._pending_io is not None:
+            _, send_future, sent_action, sent_at = self._pending_io
+            self._pending_io = None
+            self._finish_send(send_future, sent_action, sent_at)
+        if self._io is not None:
+            self._io.shutdown(wait=True)
+            self._io = None
+    
+    def update_game_state(self, now: float = None) -> Tuple[bool, Optional[str]]:
+        """
+        Update the agent's understanding of the current game state.
+        Returns (ok, error); only the Unity round trip is guarded.
+        """
+        if not self.unity_manager:
+            # Fallback to simulation if Unity is not available
+            self.game_state.update_from_game()
+            return True, None
+        
+        try:
+            # Get the actual game state from Unity
+            unity_state = self.unity_manager.get_game_state(self.agent_id)
+            self.game_state.update_from_unity(unity_state)
+        except Exception as e:
+            return self._state_update_failed(e, now)
+        return True, None
+    
+    def _state_update_failed(self, error: Exception, now: float = None) -> Tuple[bool, Optional[str]]:
+        """Keep the local state moving when Unity could not provide one"""
+        # Still update time to prevent issues
+        self.game_state.time_in_level = time.time() if now is None else now
+        # Add to tracking list to prevent stuck detection issues
+        self.game_state.previous_positions.append(self.game_state.position)
+        return False, str(error)
     
     def decide_action(self) -> str:
         """Decide what action to take based on current game state"""
@@ -159,71 +476,33 @@ class BaseAgent:
         
         return action
     
-    def _get_actions_for_context(self, context: str) -> list:
+    def _get_actions_for_context(self, context: str) -> tuple:
         """Get appropriate actions for the current behavioral context"""
-        base_actions = [
-            'move_forward', 'move_backward', 'jump', 'crouch', 
-            'interact', 'look_around'
-        ]
-        
-        if context == "combat":
-            combat_actions = ['attack', 'defend', 'dodge', 'move_forward', 'move_backward']
-            return base_actions + combat_actions
-        elif context == "puzzle":
-            puzzle_actions = ['interact', 'examine', 'think', 'look_around']
-            return base_actions + puzzle_actions
-        elif context == "critical_health":
-            survival_actions = ['defend', 'move_backward', 'crouch', 'interact']  # Maybe interact with health items
-            return base_actions + survival_actions
-        elif context == "stuck":
-            navigation_actions = ['jump', 'move_backward', 'crouch', 'look_around']
-            return base_actions + navigation_actions
-        elif context == "frustrated":
-            patience_actions = ['think', 'look_around', 'interact', 'crouch']  # Take a break, look for alternatives
-            return base_actions + patience_actions
-        elif context == "exploring":
-            exploration_actions = ['move_forward', 'look_around', 'interact', 'jump']
-            return base_actions + exploration_actions
-        elif context == "goal_oriented":
-            goal_actions = ['move_forward', 'interact', 'attack']  # Push toward objective
-            return base_actions + goal_actions
-        else:
-            # Default actions for idle or other states
-            return base_actions
+        # Prebuilt at import; callers only read the tuple
+        return _ACTIONS_BY_CONTEXT.get(context, _BASE_ACTIONS)
     
-    def _select_action_with_strategy(self, possible_actions: list, context: str) -> str:
+    def _rand(self) -> float:
+        """Next uniform draw in [0, 1) from this agent's buffer, refilled when used up"""
+        i = self._rand_i
+        if i == RANDOM_BUFFER_SIZE:
+            self._rand_buf = self._rng.random(RANDOM_BUFFER_SIZE).tolist()
+            i = 0
+        self._rand_i = i + 1
+        return self._rand_buf[i]
+    
+    def _select_action_with_strategy(self, possible_actions, context: str) -> str:
         """Select an action using different strategies based on context and parameters"""
-        # Adjust strategy based on the agent's caution level and other factors
-        if context == "critical_health" or context == "frustrated":
-            # In critical situations, be more cautious
-            if random.random() < self.caution_level:
-                cautious_actions = [action for action in possible_actions if 'aggressive' not in action]
-                cautious_actions = [a for a in cautious_actions if a not in ['attack', 'move_forward', 'jump']]
-                if cautious_actions:
-                    return random.choice(cautious_actions)
-        
-        elif context == "combat":
-            # In combat, balance aggression with defense based on health
-            if self.game_state.health < 50:  # If health is low
-                defensive_actions = [a for a in possible_actions if a in ['defend', 'dodge', 'move_backward']]
-                if defensive_actions and random.random() < 0.7:  # 70% chance of defensive action
-                    return random.choice(defensive_actions)
-            else:
-                aggressive_actions = [a for a in possible_actions if a in ['attack', 'move_forward']]
-                if aggressive_actions and random.random() < 0.6:  # 60% chance of aggressive action
-                    return random.choice(aggressive_actions)
-        
-        # Add more sophisticated selection based on exploration bias
-        if random.random() < self.exploration_bias:
-            # Exploration-focused selection
-            exploration_favorable = [a for a in possible_actions if a in ['move_forward', 'look_around', 'interact']]
-            if exploration_favorable:
-                # Higher chance of exploration actions when in exploration mode
-                if random.random() < 0.7:
-                    return random.choice(exploration_favorable)
-        
-        # Default: random selection from possible actions
-        return random.choice(possible_actions)
+        kernel_args = _KERNEL_ARGS_BY_CONTEXT.get(context, _KERNEL_ARGS_BASE)
+        if kernel_args[0] is not possible_actions:
+            # Candidates that are not the prebuilt ones for this context
+            kernel_args = _kernel_args(context, tuple(possible_actions))
+        _, strategy, ids, mask = kernel_args
+        # One kernel call per tick; only the chosen id is mapped back to a name
+        rand = self._rand
+        action_id = _pick_action(strategy, ids, mask, self.caution_level,
+                                 self.exploration_bias, self.game_state.health,
+                                 rand(), rand(), rand(), rand())
+        return ACTION_NAMES[action_id]
     
     def pursue_objective(self) -> str:
         """Determine action based on current game objective"""
@@ -233,128 +512,169 @@ class BaseAgent:
             # If somehow called without an objective, explore
             return 'move_forward'
         
-        # Map objectives to actions - this would be expanded based on specific games
-        objective_lower = objective.lower()
+        # Objectives rarely change between ticks, so the category is only
+        # classified again when the objective text changes
+        if objective != self._objective:
+            self._objective = objective
+            self._objective_handler = self._classify_objective(objective)
         
-        if any(keyword in objective_lower for keyword in ['defeat', 'kill', 'eliminate', 'attack']):
-            if self.game_state.in_combat:
-                return 'attack' if random.random() < 0.7 else 'defend'
-            else:
-                return 'move_forward'  # Move toward enemies
-        elif any(keyword in objective_lower for keyword in ['explore', 'find', 'locate', 'discover']):
-            # For exploration objectives, more random movement
-            exploration_actions = ['move_forward', 'look_around', 'interact']
-            return random.choice(exploration_actions)
-        elif any(keyword in objective_lower for keyword in ['collect', 'gather', 'pickup', 'obtain']):
-            # For collection objectives, focus on interaction
-            if 'interact' in self._get_actions_for_context('goal_oriented'):
-                return 'interact'
-            else:
-                return 'move_forward'
-        elif any(keyword in objective_lower for keyword in ['reach', 'go_to', 'travel', 'get_to']):
-            # For destination objectives, focus on movement
-            return 'move_forward'
-        elif any(keyword in objective_lower for keyword in ['solve', 'complete', 'finish', 'puzzle']):
-            # For puzzle objectives
-            if self.game_state.puzzle_active:
-                puzzle_actions = ['interact', 'examine', 'think']
-                return random.choice(puzzle_actions)
-            else:
-                return 'move_forward'  # Move toward puzzle if not in one
-        else:
+        if self._objective_handler is None:
             # Default for unrecognized objectives
             return 'move_forward'
+        return self._objective_handler()
+    
+    def _classify_objective(self, objective: str):
+        """Handler for the objective's category, or None if it matches none"""
+        # Map objectives to actions - this would be expanded based on specific games.
+        # Categories are tried in priority order; the first that matches decides.
+        for pattern, handler_name in _OBJECTIVE_PATTERNS:
+            if pattern.search(objective):
+                return getattr(self, handler_name)
+        return None
+    
+    def _pursue_defeat(self) -> str:
+        """Fight when in combat, otherwise move toward enemies"""
+        if self.game_state.in_combat:
+            return 'attack' if self._rand() < 0.7 else 'defend'
+        return 'move_forward'
+    
+    def _pursue_explore(self) -> str:
+        """For exploration objectives, more random movement"""
+        return _EXPLORE_OBJECTIVE_ACTIONS[int(self._rand() * 3)]
     
-    def execute_action(self, action: str):
-        """Execute the decided action in the game"""
+    def _pursue_collect(self) -> str:
+        """For collection objectives, focus on interaction"""
+        if 'interact' in self._get_actions_for_context('goal_oriented'):
+            return 'interact'
+        return 'move_forward'
+    
+    def _pursue_reach(self) -> str:
+        """For destination objectives, focus on movement"""
+        return 'move_forward'
+    
+    def _pursue_solve(self) -> str:
+        """For puzzle objectives, work the puzzle or move toward it"""
+        if self.game_state.puzzle_active:
+            return _SOLVE_OBJECTIVE_ACTIONS[int(self._rand() * 3)]
+        return 'move_forward'  # Move toward puzzle if not in one
+    
+    def execute_action(self, action: str, now: float = None) -> Tuple[bool, Optional[str]]:
+        """
+        Execute the decided action in the game.
+        Returns (ok, error); only the Unity round trip is guarded.
+        """
+        if self.unity_manager:
+            ok, error = self._send_action(action)
+            if not ok:
+                return ok, error
+        else:
+            # Fallback to simulation if Unity is not available
+            print(f"Unity not connected, simulating action: {action}")
+        
+        self._record_action_effects(action, now)
+        return True, None
+    
+    def _send_action(self, action: str) -> Tuple[bool, Optional[str]]:
+        """Send the action to Unity for execution; the Unity round trip is the only guarded call"""
         try:
-            if self.unity_manager:
-                # Send the action to Unity for execution
-                success = self.unity_manager.send_action_to_unity(self.agent_id, action)
-                if not success:
-                    print(f"Failed to execute action {action} for agent {self.agent_id}")
-            else:
-                # Fallback to simulation if Unity is not available
-                print(f"Unity not connected, simulating action: {action}")
-            
-            # Log engagement metrics based on action
-            if action in ['attack', 'jump', 'dodge']:
-                self.analytics_engine.log_high_engagement(self.agent_id, action)
-            elif action in ['move_forward', 'explore']:
-                self.analytics_engine.log_progression(self.agent_id, action)
-            
-            # Update internal state based on action
-            self.handle_action_effects(action)
+            success = self.unity_manager.send_action_to_unity(self.agent_id, action)
         except Exception as e:
-            print(f"Error executing action {action} for agent {self.agent_id}: {str(e)}")
-            # Still log the action to maintain consistency
-            try:
-                self.analytics_engine.log_agent_action(self.agent_id, action, self.game_state.to_dict())
-            except:
-                pass  # If logging fails, continue anyway
+            return False, str(e)
+        if not success:
+            print(f"Failed to execute action {action} for agent {self.agent_id}")
+        return True, None
+    
+    def _on_action_failed(self, action: str, error: str):
+        """Report an action Unity did not accept"""
+        print(f"Error executing action {action} for agent {self.agent_id}: {error}")
+        # Still log the action to maintain consistency
+        self.analytics_engine.log_agent_action(self.agent_id, action, self.game_state.snapshot())
+    
+    def _record_action_effects(self, action: str, now: float = None):
+        """Local bookkeeping for an action: engagement events and its effects on the results"""
+        if now is None:
+            now = time.time()
+        
+        # Log engagement metrics based on action
+        if action in _HIGH_ENGAGEMENT:
+            self._log_buffer.append(('high_engagement', action, now))
+        elif action in _PROGRESSION:
+            self._log_buffer.append(('progression', action, now))
+        
+        # Update internal state based on action
+        self.handle_action_effects(action, now)
+        if len(self._log_buffer) >= self._log_flush_every:
+            self._flush_logs()
     
-    def handle_action_effects(self, action: str):
+    def _flush_logs(self):
+        """Hand the buffered engagement, death and retry events to the analytics engine in one call"""
+        if self._log_buffer:
+            events, self._log_buffer = self._log_buffer, []
+            self.analytics_engine.log_batch(self.agent_id, events)
+    
+    def handle_action_effects(self, action: str, now: float = None):
         """Handle the consequences of an action"""
         if action == 'died':
-            self.results['deaths'] += 1
-            self.analytics_engine.log_agent_death(self.agent_id)
+            self._deaths += 1
+            self._log_buffer.append(('death', action, time.time() if now is None else now))
         elif action == 'retry':
-            self.results['retries'] += 1
-            self.analytics_engine.log_retry(self.agent_id)
+            self._retries += 1
+            self._log_buffer.append(('retry', action, time.time() if now is None else now))
     
-    def detect_anomalies(self):
+    def detect_anomalies(self, now: float = None):
         """Detect potential issues in the game"""
+        if now is None:
+            now = time.time()
         # Check for softlocks (agent not making progress)
         if self.game_state.is_stuck():
             issue = {
                 'type': 'softlock',
-                'timestamp': time.time(),
+                'timestamp': now,
                 'location': self.game_state.get_position(),
                 'details': 'Agent appears to be stuck in location'
             }
-            self.results['issues_detected'].append(issue)
+            self._issues.append(issue)
             self.analytics_engine.log_anomaly('softlock', issue)
         
         # Check for other anomalies
         if self.game_state.is_infinite_loop():
             issue = {
                 'type': 'infinite_loop',
-                'timestamp': time.time(),
+                'timestamp': now,
                 'details': 'Agent detected infinite loop behavior'
             }
-            self.results['issues_detected'].append(issue)
+            self._issues.append(issue)
             self.analytics_engine.log_anomaly('infinite_loop', issue)
     
     def stop(self):
         """Stop the agent's execution"""
         self.is_running = False
+        self._stop_event.set()
     
     def get_results(self) -> Dict[str, Any]:
         """Get the results from this agent's playtesting session"""
-        # Convert compact action tuples back to dictionary format for compatibility
-        readable_actions = []
-        for action_data in self.results['actions']:
-            if isinstance(action_data, tuple) and len(action_data) == 3:
-                # Check if second element is an error or action
-                if isinstance(action_data[1], str) and 'error' in str(action_data[1]).lower():
-                    # Error format: (timestamp, error, game_state)
-                    readable_actions.append({
-                        'timestamp': action_data[0],
-                        'error': action_data[1],
-                        'game_state': action_data[2]
-                    })
-                else:
-                    # Regular action format: (timestamp, action, game_state)
-                    readable_actions.append({
-                        'timestamp': action_data[0],
-                        'action': action_data[1],
-                        'game_state': action_data[2]
-                    })
-            else:
-                # Already in dictionary format or unknown format
-                readable_actions.append(action_data)
-        
-        # Update results with readable format
-        self.results['actions'] = readable_actions
-        self.results['engagement_metrics'] = self.analytics_engine.get_agent_metrics(self.agent_id)
-        return self.results
\ No newline at end of file
+        # Records are logged in their final shape; the list copy only shares references
+        self._flush_logs()
+        self._engagement_metrics = self.analytics_engine.get_agent_metrics(self.agent_id)
+        results = self.results
+        results['actions'] = list(self._actions_log)
+        if self._action_log_writer is not None:
+            # The full history is on disk; 'actions' still holds the newest records
+            self._action_log_writer.close()
+            results['action_log_path'] = self._action_log_writer.path
+        return results
+    
+    @property
+    def results(self) -> Dict[str, Any]:
+        """Current session results; 'actions' is the live ring buffer"""
+        return {
+            'agent_id': self.agent_id,
+            'personality': self.personality.value,
+            'actions': self._actions_log,
+            'time_spent': self._time_spent,
+            'retries': self._retries,
+            'deaths': self._deaths,
+            'level_progress': self._level_progress,
+            'issues_detected': self._issues,
+            'engagement_metrics': self._engagement_metrics
+        }
\ No newline at end of file
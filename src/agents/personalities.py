@@ -8,37 +8,52 @@ class AgentPersonality(Enum):
     RANDOM = "unpredictable behavior"
     SPEEDRUNNER = "optimal path finding"
 
+# Constant directions and action choices, shared instead of rebuilt per call
+_DIR_SLOW = (0.3, 0, 0)
+_DIR_FAST = (1.0, 0, 0)
+_RANDOM_ACTIONS = ("move", "jump", "attack", "interact")
+
+
+def _build_cautious(agent, game_state):
+    # Move slowly, check surroundings
+    return {"agent_id": agent.id, "type": "move", "direction": _DIR_SLOW}
+
+
+def _build_aggressive(agent, game_state):
+    # Fast, direct movement with a 30% chance to attack
+    return {"agent_id": agent.id, "type": "attack" if agent._rng.random() < 0.3 else "move",
+            "direction": _DIR_FAST}
+
+
+def _build_random(agent, game_state):
+    # Completely unpredictable; uniform(-1, 1) inlined as 2r - 1 to skip its Python wrapper
+    rand = agent._rng.random
+    return {"agent_id": agent.id, "type": _RANDOM_ACTIONS[int(rand() * 4)],
+            "direction": (2.0 * rand() - 1.0, 2.0 * rand() - 1.0, 2.0 * rand() - 1.0)}
+
+
+def _build_speedrunner(agent, game_state):
+    # Always move toward objective, assume forward is optimal
+    return {"agent_id": agent.id, "type": "move", "direction": _DIR_FAST}
+
+
 class PersonalityAgent:
+    # Action builder of each personality, resolved once per agent
+    _ACTION_BUILDERS = {
+        AgentPersonality.CAUTIOUS: _build_cautious,
+        AgentPersonality.AGGRESSIVE: _build_aggressive,
+        AgentPersonality.RANDOM: _build_random,
+        AgentPersonality.SPEEDRUNNER: _build_speedrunner,
+    }
+
     def __init__(self, agent_id: str, personality: AgentPersonality):
         self.id = agent_id
+        self.agent_id = agent_id
         self.personality = personality
-        
+        # Per-agent generator seeded by id so runs are reproducible
+        self._rng = random.Random(agent_id)
+        self._build = self._ACTION_BUILDERS[personality].__get__(self)
+
     def decide_action(self, game_state: Dict[str, Any]) -> Dict[str, Any]:
         """Make decision based on personality"""
-        base_action = {"agent_id": self.id, "type": "move"}
-        
-        if self.personality == AgentPersonality.CAUTIOUS:
-            # Move slowly, check surroundings
-            base_action["direction"] = (0.3, 0, 0)  # Slow movement
-            
-        elif self.personality == AgentPersonality.AGGRESSIVE:
-            # Fast, direct movement
-            base_action["direction"] = (1.0, 0, 0)  # Fast movement
-            if random.random() < 0.3:  # 30% chance to attack
-                base_action["type"] = "attack"
-                
-        elif self.personality == AgentPersonality.RANDOM:
-            # Completely unpredictable
-            actions = ["move", "jump", "attack", "interact"]
-            base_action["type"] = random.choice(actions)
-            base_action["direction"] = (
-                random.uniform(-1, 1),
-                random.uniform(-1, 1),
-                random.uniform(-1, 1)
-            )
-            
-        elif self.personality == AgentPersonality.SPEEDRUNNER:
-            # Always move toward objective
-            base_action["direction"] = (1.0, 0, 0)  # Assume forward is optimal
-            
-        return base_action
+        return self._build(game_state)
@@ -0,0 +1,93 @@
+"""
+Process Fleet - Runs independent agents across CPU cores, one worker process per core
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+from .base_agent import BaseAgent, AgentPersonality
+from ..analytics.analytics_engine import AnalyticsEngine
+from ..unity_integration.unity_integration_manager import UnityIntegrationManager
+from ..utils.action_log import action_log_path
+from ..utils.config import get_unity_connection_settings
+
+
+def run_agent_worker(agent_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build and run one agent inside a worker process and return its results.
+    Live objects cannot cross the process boundary, so the worker gets plain
+    connection params and builds its own analytics engine and Unity connection.
+    """
+    unity = agent_config['unity']
+    # The worker's connection settings come from its environment, like the parent's
+    os.environ['UNITY_HOST'] = str(unity['host'])
+    os.environ['UNITY_PORT'] = str(unity['port'])
+    os.environ['UNITY_TIMEOUT'] = str(unity['timeout'])
+    # A worker drives a single agent, so one connection is enough
+    os.environ['UNITY_POOL_SIZE'] = '1'
+
+    analytics_engine = AnalyticsEngine()
+    unity_manager = UnityIntegrationManager(agent_config['game_path'], analytics_engine)
+    agent = BaseAgent(
+        agent_id=agent_config['agent_id'],
+        game_path=agent_config['game_path'],
+        analytics_engine=analytics_engine,
+        unity_manager=unity_manager,
+        personality=AgentPersonality(agent_config['personality']),
+        action_log_path=agent_config.get('action_log_path'),
+        pipeline_io=agent_config.get('pipeline_io', False)
+    )
+
+    if not unity_manager.initialize():
+        results = agent.get_results()
+        results['issues_detected'].append({'type': 'connection', 'details': 'Failed to connect to Unity'})
+        return results
+
+    timer = threading.Timer(agent_config['duration'], agent.stop)
+    timer.start()
+    try:
+        agent.run()
+    finally:
+        timer.cancel()
+        unity_manager.cleanup()
+    return agent.get_results()
+
+
+def build_agent_configs(game_path: str, num_agents: int, duration: int,
+                        action_log_dir: Optional[str] = None,
+                        pipeline_io: bool = False) -> List[Dict[str, Any]]:
+    """Picklable per-agent configs with personalities distributed evenly"""
+    personalities = list(AgentPersonality)
+    unity = get_unity_connection_settings()
+    if action_log_dir:
+        os.makedirs(action_log_dir, exist_ok=True)
+    return [
+        {
+            'agent_id': i,
+            'game_path': game_path,
+            'duration': duration,
+            'personality': personalities[i % len(personalities)].value,
+            'unity': unity,
+            'action_log_path': action_log_path(action_log_dir, i) if action_log_dir else None,
+            'pipeline_io': pipeline_io
+        }
+        for i in range(num_agents)
+    ]
+
+
+def run_agent_fleet(game_path: str, num_agents: int, duration: int,
+                    max_workers: Optional[int] = None,
+                    action_log_dir: Optional[str] = None,
+                    pipeline_io: bool = False) -> List[Dict[str, Any]]:
+    """
+    Run every agent in its own process so CPU-bound agent logic is not serialized
+    by the GIL. Agents beyond max_workers start once a worker frees up, so keep
+    max_workers at or above num_agents when they must all run side by side.
+    Call from under `if __name__ == '__main__':` since workers are spawned by
+    re-importing the main module on Windows and macOS.
+    """
+    configs = build_agent_configs(game_path, num_agents, duration, action_log_dir, pipeline_io)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, num_agents))
+    print(f"Running {num_agents} agents across {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_agent_worker, configs))
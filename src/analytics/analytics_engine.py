@@ -3,93 +3,552 @@ Analytics Engine - Core system for collecting, processing, and analyzing gamepla
 """
 import time
 import json
+import itertools
+import math
+import queue
 import threading
-from typing import Dict, Any, List
+from array import array
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Dict, Any, List, Mapping
 from collections import defaultdict
-import pandas as pd
+from collections.abc import MutableMapping
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
+from ..utils.game_state import SNAPSHOT_FIELDS, StateSnapshot
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, exported records use the stdlib encoder without it
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, the movement kernel then runs as plain Python
+    njit = None
+
+
+# Positions buffered per level before they are added to its heatmap grid
+HEATMAP_BUFFER_SIZE = 4096
+
+# Per-agent logging is spread over this many locks, routed by agent id
+LOCK_SHARDS = 16
+
+# Queued records that make a logging thread apply its shard's queue
+PENDING_DRAIN_SIZE = 1024
+
+
+class _LevelHeatmap:
+    """
+    Dense int32 visit-count grid for one level. Cells are buffered as raw ints
+    and added to the grid in bulk; the grid grows to cover every visited cell,
+    so the level bounds do not need to be known up front.
+    """
+    __slots__ = ('xs', 'zs', 'grid', 'min_x', 'min_z')
+    
+    def __init__(self):
+        self.xs = array('i')
+        self.zs = array('i')
+        self.grid = None
+        self.min_x = 0
+        self.min_z = 0
+    
+    def add(self, x: int, z: int):
+        self.xs.append(x)
+        self.zs.append(z)
+        if len(self.xs) >= HEATMAP_BUFFER_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """Add the buffered cells to the grid, growing it first if they fall outside"""
+        if not self.xs:
+            return
+        xs = np.frombuffer(self.xs, dtype=np.int32)
+        zs = np.frombuffer(self.zs, dtype=np.int32)
+        min_x, max_x = int(xs.min()), int(xs.max())
+        min_z, max_z = int(zs.min()), int(zs.max())
+        if self.grid is None:
+            self.grid = np.zeros((max_z - min_z + 1, max_x - min_x + 1), dtype=np.int32)
+            self.min_x, self.min_z = min_x, min_z
+        else:
+            height, width = self.grid.shape
+            new_min_x, new_min_z = min(min_x, self.min_x), min(min_z, self.min_z)
+            new_max_x = max(max_x, self.min_x + width - 1)
+            new_max_z = max(max_z, self.min_z + height - 1)
+            if (new_min_x, new_min_z) != (self.min_x, self.min_z) or \
+                    (new_max_z - new_min_z + 1, new_max_x - new_min_x + 1) != (height, width):
+                grid = np.zeros((new_max_z - new_min_z + 1, new_max_x - new_min_x + 1), dtype=np.int32)
+                off_z, off_x = self.min_z - new_min_z, self.min_x - new_min_x
+                grid[off_z:off_z + height, off_x:off_x + width] = self.grid
+                self.grid, self.min_x, self.min_z = grid, new_min_x, new_min_z
+        np.add.at(self.grid, (zs - self.min_z, xs - self.min_x), 1)
+        # Release the views before the buffers are reset
+        del xs, zs
+        self.xs = array('i')
+        self.zs = array('i')
+
+
+def _encode_record(record: Dict[str, Any]) -> bytes:
+    """Compact JSON of one exported record; values JSON cannot hold are written as strings"""
+    if orjson is not None:
+        return orjson.dumps(record, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(record, default=str).encode('utf-8')
+
+
+def _scan_movement(slots, positions, timestamps, last_positions, stuck_since,
+                   stuck_threshold, hits, durations):
+    """
+    Stuck check over a batch of (slot, position, timestamp) samples in log order.
+    Updates each slot's last position and stuck-since time in place, where a NaN
+    stuck-since marks a slot not seen yet, and writes the batch index and stuck
+    duration of every soft-lock sample to hits/durations. Returns the hit count.
+    Rows are indexed as a[i][k] so the same code runs on arrays and nested lists.
+    """
+    n_hits = 0
+    for i in range(len(slots)):
+        slot = slots[i]
+        position = positions[i]
+        timestamp = timestamps[i]
+        last = last_positions[slot]
+        if math.isnan(stuck_since[slot]):
+            last[0] = position[0]
+            last[1] = position[1]
+            last[2] = position[2]
+            stuck_since[slot] = timestamp
+            continue
+        
+        # Squared distance moved, compared against the squared threshold to skip the sqrt
+        dx = position[0] - last[0]
+        dy = position[1] - last[1]
+        dz = position[2] - last[2]
+        if dx * dx + dy * dy + dz * dz < 0.01:  # Agent barely moved (less than 0.1 units)
+            stuck_duration = timestamp - stuck_since[slot]
+            if stuck_duration > stuck_threshold:
+                hits[n_hits] = i
+                durations[n_hits] = stuck_duration
+                n_hits += 1
+        else:
+            # Agent moved, reset stuck timer
+            last[0] = position[0]
+            last[1] = position[1]
+            last[2] = position[2]
+            stuck_since[slot] = timestamp
+    return n_hits
+
+
+if njit is not None:
+    # Compiled on first use and cached on disk so later runs skip the compile
+    _scan_movement = njit(cache=True)(_scan_movement)
+
+
+class _MovementTracker:
+    """
+    Last position and stuck-since time of each agent of one lock shard, kept as
+    rows of arrays so a drained batch of positions is checked in one kernel call
+    """
+    __slots__ = ('slots', 'agent_ids', 'positions', 'stuck_since')
+    
+    def __init__(self, capacity: int = 8):
+        self.slots: Dict[int, int] = {}
+        self.agent_ids: List[int] = []
+        self.positions = np.zeros((capacity, 3))
+        self.stuck_since = np.full(capacity, np.nan)
+    
+    def __len__(self) -> int:
+        return len(self.agent_ids)
+    
+    def slot(self, agent_id: int) -> int:
+        """Row of an agent, assigning the next one (and growing the arrays) on first use"""
+        slot = self.slots.get(agent_id)
+        if slot is None:
+            slot = self.slots[agent_id] = len(self.agent_ids)
+            self.agent_ids.append(agent_id)
+            capacity = len(self.stuck_since)
+            if slot == capacity:
+                self.positions = np.concatenate((self.positions, np.zeros((capacity, 3))))
+                self.stuck_since = np.concatenate((self.stuck_since, np.full(capacity, np.nan)))
+        return slot
+    
+    def check(self, slots: List[int], positions: List[tuple], timestamps: List[float],
+              stuck_threshold: float) -> List[tuple]:
+        """Run a batch through the stuck check; returns (batch index, duration) of each soft-lock"""
+        n = len(slots)
+        if njit is None:
+            # Plain Python indexes lists far faster than NumPy scalars, so the
+            # uncompiled kernel runs on list copies of the rows
+            last_positions = self.positions.tolist()
+            stuck_since = self.stuck_since.tolist()
+            hits, durations = [0] * n, [0.0] * n
+            n_hits = _scan_movement(slots, positions, timestamps, last_positions, stuck_since,
+                                    stuck_threshold, hits, durations)
+            self.positions[:] = last_positions
+            self.stuck_since[:] = stuck_since
+            return list(zip(hits[:n_hits], durations[:n_hits]))
+        
+        hits = np.empty(n, dtype=np.intp)
+        durations = np.empty(n)
+        n_hits = _scan_movement(np.array(slots, dtype=np.intp), np.array(positions, dtype=np.float64),
+                                np.array(timestamps, dtype=np.float64), self.positions, self.stuck_since,
+                                stuck_threshold, hits, durations)
+        return list(zip(hits[:n_hits].tolist(), durations[:n_hits].tolist()))
+    
+    def count_stuck(self, current_time: float, stuck_threshold: float) -> int:
+        """Agents whose stuck timer is older than the threshold"""
+        # Compare against one scalar cutoff instead of subtracting from every row
+        return int(np.count_nonzero(self.stuck_since[:len(self.agent_ids)] < current_time - stuck_threshold))
+
+
+class _MovementView(MutableMapping):
+    """
+    Dict-like view of one per-agent column of the movement trackers, read and
+    written with every queued record applied. Kept for callers of the former
+    agent_positions / agent_stuck_times dicts.
+    """
+    
+    def __init__(self, engine: 'AnalyticsEngine', column: str):
+        self._engine = engine
+        self._column = column
+    
+    def __getitem__(self, agent_id):
+        with self._engine._all_shards():
+            tracker = self._engine._movement[hash(agent_id) % LOCK_SHARDS]
+            slot = tracker.slots.get(agent_id)
+            if slot is None:
+                raise KeyError(agent_id)
+            if self._column == 'positions':
+                return tuple(tracker.positions[slot].tolist())
+            return float(tracker.stuck_since[slot])
+    
+    def __setitem__(self, agent_id, value):
+        with self._engine._all_shards():
+            tracker = self._engine._movement[hash(agent_id) % LOCK_SHARDS]
+            getattr(tracker, self._column)[tracker.slot(agent_id)] = value
+    
+    def __delitem__(self, agent_id):
+        raise TypeError("Tracked agents cannot be removed")
+    
+    def __iter__(self):
+        with self._engine._all_shards():
+            agent_ids = [agent_id for tracker in self._engine._movement for agent_id in tracker.agent_ids]
+        return iter(agent_ids)
+    
+    def __len__(self) -> int:
+        with self._engine._all_shards():
+            return sum(len(tracker) for tracker in self._engine._movement)
+
+
+# Record kinds of an _AgentLog
+_KIND_ACTION = 0
+_KIND_PROGRESSION = 1
+
+# Behavior cluster names, indexed by the type codes _cluster_agents assigns
+_BEHAVIOR_TYPES = ('highly_engaged', 'frustrated', 'disengaged', 'balanced')
+
+# Codes of the death and retry events, kept alongside their times
+_EVENT_DEATH = 0
+_EVENT_RETRY = 1
+
+
+class _AgentLog:
+    """
+    One agent's actions and progression events as parallel arrays of timestamps,
+    interned action ids and record kinds, with the game states of actions in a
+    sidecar list; states logged as StateSnapshots are kept as their value tuple.
+    Indexing or iterating yields each record as a dict.
+    """
+    __slots__ = ('agent_id', 'action_names', 'timestamps', 'action_ids', 'kinds', 'game_states')
+    
+    def __init__(self, agent_id: int, action_names: List[str]):
+        self.agent_id = agent_id
+        self.action_names = action_names  # The engine's interned names, indexed by action id
+        self.timestamps = array('d')
+        self.action_ids = array('i')
+        self.kinds = array('b')
+        self.game_states = []
+    
+    def append(self, timestamp: float, action_id: int, kind: int, game_state: Dict[str, Any] = None):
+        self.timestamps.append(timestamp)
+        self.action_ids.append(action_id)
+        self.kinds.append(kind)
+        self.game_states.append(game_state)
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        record = {
+            'timestamp': self.timestamps[index],
+            'action': self.action_names[self.action_ids[index]],
+            'agent_id': self.agent_id
+        }
+        if self.kinds[index] == _KIND_PROGRESSION:
+            record['event_type'] = 'progression'
+        else:
+            game_state = self.game_states[index]
+            if type(game_state) is tuple:
+                game_state = dict(zip(SNAPSHOT_FIELDS, game_state))
+            record['game_state'] = game_state
+        return record
+    
+    def __iter__(self):
+        for index in range(len(self.timestamps)):
+            yield self[index]
 
 
 class AnalyticsEngine:
     """
     Main analytics engine for collecting and processing gameplay data
+    
+    Performance notes: the logging side is bound by per-record Python object
+    work and lock traffic, so records are only queued on their agent's shard,
+    applied in batches, and stored compactly (typed arrays, interned actions,
+    state tuples). The analytics side is bound by interpreter overhead, so it
+    reads those arrays with NumPy reductions, runs the stuck check as a batched
+    (optionally numba-compiled) kernel, and reuses results until more records
+    arrive. Nothing here has the arithmetic intensity to justify GPU or
+    hand-written SIMD code. Profile a representative session with cProfile
+    before changing this balance; queueing and draining dominate.
     """
     
     def __init__(self):
-        self.lock = threading.Lock()  # Ensure thread safety for multi-threaded agent logging
-        self.agents_data = defaultdict(list)  # Data per agent
-        self.global_events = []  # Events affecting all agents
+        # Loggers only enqueue records on their agent's shard queue; the records are
+        # applied to the structures below in batches, under that shard's lock, when a
+        # queue fills up or before a read. self.lock guards the shared heatmaps,
+        # issues and anomalies and is always taken last
+        self._shards = [threading.Lock() for _ in range(LOCK_SHARDS)]
+        self._pending = [queue.SimpleQueue() for _ in range(LOCK_SHARDS)]
+        self._snapshot_lock = threading.Lock()  # Serializes readers that take every shard
+        self.lock = threading.Lock()
+        self._agents_data: Dict[int, _AgentLog] = {}  # Actions and progression events per agent
+        # Action names interned to the small ints stored in each _AgentLog
+        self._action_ids: Dict[str, int] = {}
+        self._action_names: List[str] = []
+        self._events_by_shard = [[] for _ in range(LOCK_SHARDS)]  # Deaths and retries, merged by global_events
+        # Times and _EVENT_* codes of the same events, for vectorized window counts
+        self._event_times = [array('d') for _ in range(LOCK_SHARDS)]
+        self._event_codes = [array('b') for _ in range(LOCK_SHARDS)]
+        self._engagement_times = [array('d') for _ in range(LOCK_SHARDS)]  # Of the engagement_data records
+        # Per-agent event tallies kept alongside global_events and engagement_data so
+        # metrics need no scan
+        self.deaths_by_agent = defaultdict(int)
+        self.retries_by_agent = defaultdict(int)
+        self.high_engagements_by_agent = defaultdict(int)
         self.performance_metrics = {}
-        self.engagement_data = defaultdict(list)
-        self.heatmap_data = defaultdict(lambda: defaultdict(int))
+        self._engagement_data = defaultdict(list)
+        self.heatmaps: Dict[str, _LevelHeatmap] = defaultdict(_LevelHeatmap)
         self.issue_logs = []
         self.session_start_time = time.time()
         
-        # Real-time anomaly detection
-        self.agent_positions = {}  # Track last known positions
-        self.agent_stuck_times = {}  # Track how long agents have been stuck
+        # Real-time anomaly detection; each shard tracks the movement of its agents
+        self._movement = [_MovementTracker() for _ in range(LOCK_SHARDS)]
         self.stuck_threshold = 30.0  # Seconds before considering an agent stuck
         self.anomalies = []
+        if njit is not None:
+            # Compile (or load from the disk cache) the movement kernel before agents log
+            self._movement[0].check([], np.zeros((0, 3)), [], self.stuck_threshold)
         
-    def log_agent_action(self, agent_id: int, action: str, game_state: Dict[str, Any]):
-        """Log an action taken by an agent with real-time anomaly detection"""
-        timestamp = time.time() - self.session_start_time
+        # Aggregates reused until more records are applied; every change takes a fresh
+        # version from the counter, whose next() is atomic
+        self._versions = itertools.count(1)
+        self._version = 0
+        self._cache: Dict[str, tuple] = {}
         
-        with self.lock:
-            # Check for stuck agents in real-time
-            if 'position' in game_state:
-                self._check_agent_movement(agent_id, game_state['position'], timestamp)
-            
-            action_record = (timestamp, action, game_state, agent_id)
-            self.agents_data[agent_id].append(action_record)
-    
-    def _check_agent_movement(self, agent_id: int, position: tuple, timestamp: float):
-        """Check if agent is stuck and log anomalies"""
-        # Note: This method should be called within a lock context
-        if agent_id not in self.agent_positions:
-            self.agent_positions[agent_id] = position
-            self.agent_stuck_times[agent_id] = timestamp
+    def _shard(self, agent_id: int) -> threading.Lock:
+        """Lock guarding the given agent's data"""
+        return self._shards[hash(agent_id) % LOCK_SHARDS]
+    
+    def _enqueue(self, agent_id: int, kind: str, payload):
+        """Queue a record for the agent's shard without locking, draining a full queue"""
+        shard = hash(agent_id) % LOCK_SHARDS
+        pending = self._pending[shard]
+        pending.put_nowait((kind, agent_id, payload))
+        # Whoever fills the queue applies it, unless another thread already is
+        if pending.qsize() >= PENDING_DRAIN_SIZE and self._shards[shard].acquire(blocking=False):
+            try:
+                self._drain(shard)
+            finally:
+                self._shards[shard].release()
+    
+    def _agent_log(self, agent_id: int) -> _AgentLog:
+        """The agent's log, created on first use; the caller holds its shard lock"""
+        log = self._agents_data.get(agent_id)
+        if log is None:
+            log = self._agents_data[agent_id] = _AgentLog(agent_id, self._action_names)
+        return log
+    
+    def _intern(self, action: str) -> int:
+        """Id of an action name, assigning the next one to a name not seen before"""
+        action_id = self._action_ids.get(action)
+        if action_id is None:
+            with self.lock:
+                action_id = self._action_ids.setdefault(action, len(self._action_names))
+                if action_id == len(self._action_names):
+                    self._action_names.append(action)
+        return action_id
+    
+    def _drain(self, shard: int):
+        """Apply a shard's queued records; the caller holds that shard's lock"""
+        pending = self._pending[shard]
+        if pending.empty():
             return
-        
-        # Calculate distance moved
-        prev_pos = self.agent_positions[agent_id]
-        distance = sum((a - b) ** 2 for a, b in zip(position, prev_pos)) ** 0.5
-        
-        if distance < 0.1:  # Agent barely moved
-            stuck_duration = timestamp - self.agent_stuck_times[agent_id]
-            if stuck_duration > self.stuck_threshold:
-                # Log soft-lock anomaly
-                anomaly = {
-                    'type': 'soft_lock',
-                    'agent_id': agent_id,
-                    'position': position,
-                    'duration': stuck_duration,
-                    'timestamp': timestamp
-                }
-                self.anomalies.append(anomaly)
-                self.issue_logs.append(f"Agent {agent_id} soft-locked at {position} for {stuck_duration:.1f}s")
-        else:
-            # Agent moved, reset stuck timer
-            self.agent_positions[agent_id] = position
-            self.agent_stuck_times[agent_id] = timestamp
+        events = self._events_by_shard[shard]
+        event_times = self._event_times[shard]
+        event_codes = self._event_codes[shard]
+        positions = []
+        tracker = self._movement[shard]
+        # Positions of the batch's actions, run through the stuck check together
+        moved_slots, moved_positions, moved_times, moved_agents = [], [], [], []
+        while True:
+            try:
+                kind, agent_id, payload = pending.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'action':
+                timestamp, action, game_state = payload
+                if type(game_state) is StateSnapshot:
+                    # Keep only the value tuple; position is its first field
+                    game_state = game_state.as_tuple()
+                    position = game_state[0]
+                else:
+                    position = game_state.get('position')
+                if position is not None:
+                    moved_slots.append(tracker.slot(agent_id))
+                    moved_positions.append(position)
+                    moved_times.append(timestamp)
+                    moved_agents.append(agent_id)
+                self._agent_log(agent_id).append(timestamp, self._intern(action), _KIND_ACTION, game_state)
+            elif kind == 'position':
+                positions.append(payload)
+            elif kind == 'death':
+                events.append(payload)
+                event_times.append(payload['timestamp'])
+                event_codes.append(_EVENT_DEATH)
+                self.deaths_by_agent[agent_id] += 1
+            elif kind == 'retry':
+                events.append(payload)
+                event_times.append(payload['timestamp'])
+                event_codes.append(_EVENT_RETRY)
+                self.retries_by_agent[agent_id] += 1
+            elif kind == 'high_engagement':
+                self._engagement_data[agent_id].append(payload)
+                self._engagement_times[shard].append(payload['timestamp'])
+                self.high_engagements_by_agent[agent_id] += 1
+            elif kind == 'progression':
+                timestamp, action = payload
+                self._agent_log(agent_id).append(timestamp, self._intern(action), _KIND_PROGRESSION)
+            else:  # batch
+                engagement_records, progression_records, event_records = payload
+                self._engagement_data[agent_id].extend(engagement_records)
+                self._engagement_times[shard].extend(record['timestamp'] for record in engagement_records)
+                self.high_engagements_by_agent[agent_id] += len(engagement_records)
+                log = self._agent_log(agent_id)
+                for timestamp, action in progression_records:
+                    log.append(timestamp, self._intern(action), _KIND_PROGRESSION)
+                for record in event_records:
+                    events.append(record)
+                    event_times.append(record['timestamp'])
+                    if record['event'] == 'death':
+                        event_codes.append(_EVENT_DEATH)
+                        self.deaths_by_agent[agent_id] += 1
+                    else:
+                        event_codes.append(_EVENT_RETRY)
+                        self.retries_by_agent[agent_id] += 1
+        self._version = next(self._versions)
+        if moved_slots:
+            # Check for stuck agents
+            for i, stuck_duration in tracker.check(moved_slots, moved_positions, moved_times,
+                                                   self.stuck_threshold):
+                self._log_soft_lock(moved_agents[i], moved_positions[i], stuck_duration, moved_times[i])
+        if positions:
+            with self.lock:
+                heatmaps = self.heatmaps
+                for level, x, z in positions:
+                    heatmaps[level].add(x, z)
+    
+    @contextmanager
+    def _all_shards(self):
+        """
+        Hold every shard lock, taken in index order, with all queued records applied,
+        for a consistent read across agents
+        """
+        with self._snapshot_lock:
+            for shard in self._shards:
+                shard.acquire()
+            try:
+                for shard in range(LOCK_SHARDS):
+                    self._drain(shard)
+                yield
+            finally:
+                for shard in reversed(self._shards):
+                    shard.release()
+    
+    def _flush_pending(self):
+        """Apply every queued record"""
+        with self._all_shards():
+            pass
+    
+    @property
+    def agents_data(self) -> Dict[int, _AgentLog]:
+        """Logged actions and progression events per agent, with queued records applied"""
+        self._flush_pending()
+        return self._agents_data
+    
+    @property
+    def engagement_data(self) -> Dict[int, list]:
+        """High engagement events per agent, with queued records applied"""
+        self._flush_pending()
+        return self._engagement_data
+    
+    @property
+    def global_events(self) -> List[Dict[str, Any]]:
+        """Death and retry events of all agents in time order"""
+        with self._all_shards():
+            events = [event for shard_events in self._events_by_shard for event in shard_events]
+        events.sort(key=itemgetter('timestamp'))
+        return events
+    
+    def log_agent_action(self, agent_id: int, action: str, game_state: Mapping[str, Any]):
+        """
+        Log an action taken by an agent; stuck agents are detected as it is applied.
+        Passing a GameState.snapshot() stores the state far more compactly than a dict.
+        """
+        self._enqueue(agent_id, 'action', (time.time() - self.session_start_time, action, game_state))
+    
+    def _log_soft_lock(self, agent_id: int, position: tuple, stuck_duration: float, timestamp: float):
+        """Log a soft-lock anomaly found by the stuck check"""
+        anomaly = {
+            'type': 'soft_lock',
+            'agent_id': agent_id,
+            'position': position,
+            'duration': stuck_duration,
+            'timestamp': timestamp
+        }
+        with self.lock:
+            self.anomalies.append(anomaly)
+            self.issue_logs.append(f"Agent {agent_id} soft-locked at {position} for {stuck_duration:.1f}s")
+    
+    @property
+    def agent_positions(self) -> MutableMapping:
+        """Last known position of each agent"""
+        return _MovementView(self, 'positions')
+    
+    @property
+    def agent_stuck_times(self) -> MutableMapping:
+        """Session time at which each agent was last seen moving"""
+        return _MovementView(self, 'stuck_since')
     
     def should_stop_test(self) -> bool:
         """Check if test should be stopped due to too many stuck agents"""
-        with self.lock:
-            if not self.agent_positions:
+        with self._all_shards():
+            tracked_agents = sum(len(tracker) for tracker in self._movement)
+            if not tracked_agents:
                 return False
                 
             current_time = time.time() - self.session_start_time
-            stuck_agents = 0
-            
-            for agent_id, stuck_time in self.agent_stuck_times.items():
-                if current_time - stuck_time > self.stuck_threshold:
-                    stuck_agents += 1
+            stuck_agents = sum(tracker.count_stuck(current_time, self.stuck_threshold)
+                               for tracker in self._movement)
             
             # Stop if more than 50% of agents are stuck
-            return stuck_agents > len(self.agent_positions) * 0.5
+            return stuck_agents > tracked_agents * 0.5
     
     def log_agent_death(self, agent_id: int):
         """Log when an agent dies in the game"""
@@ -98,8 +557,7 @@ class AnalyticsEngine:
             'event': 'death',
             'agent_id': agent_id
         }
-        with self.lock:
-            self.global_events.append(death_record)
+        self._enqueue(agent_id, 'death', death_record)
         
     def log_retry(self, agent_id: int):
         """Log when an agent retries a section"""
@@ -108,8 +566,7 @@ class AnalyticsEngine:
             'event': 'retry',
             'agent_id': agent_id
         }
-        with self.lock:
-            self.global_events.append(retry_record)
+        self._enqueue(agent_id, 'retry', retry_record)
         
     def log_high_engagement(self, agent_id: int, action: str):
         """Log high engagement events"""
@@ -119,19 +576,38 @@ class AnalyticsEngine:
             'agent_id': agent_id,
             'engagement_level': 'high'
         }
-        with self.lock:
-            self.engagement_data[agent_id].append(engagement_record)
+        self._enqueue(agent_id, 'high_engagement', engagement_record)
         
     def log_progression(self, agent_id: int, action: str):
         """Log progression-related events"""
-        progression_record = {
-            'timestamp': time.time() - self.session_start_time,
-            'action': action,
-            'agent_id': agent_id,
-            'event_type': 'progression'
-        }
-        with self.lock:
-            self.agents_data[agent_id].append(progression_record)
+        self._enqueue(agent_id, 'progression', (time.time() - self.session_start_time, action))
+    
+    def log_batch(self, agent_id: int, events: List[tuple]):
+        """
+        Log a batch of (kind, action, wall_time) events from one agent as a single
+        queued record, where kind is 'high_engagement', 'progression', 'death' or
+        'retry'; the action of a death or retry is not recorded
+        """
+        engagement_records = []
+        progression_records = []
+        event_records = []
+        for kind, action, event_time in events:
+            if kind == 'high_engagement':
+                engagement_records.append({
+                    'timestamp': event_time - self.session_start_time,
+                    'action': action,
+                    'agent_id': agent_id,
+                    'engagement_level': 'high'
+                })
+            elif kind == 'progression':
+                progression_records.append((event_time - self.session_start_time, action))
+            else:
+                event_records.append({
+                    'timestamp': event_time - self.session_start_time,
+                    'event': kind,
+                    'agent_id': agent_id
+                })
+        self._enqueue(agent_id, 'batch', (engagement_records, progression_records, event_records))
     
     def log_anomaly(self, anomaly_type: str, details: Dict[str, Any]):
         """Log detected anomalies like softlocks or infinite loops"""
@@ -142,38 +618,59 @@ class AnalyticsEngine:
         }
         with self.lock:
             self.issue_logs.append(anomaly_record)
+        self._version = next(self._versions)
+    
+    def _cached(self, key: str, compute):
+        """Result of compute(), reused until more records are logged"""
+        self._flush_pending()
+        version = self._version
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        result = compute()
+        self._cache[key] = (version, result)
+        return result
     
     def log_position(self, agent_id: int, position: tuple, level: str = "default"):
         """Log agent position for heatmap generation"""
         x, y, z = position
         # For heatmap, we'll use x, z coordinates (top-down view)
-        with self.lock:
-            self.heatmap_data[level][(int(x), int(z))] += 1
+        self._enqueue(agent_id, 'position', (level, int(x), int(z)))
     
     def get_agent_metrics(self, agent_id: int) -> Dict[str, Any]:
         """Get computed metrics for a specific agent"""
-        with self.lock:
-            # Create copies to avoid holding lock during calculations if possible, 
-            # but here calculations are fast enough.
-            agent_data = list(self.agents_data[agent_id])
-            engagements = list(self.engagement_data[agent_id])
-            global_events = list(self.global_events)
+        shard = hash(agent_id) % LOCK_SHARDS
+        with self._shards[shard]:
+            self._drain(shard)
+            return self._agent_metrics_locked(agent_id)
+    
+    def _compute_all_metrics(self) -> Dict[int, Dict[str, Any]]:
+        """Metrics of every logged agent"""
+        return self._cached('agent_metrics', self._metrics_pass)
+    
+    def _metrics_pass(self) -> Dict[int, Dict[str, Any]]:
+        """Compute every agent's metrics in one pass with every shard held"""
+        with self._all_shards():
+            return {agent_id: self._agent_metrics_locked(agent_id) for agent_id in list(self._agents_data)}
+    
+    def _agent_metrics_locked(self, agent_id: int) -> Dict[str, Any]:
+        """Compute one agent's metrics; the caller holds its shard lock, so nothing is copied"""
+        agent_data = self._agents_data.get(agent_id)
+        if agent_data is None:
+            agent_data = ()
         
         # Calculate basic metrics
         total_actions = len(agent_data)
-        high_engagement_count = len([e for e in engagements if e['engagement_level'] == 'high'])
-        death_count = len([e for e in global_events if e['event'] == 'death' and e['agent_id'] == agent_id])
-        retry_count = len([e for e in global_events if e['event'] == 'retry' and e['agent_id'] == agent_id])
+        high_engagement_count = self.high_engagements_by_agent.get(agent_id, 0)
+        death_count = self.deaths_by_agent.get(agent_id, 0)
+        retry_count = self.retries_by_agent.get(agent_id, 0)
         
         # Calculate engagement rate
         engagement_rate = high_engagement_count / max(1, total_actions)
         
-        # Calculate time metrics - handle compact data format (timestamp is first element)
+        # Calculate time metrics
         if agent_data:
-            # agent_data now contains tuples in format (timestamp, action, game_state, agent_id)
-            start_time = agent_data[0][0]  # First element is timestamp
-            end_time = agent_data[-1][0]  # Last element's first item is timestamp
-            total_time = end_time - start_time
+            total_time = agent_data.timestamps[-1] - agent_data.timestamps[0]
         else:
             total_time = 0
             
@@ -189,36 +686,24 @@ class AnalyticsEngine:
     
     def generate_heatmap(self, level: str = "default", output_path: str = None) -> np.ndarray:
         """Generate a heatmap of agent activity in a level"""
+        self._flush_pending()
         with self.lock:
-            if level not in self.heatmap_data:
+            if level not in self.heatmaps:
                 print(f"No heatmap data for level: {level}")
                 return np.array([])
             
-            # Get all coordinates with activity - copy dict to avoid mutation during iteration
-            coords_data = dict(self.heatmap_data[level])
+            level_heatmap = self.heatmaps[level]
+            level_heatmap.flush()
+            if level_heatmap.grid is None:
+                print(f"No activity data for level: {level}")
+                return np.array([])
             
-        coords = list(coords_data.keys())
-        if not coords:
-            print(f"No activity data for level: {level}")
-            return np.array([])
-        
-        # Determine bounds
-        x_coords = [c[0] for c in coords]
-        z_coords = [c[1] for c in coords]
-        
-        min_x, max_x = min(x_coords), max(x_coords)
-        min_z, max_z = min(z_coords), max(z_coords)
+            # Copy the grid so logging can continue while it is visualized
+            heatmap = level_heatmap.grid.astype(np.float64)
+            min_x, min_z = level_heatmap.min_x, level_heatmap.min_z
         
-        # Create grid
-        grid_width = max_x - min_x + 1
-        grid_height = max_z - min_z + 1
-        heatmap = np.zeros((grid_height, grid_width))
-        
-        # Fill grid with activity counts
-        for (x, z), count in coords_data.items():
-            grid_x = x - min_x
-            grid_z = z - min_z
-            heatmap[grid_z, grid_x] = count
+        max_x = min_x + heatmap.shape[1] - 1
+        max_z = min_z + heatmap.shape[0] - 1
         
         # Visualize heatmap if output path provided
         if output_path:
@@ -228,6 +713,10 @@ class AnalyticsEngine:
     
     def _visualize_heatmap(self, heatmap: np.ndarray, min_x: int, max_x: int, min_z: int, max_z: int, output_path: str):
         """Visualize and save the heatmap"""
+        # Imported here so only programs that render a heatmap pay for Matplotlib
+        import matplotlib.pyplot as plt
+        from matplotlib.colors import LinearSegmentedColormap
+        
         plt.figure(figsize=(10, 8))
         
         # Create custom colormap for better visualization
@@ -248,50 +737,50 @@ class AnalyticsEngine:
     
     def analyze_difficulty_spikes(self) -> List[Dict[str, Any]]:
         """Analyze the data to find difficulty spikes based on retry patterns"""
-        # Group events by time windows
         time_window_size = 30  # seconds
-        windows = {}
-        
-        for event in self.global_events:
-            if event['event'] == 'retry':
-                window_id = int(event['timestamp'] // time_window_size)
-                if window_id not in windows:
-                    windows[window_id] = {'retries': 0, 'deaths': 0, 'start_time': window_id * time_window_size}
-                windows[window_id]['retries'] += 1
-            elif event['event'] == 'death':
-                window_id = int(event['timestamp'] // time_window_size)
-                if window_id not in windows:
-                    windows[window_id] = {'retries': 0, 'deaths': 0, 'start_time': window_id * time_window_size}
-                windows[window_id]['deaths'] += 1
-        
-        # Find windows with above-average retry/death rates
-        all_rates = [w['retries'] + w['deaths'] for w in windows.values()]
-        if not all_rates:
+        with self._all_shards():
+            times = [np.frombuffer(t, dtype=np.float64) for t in self._event_times if t]
+            codes = [np.frombuffer(c, dtype=np.int8) for c in self._event_codes if c]
+            times = np.concatenate(times) if times else None
+            codes = np.concatenate(codes) if codes else None
+        if times is None:
             return []
         
-        avg_rate = sum(all_rates) / len(all_rates)
+        # Histogram the deaths and retries of each time window
+        window_ids = (times // time_window_size).astype(np.int64)
+        n_windows = int(window_ids.max()) + 1
+        retries = np.bincount(window_ids[codes == _EVENT_RETRY], minlength=n_windows)
+        deaths = np.bincount(window_ids[codes == _EVENT_DEATH], minlength=n_windows)
+        totals = retries + deaths
+        
+        # Find windows with above-average retry/death rates, averaging over windows with events
+        avg_rate = float(totals[totals > 0].mean())
         threshold = avg_rate * 1.5  # Consider 1.5x average as a spike
         
         difficulty_spikes = []
-        for window_id, window_data in windows.items():
-            if (window_data['retries'] + window_data['deaths']) > threshold:
-                difficulty_spikes.append({
-                    'time_range': (window_data['start_time'], window_data['start_time'] + time_window_size),
-                    'retry_count': window_data['retries'],
-                    'death_count': window_data['deaths'],
-                    'severity': (window_data['retries'] + window_data['deaths']) / max(1, avg_rate)
-                })
+        for window_id in np.flatnonzero(totals > threshold).tolist():
+            start_time = window_id * time_window_size
+            difficulty_spikes.append({
+                'time_range': (start_time, start_time + time_window_size),
+                'retry_count': int(retries[window_id]),
+                'death_count': int(deaths[window_id]),
+                'severity': int(totals[window_id]) / max(1, avg_rate)
+            })
         
         return difficulty_spikes
     
     def generate_comprehensive_analytics(self) -> Dict[str, Any]:
         """Generate comprehensive analytics report"""
+        analytics = self._cached('comprehensive', self._comprehensive_analytics)
+        return dict(analytics, session_duration=time.time() - self.session_start_time)
+    
+    def _comprehensive_analytics(self) -> Dict[str, Any]:
+        """Compute the comprehensive analytics report"""
         # Calculate engagement metrics across all agents
         all_engagement_rates = []
         all_actions_per_second = []
         
-        for agent_id in self.agents_data.keys():
-            metrics = self.get_agent_metrics(agent_id)
+        for metrics in self._compute_all_metrics().values():
             all_engagement_rates.append(metrics['engagement_rate'])
             all_actions_per_second.append(metrics['actions_per_second'])
         
@@ -302,50 +791,68 @@ class AnalyticsEngine:
         # Get difficulty spike analysis
         difficulty_spikes = self.analyze_difficulty_spikes()
         
+        with self._all_shards():
+            total_agents = len(self._agents_data)
+            total_actions = sum(len(data) for data in self._agents_data.values())
+            total_deaths = sum(self.deaths_by_agent.values())
+            total_retries = sum(self.retries_by_agent.values())
+        
         # Count different types of issues
         issue_counts = defaultdict(int)
-        for issue in self.issue_logs:
-            issue_counts[issue['type']] += 1
+        with self.lock:
+            for issue in self.issue_logs:
+                issue_counts[issue['type']] += 1
+            total_issues = len(self.issue_logs)
         
         return {
             'session_duration': time.time() - self.session_start_time,
-            'total_agents': len(self.agents_data),
-            'total_actions': sum(len(data) for data in self.agents_data.values()),
+            'total_agents': total_agents,
+            'total_actions': total_actions,
             'average_engagement_rate': avg_engagement_rate,
             'average_actions_per_second': avg_actions_per_second,
             'difficulty_spikes': difficulty_spikes,
             'issue_counts': dict(issue_counts),
-            'total_issues': len(self.issue_logs),
-            'total_deaths': len([e for e in self.global_events if e['event'] == 'death']),
-            'total_retries': len([e for e in self.global_events if e['event'] == 'retry'])
+            'total_issues': total_issues,
+            'total_deaths': total_deaths,
+            'total_retries': total_retries
         }
     
     def export_data(self, output_path: str):
         """Export all analytics data to JSON file"""
-        # Convert compact data format back to readable format for export
-        readable_agents_data = {}
-        for agent_id, agent_data in self.agents_data.items():
-            readable_agents_data[agent_id] = []
-            for record in agent_data:  # record is (timestamp, action, game_state, agent_id)
-                readable_agents_data[agent_id].append({
-                    'timestamp': record[0],
-                    'action': record[1],
-                    'game_state': record[2],
-                    'agent_id': record[3]
-                })
-        
-        export_data = {
+        sections = {
             'session_start_time': self.session_start_time,
-            'agents_data': readable_agents_data,
             'global_events': self.global_events,
-            'engagement_data': dict(self.engagement_data),
             'issue_logs': self.issue_logs,
             'performance_metrics': self.performance_metrics,
             'comprehensive_analytics': self.generate_comprehensive_analytics()
         }
         
-        with open(output_path, 'w') as f:
-            json.dump(export_data, f, indent=2, default=str)
+        # Per-agent records are streamed one at a time rather than copied into a
+        # readable dict first, so exporting does not double the memory they take
+        with open(output_path, 'wb') as f:
+            f.write(b'{\n')
+            self._write_records(f, 'agents_data', self.agents_data)
+            f.write(b',\n')
+            self._write_records(f, 'engagement_data', self.engagement_data)
+            for key, value in sections.items():
+                f.write(f',\n  "{key}": '.encode('utf-8'))
+                f.write(json.dumps(value, indent=2, default=str).replace('\n', '\n  ').encode('utf-8'))
+            f.write(b'\n}\n')
+    
+    @staticmethod
+    def _write_records(f, key: str, records_by_agent: Dict[int, Any]):
+        """Write a JSON member mapping each agent id to its records, one record per line"""
+        f.write(f'  "{key}": {{'.encode('utf-8'))
+        # Snapshot the agent ids since logging can add agents while this writes
+        for i, (agent_id, records) in enumerate(list(records_by_agent.items())):
+            f.write(f'{"," if i else ""}\n    "{agent_id}": ['.encode('utf-8'))
+            separator = b'\n      '
+            for record in records:
+                f.write(separator)
+                f.write(_encode_record(record))
+                separator = b',\n      '
+            f.write(b'\n    ]')
+        f.write(b'\n  }')
     
     def analyze_agent_behavior_patterns(self) -> Dict[str, Any]:
         """Analyze behavioral patterns across agents"""
@@ -360,15 +867,22 @@ class AnalyticsEngine:
     
     def _get_action_distribution(self) -> Dict[str, Any]:
         """Get distribution of actions across all agents"""
-        action_counts = defaultdict(int)
-        total_actions = 0
+        return self._cached('action_distribution', self._count_actions)
+    
+    def _count_actions(self) -> Dict[str, Any]:
+        """Count every agent's actions"""
+        # Count the interned action ids of every agent at once
+        with self._all_shards():
+            action_ids = [np.frombuffer(log.action_ids, dtype=np.intc) for log in self._agents_data.values()]
+            counts = np.bincount(np.concatenate(action_ids), minlength=len(self._action_names)) \
+                if action_ids else np.zeros(0, dtype=np.intp)
+            action_names = list(self._action_names)
+            # Release the views before the arrays can grow again
+            del action_ids
         
-        for agent_id, agent_data in self.agents_data.items():
-            for record in agent_data:
-                if 'action' in record:
-                    action = record['action']
-                    action_counts[action] += 1
-                    total_actions += 1
+        action_counts = {action_names[action_id]: int(count)
+                         for action_id, count in enumerate(counts.tolist()) if count}
+        total_actions = int(counts.sum())
         
         action_distribution = {
             action: count / total_actions if total_actions > 0 else 0
@@ -376,75 +890,86 @@ class AnalyticsEngine:
         }
         
         return {
-            'counts': dict(action_counts),
+            'counts': action_counts,
             'percentages': action_distribution,
             'total_actions': total_actions
         }
     
     def _identify_behavior_clusters(self) -> List[Dict[str, Any]]:
         """Identify clusters of similar agent behavior"""
-        clusters = []
+        return self._cached('behavior_clusters', self._cluster_agents)
+    
+    def _cluster_agents(self) -> List[Dict[str, Any]]:
+        """Categorize each agent's behavior"""
+        all_metrics = self._compute_all_metrics()
+        n = len(all_metrics)
+        engagement = np.fromiter((m['engagement_rate'] for m in all_metrics.values()), dtype=np.float64, count=n)
+        deaths = np.fromiter((m['deaths'] for m in all_metrics.values()), dtype=np.int64, count=n)
+        retries = np.fromiter((m['retries'] for m in all_metrics.values()), dtype=np.int64, count=n)
         
         # This would use more sophisticated clustering in a real implementation
-        # For now, we'll categorize based on action patterns
-        for agent_id in self.agents_data.keys():
-            metrics = self.get_agent_metrics(agent_id)
-            behavior_profile = {
+        # For now, we'll categorize based on engagement and challenge response;
+        # np.select takes the first matching condition, like an if/elif chain
+        type_codes = np.select(
+            [engagement > 0.7, (deaths > 10) | (retries > 10), engagement < 0.3],
+            [0, 1, 2], default=3
+        )
+        
+        return [
+            {
                 'agent_id': agent_id,
                 'engagement_rate': metrics['engagement_rate'],
                 'deaths': metrics['deaths'],
                 'retries': metrics['retries'],
-                'actions_per_second': metrics['actions_per_second']
+                'actions_per_second': metrics['actions_per_second'],
+                'type': _BEHAVIOR_TYPES[type_code]
             }
-            
-            # Categorize based on engagement and challenge response
-            if behavior_profile['engagement_rate'] > 0.7:
-                behavior_profile['type'] = 'highly_engaged'
-            elif behavior_profile['deaths'] > 10 or behavior_profile['retries'] > 10:
-                behavior_profile['type'] = 'frustrated'
-            elif behavior_profile['engagement_rate'] < 0.3:
-                behavior_profile['type'] = 'disengaged'
-            else:
-                behavior_profile['type'] = 'balanced'
-            
-            clusters.append(behavior_profile)
-        
-        return clusters
+            for (agent_id, metrics), type_code in zip(all_metrics.items(), type_codes.tolist())
+        ]
     
     def _analyze_engagement_patterns(self) -> Dict[str, Any]:
         """Analyze patterns in agent engagement over time"""
-        engagement_over_time = []
-        
+        return self._cached('engagement_patterns', self._engagement_time_series)
+    
+    def _engagement_time_series(self) -> Dict[str, Any]:
+        """Count high engagement events per time window"""
         # Group engagement data by time windows
         time_window_size = 60  # 1 minute windows
-        windows = {}
+        with self._all_shards():
+            times = [np.frombuffer(t, dtype=np.float64) for t in self._engagement_times if t]
+            times = np.concatenate(times) if times else np.zeros(0)
         
-        for agent_id, engagements in self.engagement_data.items():
-            for record in engagements:
-                window_id = int(record['timestamp'] // time_window_size)
-                if window_id not in windows:
-                    windows[window_id] = {'high_engagement': 0, 'start_time': window_id * time_window_size}
-                windows[window_id]['high_engagement'] += 1
+        # Windows with any engagement in time order, and their counts
+        window_ids, counts = np.unique((times // time_window_size).astype(np.int64), return_counts=True)
         
         # Convert to time series data
-        for window_id, data in sorted(windows.items()):
-            engagement_over_time.append({
-                'time_range': (data['start_time'], data['start_time'] + time_window_size),
-                'high_engagement_count': data['high_engagement']
-            })
+        engagement_over_time = [
+            {
+                'time_range': (window_id * time_window_size, window_id * time_window_size + time_window_size),
+                'high_engagement_count': count
+            }
+            for window_id, count in zip(window_ids.tolist(), counts.tolist())
+        ]
         
         return {
             'time_series': engagement_over_time,
-            'trend': self._calculate_engagement_trend(engagement_over_time)
+            'trend': self._trend_of_counts(counts)
         }
     
     def _calculate_engagement_trend(self, time_series: List[Dict[str, Any]]) -> str:
         """Calculate the overall trend in engagement"""
-        if len(time_series) < 2:
+        return self._trend_of_counts(
+            np.fromiter((item['high_engagement_count'] for item in time_series), dtype=np.int64, count=len(time_series)))
+    
+    @staticmethod
+    def _trend_of_counts(counts: np.ndarray) -> str:
+        """Compare the mean count of the later half of the windows with the earlier half"""
+        if counts.size < 2:
             return "insufficient_data"
         
-        early_avg = sum(item['high_engagement_count'] for item in time_series[:max(1, len(time_series)//2)]) / max(1, len(time_series)//2)
-        late_avg = sum(item['high_engagement_count'] for item in time_series[len(time_series)//2:]) / len(time_series[len(time_series)//2:])
+        mid = counts.size // 2
+        early_avg = counts[:mid].mean()
+        late_avg = counts[mid:].mean()
         
         if late_avg > early_avg * 1.2:
             return "increasing"
@@ -466,21 +991,21 @@ class AnalyticsEngine:
         """Calculate the rate at which agents are progressing"""
         # This would need to track actual progress objectives
         # For now, using placeholder implementation
-        if not self.agents_data:
+        agents_data = self.agents_data
+        if not agents_data:
             return 0.0
         
         # In a real implementation, this would track level/objective completion
         # For now, using a placeholder based on action count
-        completed_agents = sum(1 for agent_id in self.agents_data.keys() 
-                              if len(self.agents_data[agent_id]) > 50)  # arbitrary threshold
+        completed_agents = sum(1 for agent_data in agents_data.values()
+                              if len(agent_data) > 50)  # arbitrary threshold
         
-        return completed_agents / len(self.agents_data)
+        return completed_agents / len(agents_data)
     
     def _calculate_progression_speed(self) -> Dict[str, Any]:
         """Calculate the speed at which agents progress"""
         speeds = []
-        for agent_id in self.agents_data.keys():
-            metrics = self.get_agent_metrics(agent_id)
+        for metrics in self._compute_all_metrics().values():
             if metrics['total_time'] > 0:
                 # Placeholder: using action count as proxy for progress
                 speed = metrics['total_actions'] / metrics['total_time']
@@ -2,10 +2,130 @@
 Heatmap Generator - Specialized module for creating visual heatmaps from gameplay data
 """
 import numpy as np
-import matplotlib.pyplot as plt
+from functools import lru_cache
 from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.figure import Figure
 from typing import Dict, Tuple, List, Optional
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional, heatmaps are then binned with np.bincount
+    njit = None
+
+
+def _prepare(positions: List[Tuple[float, float]]):
+    """
+    Positions as contiguous x and z columns with their (min_x, min_z) and
+    (max_x, max_z) bounds, found in one min and one max pass over the array
+    """
+    coords = np.ascontiguousarray(positions, dtype=np.float64).reshape(-1, 2)
+    mn, mx = coords.min(axis=0), coords.max(axis=0)
+    return np.ascontiguousarray(coords[:, 0]), np.ascontiguousarray(coords[:, 1]), mn, mx
+
+
+def _grid_cells(positions: List[Tuple[float, float]], grid_size: Tuple[int, int]):
+    """
+    Flat index of the grid cell of every position, clamped to the grid, along with
+    the (min_x, max_x, min_z, max_z) bounds of the positions. Computed once per
+    heatmap and shared by its value and occurrence grids.
+    """
+    xs, zs, (min_x, min_z), (max_x, max_z) = _prepare(positions)
+    
+    # Calculate cell size
+    cell_width = (max_x - min_x) / grid_size[0] if grid_size[0] > 0 else 1
+    cell_height = (max_z - min_z) / grid_size[1] if grid_size[1] > 0 else 1
+    
+    # Convert world coordinates to grid coordinates, clamped to grid bounds
+    if cell_width > 0:
+        grid_x = np.clip(((xs - min_x) / cell_width).astype(np.intp), 0, grid_size[0] - 1)
+    else:
+        grid_x = np.zeros(len(xs), dtype=np.intp)
+    if cell_height > 0:
+        grid_z = np.clip(((zs - min_z) / cell_height).astype(np.intp), 0, grid_size[1] - 1)
+    else:
+        grid_z = np.zeros(len(zs), dtype=np.intp)
+    # Cells are indexed [grid_z, grid_x]; an index outside the grid raises rather than wrapping
+    cells = np.ravel_multi_index((grid_z, grid_x), grid_size)
+    return cells, (float(min_x), float(max_x), float(min_z), float(max_z))
+
+
+def _accumulate(cells: np.ndarray, grid_size: Tuple[int, int],
+                weights: Optional[List[float]] = None) -> np.ndarray:
+    """Sum weights (or count positions) per grid cell with one bincount over flat cell indices"""
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+    counts = np.bincount(cells, weights=weights, minlength=grid_size[0] * grid_size[1])
+    return counts.reshape(grid_size).astype(np.float64, copy=False)
+
+
+def _bin_sum_count(xs, zs, weights, min_x, cell_width, min_z, cell_height, size):
+    """
+    Fused binning kernel for a square size x size grid: one pass over the positions
+    computes each cell index and adds to both the weight-sum and count grids.
+    Cell indices match _grid_cells exactly (same division, truncation and clamping).
+    """
+    sums = np.zeros((size, size))
+    counts = np.zeros((size, size))
+    for i in range(xs.shape[0]):
+        grid_x = 0
+        grid_z = 0
+        if cell_width > 0:
+            grid_x = min(max(int((xs[i] - min_x) / cell_width), 0), size - 1)
+        if cell_height > 0:
+            grid_z = min(max(int((zs[i] - min_z) / cell_height), 0), size - 1)
+        sums[grid_z, grid_x] += weights[i]
+        counts[grid_z, grid_x] += 1.0
+    return sums, counts
+
+
+if njit is not None:
+    # Compiled on first use and cached on disk so later runs skip the compile.
+    # Kept serial: a parallel loop would race on shared cells and reorder the sums.
+    _bin_sum_count = njit(cache=True)(_bin_sum_count)
+
+
+def _binned(positions: List[Tuple[float, float]], grid_size: Tuple[int, int],
+            weights: Optional[List[float]] = None):
+    """
+    Per-cell weight sums (each position weighs 1.0 without weights) and position
+    counts, along with the (min_x, max_x, min_z, max_z) bounds of the positions.
+    Uses the compiled kernel for square grids when numba is installed.
+    """
+    if njit is None or grid_size[0] != grid_size[1] or grid_size[0] <= 0:
+        cells, bounds = _grid_cells(positions, grid_size)
+        counts = _accumulate(cells, grid_size)
+        sums = counts if weights is None else _accumulate(cells, grid_size, weights)
+        return sums, counts, bounds
+
+    xs, zs, (min_x, min_z), (max_x, max_z) = _prepare(positions)
+    cell_width = (max_x - min_x) / grid_size[0]
+    cell_height = (max_z - min_z) / grid_size[1]
+    if weights is None:
+        weights = np.ones(len(xs))
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+    sums, counts = _bin_sum_count(xs, zs, weights, min_x, cell_width, min_z, cell_height, grid_size[0])
+    return sums, counts, (float(min_x), float(max_x), float(min_z), float(max_z))
+
+
+# zlib level for saved PNGs; level 1 encodes several times faster than the default
+# 6 for somewhat larger files, the better tradeoff for report images
+HEATMAP_PNG_COMPRESS_LEVEL = 1
+
+# Colormap stops of each heatmap title; other titles use the Activity colors
+_HEATMAP_COLORS = {
+    "Difficulty": ['skyblue', 'yellow', 'orange', 'red', 'darkred'],
+    "Engagement": ['lightgray', 'lightgreen', 'yellow', 'orange', 'darkred'],
+    "Activity": ['white', 'lightblue', 'blue', 'purple', 'darkred'],
+}
+
+
+@lru_cache(maxsize=None)
+def _colormap(title: str) -> LinearSegmentedColormap:
+    """Custom 256-entry colormap of a heatmap title, built once per title"""
+    colors = _HEATMAP_COLORS.get(title, _HEATMAP_COLORS["Activity"])
+    return LinearSegmentedColormap.from_list('custom', colors, N=256)
+
 
 class HeatmapGenerator:
     """
@@ -14,6 +134,11 @@ class HeatmapGenerator:
     
     def __init__(self):
         self.heatmap_data = {}
+        # Figure reused by every saved heatmap, created on the first save
+        self._figure = None
+        if njit is not None:
+            # Compile (or load from the disk cache) the binning kernel before the first heatmap
+            _binned([(0.0, 0.0)], (1, 1))
     
     def create_activity_heatmap(
         self, 
@@ -32,41 +157,8 @@ class HeatmapGenerator:
             output_path: Where to save the heatmap image
         """
         if not positions:
-            return np.zeros((1, 1))
-        
-        # Normalize positions to fit in grid
-        xs = [p[0] for p in positions]
-        zs = [p[1] for p in positions]
-        
-        min_x, max_x = min(xs), max(xs)
-        min_z, max_z = min(zs), max(zs)
-        
-        # Create grid
-        heatmap = np.zeros(grid_size)
-        
-        # Calculate cell size
-        cell_width = (max_x - min_x) / grid_size[0] if grid_size[0] > 0 else 1
-        cell_height = (max_z - min_z) / grid_size[1] if grid_size[1] > 0 else 1
-        
-        # Populate heatmap grid
-        for i, (x, z) in enumerate(positions):
-            # Convert world coordinates to grid coordinates
-            grid_x = int((x - min_x) / cell_width) if cell_width > 0 else 0
-            grid_z = int((z - min_z) / cell_height) if cell_height > 0 else 0
-            
-            # Clamp to grid bounds
-            grid_x = max(0, min(grid_x, grid_size[0] - 1))
-            grid_z = max(0, min(grid_z, grid_size[1] - 1))
-            
-            # Add weight if provided
-            weight = weights[i] if weights else 1.0
-            heatmap[grid_z, grid_x] += weight
-        
-        # Visualize if output path provided
-        if output_path:
-            self._visualize_heatmap(heatmap, min_x, max_x, min_z, max_z, output_path, "Activity")
-        
-        return heatmap
+            return np.zeros((1, 1), dtype=np.float32)
+        return self._build_heatmap(positions, weights if weights else None, grid_size, "sum", output_path, "Activity")
     
     def create_difficulty_heatmap(
         self, 
@@ -85,56 +177,8 @@ class HeatmapGenerator:
             output_path: Where to save the heatmap image
         """
         if not positions or len(positions) != len(difficulty_scores):
-            return np.zeros((1, 1))
-        
-        # Normalize positions to fit in grid
-        xs = [p[0] for p in positions]
-        zs = [p[1] for p in positions]
-        
-        min_x, max_x = min(xs), max(xs)
-        min_z, max_z = min(zs), max(zs)
-        
-        # Create grid
-        heatmap = np.zeros(grid_size)
-        
-        # Calculate cell size
-        cell_width = (max_x - min_x) / grid_size[0] if grid_size[0] > 0 else 1
-        cell_height = (max_z - min_z) / grid_size[1] if grid_size[1] > 0 else 1
-        
-        # Populate heatmap grid with difficulty scores
-        for i, (x, z) in enumerate(positions):
-            # Convert world coordinates to grid coordinates
-            grid_x = int((x - min_x) / cell_width) if cell_width > 0 else 0
-            grid_z = int((z - min_z) / cell_height) if cell_height > 0 else 0
-            
-            # Clamp to grid bounds
-            grid_x = max(0, min(grid_x, grid_size[0] - 1))
-            grid_z = max(0, min(grid_z, grid_size[1] - 1))
-            
-            # Add difficulty score for this cell
-            heatmap[grid_z, grid_x] += difficulty_scores[i]
-        
-        # Apply normalization to average scores per cell
-        # Count occurrences to compute average
-        occurrence_grid = np.zeros(grid_size)
-        for i, (x, z) in enumerate(positions):
-            grid_x = int((x - min_x) / cell_width) if cell_width > 0 else 0
-            grid_z = int((z - min_z) / cell_height) if cell_height > 0 else 0
-            
-            grid_x = max(0, min(grid_x, grid_size[0] - 1))
-            grid_z = max(0, min(grid_z, grid_size[1] - 1))
-            
-            occurrence_grid[grid_z, grid_x] += 1
-        
-        # Calculate average difficulty per cell
-        with np.errstate(divide='ignore', invalid='ignore'):
-            heatmap = np.divide(heatmap, occurrence_grid, out=np.zeros_like(heatmap), where=occurrence_grid!=0)
-        
-        # Visualize if output path provided
-        if output_path:
-            self._visualize_heatmap(heatmap, min_x, max_x, min_z, max_z, output_path, "Difficulty")
-        
-        return heatmap
+            return np.zeros((1, 1), dtype=np.float32)
+        return self._build_heatmap(positions, difficulty_scores, grid_size, "mean", output_path, "Difficulty")
     
     def create_engagement_heatmap(
         self, 
@@ -153,53 +197,37 @@ class HeatmapGenerator:
             output_path: Where to save the heatmap image
         """
         if not positions or len(positions) != len(engagement_levels):
-            return np.zeros((1, 1))
-        
-        # Normalize positions to fit in grid
-        xs = [p[0] for p in positions]
-        zs = [p[1] for p in positions]
-        
-        min_x, max_x = min(xs), max(xs)
-        min_z, max_z = min(zs), max(zs)
-        
-        # Create grid
-        heatmap = np.zeros(grid_size)
-        
-        # Calculate cell size
-        cell_width = (max_x - min_x) / grid_size[0] if grid_size[0] > 0 else 1
-        cell_height = (max_z - min_z) / grid_size[1] if grid_size[1] > 0 else 1
-        
-        # Populate heatmap grid with engagement levels
-        for i, (x, z) in enumerate(positions):
-            # Convert world coordinates to grid coordinates
-            grid_x = int((x - min_x) / cell_width) if cell_width > 0 else 0
-            grid_z = int((z - min_z) / cell_height) if cell_height > 0 else 0
-            
-            # Clamp to grid bounds
-            grid_x = max(0, min(grid_x, grid_size[0] - 1))
-            grid_z = max(0, min(grid_z, grid_size[1] - 1))
-            
-            # Add engagement level to this cell
-            heatmap[grid_z, grid_x] += engagement_levels[i]
-        
-        # Apply normalization to average scores per cell
-        occurrence_grid = np.zeros(grid_size)
-        for i, (x, z) in enumerate(positions):
-            grid_x = int((x - min_x) / cell_width) if cell_width > 0 else 0
-            grid_z = int((z - min_z) / cell_height) if cell_height > 0 else 0
-            
-            grid_x = max(0, min(grid_x, grid_size[0] - 1))
-            grid_z = max(0, min(grid_z, grid_size[1] - 1))
-            
-            occurrence_grid[grid_z, grid_x] += 1
+            return np.zeros((1, 1), dtype=np.float32)
+        return self._build_heatmap(positions, engagement_levels, grid_size, "mean", output_path, "Engagement")
+    
+    def _build_heatmap(
+        self,
+        positions: List[Tuple[float, float]],
+        values: Optional[List[float]],
+        grid_size: Tuple[int, int],
+        reduction: str,
+        output_path: Optional[str],
+        title: str
+    ) -> np.ndarray:
+        """
+        Shared implementation of the heatmap methods. Bins the positions once, then
+        reduces each cell to the sum of its values ("sum", positions count 1.0 each
+        without values) or their average ("mean").
+        """
+        # Normalize positions to the grid, summing values and counting occurrences per cell in one pass
+        heatmap, occurrence_grid, (min_x, max_x, min_z, max_z) = _binned(positions, grid_size, values)
         
-        # Calculate average engagement per cell
-        with np.errstate(divide='ignore', invalid='ignore'):
-            heatmap = np.divide(heatmap, occurrence_grid, out=np.zeros_like(heatmap), where=occurrence_grid!=0)
+        if reduction == "mean":
+            with np.errstate(divide='ignore', invalid='ignore'):
+                heatmap = np.divide(heatmap, occurrence_grid, out=np.zeros_like(heatmap), where=occurrence_grid!=0)
+        elif reduction != "sum":
+            raise ValueError(f"Unknown heatmap reduction: {reduction}")
+        # Cells are binned and reduced in float64 for exact sums; the map is kept as float32
+        heatmap = heatmap.astype(np.float32)
         
         # Visualize if output path provided
         if output_path:
-            self._visualize_heatmap(heatmap, min_x, max_x, min_z, max_z, output_path, "Engagement")
+            self._visualize_heatmap(heatmap, min_x, max_x, min_z, max_z, output_path, title)
         
         return heatmap
     
@@ -214,38 +242,47 @@ class HeatmapGenerator:
         title: str
     ):
         """Private method to visualize and save a heatmap"""
-        plt.figure(figsize=(12, 8))
-        
-        # Create custom colormap
-        if title == "Difficulty":
-            colors = ['skyblue', 'yellow', 'orange', 'red', 'darkred']
-        elif title == "Engagement":
-            colors = ['lightgray', 'lightgreen', 'yellow', 'orange', 'darkred']
-        else:  # Activity
-            colors = ['white', 'lightblue', 'blue', 'purple', 'darkred']
-        
-        n_bins = 256
-        cmap = LinearSegmentedColormap.from_list('custom', colors, N=n_bins)
+        fig = self._clear_figure()
+        ax = fig.add_subplot(111)
         
         # Plot heatmap
-        im = plt.imshow(
+        im = ax.imshow(
             heatmap, 
             extent=[min_x, max_x, min_z, max_z], 
             origin='lower', 
-            cmap=cmap, 
+            cmap=_colormap(title), 
             aspect='auto',
             vmin=0,  # Explicitly set min value
             vmax=heatmap.max() if heatmap.max() > 0 else 1  # Handle case where all values are 0
         )
         
-        plt.colorbar(im, label=f'{title} Level')
-        plt.title(f'{title} Heatmap')
-        plt.xlabel('X Coordinate')
-        plt.ylabel('Z Coordinate')
+        fig.colorbar(im, ax=ax, label=f'{title} Level')
+        ax.set_title(f'{title} Heatmap')
+        ax.set_xlabel('X Coordinate')
+        ax.set_ylabel('Z Coordinate')
         
         # Save the plot
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save_figure(fig, output_path)
+    
+    @staticmethod
+    def _save_figure(fig: Figure, output_path: str):
+        """Save at 300 dpi, with fast PNG compression when saving a PNG"""
+        if str(output_path).lower().endswith('.png'):
+            fig.savefig(output_path, dpi=300, bbox_inches='tight',
+                        pil_kwargs={'compress_level': HEATMAP_PNG_COMPRESS_LEVEL})
+        else:
+            fig.savefig(output_path, dpi=300, bbox_inches='tight')
+    
+    def _clear_figure(self) -> Figure:
+        """
+        The shared figure, emptied for the next plot. Built with the object-oriented
+        API, so saving never goes through pyplot's figure manager or GUI backend.
+        """
+        if self._figure is None:
+            self._figure = Figure(figsize=(12, 8))
+        else:
+            self._figure.clear()
+        return self._figure
     
     def combine_heatmaps(
         self, 
@@ -257,42 +294,34 @@ class HeatmapGenerator:
         """
         Combine multiple heatmaps into a single visualization showing all metrics
         """
-        # Determine the size of the combined map
-        max_height = max(activity_map.shape[0], difficulty_map.shape[0], engagement_map.shape[0])
-        max_width = max(activity_map.shape[1], difficulty_map.shape[1], engagement_map.shape[1])
-        
-        # Create a combined map using weighted average
-        combined = np.zeros((max_height, max_width, 3))  # RGB channels
-        
-        # Normalize each heatmap to 0-1 range
-        def normalize(heatmap):
-            if heatmap.max() == 0:
-                return heatmap
-            return (heatmap - heatmap.min()) / (heatmap.max() - heatmap.min())
-        
-        # Pad heatmaps to same size if needed
-        def pad_to_size(heatmap, target_shape):
-            padded = np.zeros(target_shape)
-            padded[:heatmap.shape[0], :heatmap.shape[1]] = heatmap
-            return padded
-        
-        target_shape = (max_height, max_width)
-        norm_activity = normalize(pad_to_size(activity_map, target_shape))
-        norm_difficulty = normalize(pad_to_size(difficulty_map, target_shape))
-        norm_engagement = normalize(pad_to_size(engagement_map, target_shape))
-        
-        # Assign to RGB channels
-        combined[:, :, 0] = norm_activity    # Red channel - Activity
-        combined[:, :, 1] = norm_engagement # Green channel - Engagement
-        combined[:, :, 2] = norm_difficulty # Blue channel - Difficulty
+        # RGB channels: Red - Activity, Green - Engagement, Blue - Difficulty
+        maps = (activity_map, engagement_map, difficulty_map)
+        if activity_map.shape == difficulty_map.shape == engagement_map.shape:
+            combined = np.stack(maps, axis=-1).astype(np.float32, copy=False)
+        else:
+            # Pad heatmaps with zeros to the largest size
+            max_height = max(heatmap.shape[0] for heatmap in maps)
+            max_width = max(heatmap.shape[1] for heatmap in maps)
+            combined = np.zeros((max_height, max_width, 3), dtype=np.float32)
+            for channel, heatmap in enumerate(maps):
+                combined[:heatmap.shape[0], :heatmap.shape[1], channel] = heatmap
+        max_height, max_width = combined.shape[:2]
+        
+        # Normalize each channel to 0-1 range in place; all-zero maps are left as
+        # they are and constant maps normalize to 0
+        lows = combined.min(axis=(0, 1))
+        highs = combined.max(axis=(0, 1))
+        spans = highs - lows
+        combined -= np.where(highs != 0, lows, 0).astype(np.float32)
+        combined /= np.where((highs != 0) & (spans > 0), spans, 1).astype(np.float32)
         
         if output_path:
-            plt.figure(figsize=(12, 8))
-            plt.imshow(combined, extent=[0, max_width, 0, max_height], origin='lower', aspect='auto')
-            plt.title('Combined Metrics: RGB = Activity/Engagement/Difficulty')
-            plt.xlabel('Grid X')
-            plt.ylabel('Grid Z')
-            plt.savefig(output_path, dpi=300, bbox_inches='tight')
-            plt.close()
+            fig = self._clear_figure()
+            ax = fig.add_subplot(111)
+            ax.imshow(combined, extent=[0, max_width, 0, max_height], origin='lower', aspect='auto')
+            ax.set_title('Combined Metrics: RGB = Activity/Engagement/Difficulty')
+            ax.set_xlabel('Grid X')
+            ax.set_ylabel('Grid Z')
+            self._save_figure(fig, output_path)
         
         return combined
\ No newline at end of file
@@ -1,55 +1,118 @@
 import time
-from typing import Dict, Tuple
-from dataclasses import dataclass
+from typing import Dict, List, Tuple, Sequence
+import numpy as np
+from .spatial_hash import SpatialHashGrid, SPATIAL_CELL_SIZE
+
+# Squared distance an agent must move between updates to not count as stuck (0.1 ** 2)
+_MIN_MOVE_SQ = 0.01
+
+# Rows allocated up front; the state arrays double whenever they fill up
+_INITIAL_CAPACITY = 64
 
-@dataclass
 class AgentState:
-    position: Tuple[float, float, float]
-    last_update: float
-    stuck_duration: float = 0
+    __slots__ = ('position', 'last_update', 'stuck_duration')
+
+    def __init__(self, position: Tuple[float, float, float], last_update: float, stuck_duration: float = 0):
+        self.position = position
+        self.last_update = last_update
+        self.stuck_duration = stuck_duration
 
 class RealtimeDetector:
-    def __init__(self, stuck_threshold: float = 30.0):
+    """
+    Tracks agent movement as parallel arrays with one row per agent, so a whole
+    swarm is checked for soft-locks in one vectorized pass by update_batch().
+    A spatial hash of the latest positions answers nearby_stuck() queries.
+    """
+
+    def __init__(self, stuck_threshold: float = 30.0, cell_size: float = SPATIAL_CELL_SIZE):
         self.stuck_threshold = stuck_threshold
-        self.agent_states: Dict[str, AgentState] = {}
+        self._grid = SpatialHashGrid(cell_size)
         self.anomalies = []
-        
-    def update_agent(self, agent_id: str, position: Tuple[float, float, float]):
-        """Update agent position and detect if stuck"""
-        current_time = time.time()
-        
-        if agent_id not in self.agent_states:
-            self.agent_states[agent_id] = AgentState(position, current_time)
-            return False
-            
-        prev_state = self.agent_states[agent_id]
-        
-        # Check if position changed significantly
-        distance = sum((a - b) ** 2 for a, b in zip(position, prev_state.position)) ** 0.5
-        
-        if distance < 0.1:  # Barely moved
-            prev_state.stuck_duration += current_time - prev_state.last_update
-        else:
-            prev_state.stuck_duration = 0
-            
-        prev_state.position = position
-        prev_state.last_update = current_time
-        
-        # Detect soft-lock
-        if prev_state.stuck_duration > self.stuck_threshold:
+        self._id_to_idx: Dict[str, int] = {}
+        self._positions = np.zeros((_INITIAL_CAPACITY, 3))
+        self._last_update = np.zeros(_INITIAL_CAPACITY)
+        self._stuck = np.zeros(_INITIAL_CAPACITY)
+
+    @property
+    def agent_states(self) -> Dict[str, AgentState]:
+        """Copy of each agent's tracked state"""
+        return {
+            agent_id: AgentState(tuple(self._positions[idx].tolist()), float(self._last_update[idx]),
+                                 float(self._stuck[idx]))
+            for agent_id, idx in self._id_to_idx.items()
+        }
+
+    def _add_agent(self, agent_id: str) -> int:
+        """Assign the next row to a new agent, doubling the arrays when full"""
+        idx = len(self._id_to_idx)
+        if idx == len(self._stuck):
+            capacity = 2 * idx
+            self._positions = np.resize(self._positions, (capacity, 3))
+            self._last_update = np.resize(self._last_update, capacity)
+            self._stuck = np.resize(self._stuck, capacity)
+        self._stuck[idx] = 0.0
+        self._id_to_idx[agent_id] = idx
+        return idx
+
+    def update_batch(self, agent_ids: Sequence[str], positions: Sequence[Tuple[float, float, float]],
+                     current_time: float = None) -> np.ndarray:
+        """
+        Update the positions of many agents at once and detect which are stuck.
+        Each agent should appear at most once per batch. Returns a boolean array,
+        True where that agent just exceeded the stuck threshold.
+        """
+        if current_time is None:
+            current_time = time.time()
+        new_positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        idxs = np.empty(len(agent_ids), dtype=np.intp)
+        is_new = np.zeros(len(agent_ids), dtype=bool)
+        for i, agent_id in enumerate(agent_ids):
+            idx = self._id_to_idx.get(agent_id)
+            if idx is None:
+                idx = self._add_agent(agent_id)
+                is_new[i] = True
+            idxs[i] = idx
+
+        # Check if positions changed significantly, comparing squared distances to skip the sqrt
+        diff = new_positions - self._positions[idxs]
+        moved = np.einsum('ij,ij->i', diff, diff) >= _MIN_MOVE_SQ
+        stuck = np.where(moved, 0.0, self._stuck[idxs] + (current_time - self._last_update[idxs]))
+        stuck[is_new] = 0.0
+
+        self._stuck[idxs] = stuck
+        self._positions[idxs] = new_positions
+        self._last_update[idxs] = current_time
+        for agent_id, position in zip(agent_ids, new_positions.tolist()):
+            self._grid.move(agent_id, position)
+
+        # Detect soft-locks; agents seen for the first time have nothing to compare against
+        flagged = (stuck > self.stuck_threshold) & ~is_new
+        for i in np.flatnonzero(flagged):
             self.anomalies.append({
                 'type': 'soft_lock',
-                'agent_id': agent_id,
-                'position': position,
-                'duration': prev_state.stuck_duration,
+                'agent_id': agent_ids[i],
+                'position': tuple(new_positions[i].tolist()),
+                'duration': float(stuck[i]),
                 'timestamp': current_time
             })
-            return True
-            
-        return False
-    
+        return flagged
+
+    def update_agent(self, agent_id: str, position: Tuple[float, float, float]):
+        """Update agent position and detect if stuck"""
+        return bool(self.update_batch((agent_id,), (position,))[0])
+
+    def nearby_stuck(self, agent_id: str, radius: float) -> List[str]:
+        """Other agents within radius of agent_id (on the x/z plane) that are past the stuck threshold"""
+        idx = self._id_to_idx.get(agent_id)
+        if idx is None:
+            return []
+        return [
+            other for other in self._grid.query_radius(self._positions[idx].tolist(), radius)
+            if other != agent_id and self._stuck[self._id_to_idx[other]] > self.stuck_threshold
+        ]
+
     def should_stop_test(self) -> bool:
         """Check if test should be stopped due to anomalies"""
-        stuck_agents = sum(1 for state in self.agent_states.values() 
-                          if state.stuck_duration > self.stuck_threshold)
-        return stuck_agents > len(self.agent_states) * 0.5  # >50% stuck
+        n_agents = len(self._id_to_idx)
+        stuck_agents = np.count_nonzero(self._stuck[:n_agents] > self.stuck_threshold)
+        return stuck_agents > n_agents * 0.5  # >50% stuck
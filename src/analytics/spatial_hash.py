@@ -0,0 +1,74 @@
+"""
+Spatial Hash - Uniform grid over the ground plane for neighborhood queries
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Hashable, List, Set, Tuple
+
+# Default cell edge in world units, sized so a cell holds a few dozen agents at most
+SPATIAL_CELL_SIZE = 10.0
+
+
+class SpatialHashGrid:
+    """
+    Buckets items by the (x, z) cell of their (x, y, z) position, so a radius query
+    only visits the cells overlapping the query circle instead of every item
+    """
+
+    def __init__(self, cell_size: float = SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = defaultdict(set)
+        # Each item's cell and (x, z) position
+        self._items: Dict[Hashable, Tuple[Tuple[int, int], float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _cell(self, x: float, z: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(z / self.cell_size)
+
+    def insert(self, item_id: Hashable, position: Tuple[float, float, float]):
+        """Add an item, or move it if it is already in the grid"""
+        self.move(item_id, position)
+
+    def move(self, item_id: Hashable, position: Tuple[float, float, float]):
+        """Update an item's position, changing buckets only when it crosses a cell edge"""
+        x, z = position[0], position[2]
+        cell = self._cell(x, z)
+        entry = self._items.get(item_id)
+        if entry is not None and entry[0] != cell:
+            self._discard(item_id, entry[0])
+        if entry is None or entry[0] != cell:
+            self._cells[cell].add(item_id)
+        self._items[item_id] = (cell, x, z)
+
+    def remove(self, item_id: Hashable):
+        """Drop an item from the grid; unknown items are ignored"""
+        entry = self._items.pop(item_id, None)
+        if entry is not None:
+            self._discard(item_id, entry[0])
+
+    def _discard(self, item_id: Hashable, cell: Tuple[int, int]):
+        bucket = self._cells[cell]
+        bucket.discard(item_id)
+        if not bucket:
+            del self._cells[cell]
+
+    def query_radius(self, position: Tuple[float, float, float], radius: float) -> List[Hashable]:
+        """Items within radius of position on the (x, z) plane"""
+        x, z = position[0], position[2]
+        min_cx, min_cz = self._cell(x - radius, z - radius)
+        max_cx, max_cz = self._cell(x + radius, z + radius)
+        radius_sq = radius * radius
+        found = []
+        for cx in range(min_cx, max_cx + 1):
+            for cz in range(min_cz, max_cz + 1):
+                bucket = self._cells.get((cx, cz))
+                if not bucket:
+                    continue
+                for item_id in bucket:
+                    _, ix, iz = self._items[item_id]
+                    dx, dz = ix - x, iz - z
+                    if dx * dx + dz * dz <= radius_sq:
+                        found.append(item_id)
+        return found
@@ -4,6 +4,7 @@ from agents.personalities import PersonalityAgent, AgentPersonality
 from agents.async_agent_manager import AsyncAgentManager
 from unity_integration.websocket_client import WebSocketClient
 from analytics.realtime_detector import RealtimeDetector
+from utils.event_loop import use_uvloop
 
 async def main():
     parser = argparse.ArgumentParser()
@@ -24,6 +25,7 @@ async def main():
     client = WebSocketClient(args.host, args.port)
     manager = AsyncAgentManager(agents, client)
     detector = RealtimeDetector()
+    manager.set_detector(detector)
     
     print(f"Starting {args.agents} agents for {args.duration}s...")
     
@@ -35,4 +37,5 @@ async def main():
         print("Failed to connect to Unity game")
 
 if __name__ == "__main__":
+    use_uvloop()
     asyncio.run(main())
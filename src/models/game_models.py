@@ -1,4 +1,5 @@
-from pydantic import BaseModel, validator
+import math
+from pydantic import BaseModel, field_validator
 from typing import Tuple, Optional
 from enum import Enum
 
@@ -14,22 +15,30 @@ class GameState(BaseModel):
     timestamp: float
     level_name: Optional[str] = None
     
-    @validator('health')
+    @field_validator('health')
+    @classmethod
     def health_bounds(cls, v):
         if not 0 <= v <= 100:
             raise ValueError('Health must be between 0 and 100')
         return v
 
+# Normalized form of a zero-length direction
+_ZERO_DIRECTION = (0.0, 0.0, 0.0)
+
 class Action(BaseModel):
     type: ActionType
     direction: Optional[Tuple[float, float, float]] = None
     target_position: Optional[Tuple[float, float, float]] = None
     agent_id: str
     
-    @validator('direction')
+    @field_validator('direction')
+    @classmethod
     def normalize_direction(cls, v):
         if v is None:
             return v
-        # Normalize direction vector
-        magnitude = sum(x**2 for x in v) ** 0.5
-        return tuple(x / magnitude if magnitude > 0 else 0 for x in v)
+        # Normalize direction vector, unrolled for the fixed three components
+        x, y, z = v
+        magnitude = math.sqrt(x * x + y * y + z * z)
+        if magnitude == 0:
+            return _ZERO_DIRECTION
+        return (x / magnitude, y / magnitude, z / magnitude)
@@ -2,19 +2,97 @@
 LLM Integration - Module for using LLMs to provide qualitative assessment
 """
 import openai
+import asyncio
+import hashlib
+import heapq
 import json
+import os
 import time
+from pathlib import Path
 from typing import Dict, Any, Optional, Union, List
-from ..utils.config import get_api_key
+from ..utils.config import get_api_key, get_llm_model
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, prompts and responses use the stdlib codec without it
+    orjson = None
+
+
+# Default location of cached LLM responses, one JSON file per prompt hash
+LLM_CACHE_DIR = ".llm_cache"
+
+
+def _serialize(data: Dict[str, Any]) -> str:
+    """Compact JSON for prompts; indentation would only cost tokens"""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, separators=(",", ":"), default=str)
+
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the stdlib type
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Limits applied to analytics data before it goes into a prompt
+LLM_MAX_LIST_ITEMS = 50
+LLM_MAX_STRING_LENGTH = 200
+LLM_FLOAT_DIGITS = 2
+
+
+def _summarize_for_llm(data: Any) -> Any:
+    """
+    Shrink analytics data to what an LLM needs: lists longer than LLM_MAX_LIST_ITEMS
+    become summary statistics (numbers) or a count and sample (anything else), floats
+    are rounded and long strings truncated. Prompt size then stays bounded however
+    many ticks, positions or issues a playtest recorded.
+    """
+    if isinstance(data, dict):
+        return {key: _summarize_for_llm(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        if len(data) <= LLM_MAX_LIST_ITEMS:
+            return [_summarize_for_llm(item) for item in data]
+        if all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in data):
+            ordered = sorted(data)
+            n = len(ordered)
+            return {
+                "n": n,
+                "mean": round(sum(ordered) / n, LLM_FLOAT_DIGITS),
+                "p50": _summarize_for_llm(ordered[(n - 1) // 2]),
+                "p95": _summarize_for_llm(ordered[int(0.95 * (n - 1))]),
+                "top5": [_summarize_for_llm(x) for x in heapq.nlargest(5, ordered)]
+            }
+        return {"n": len(data), "sample": [_summarize_for_llm(item) for item in data[:5]]}
+    if isinstance(data, float):
+        return round(data, LLM_FLOAT_DIGITS)
+    if isinstance(data, str) and len(data) > LLM_MAX_STRING_LENGTH:
+        return data[:LLM_MAX_STRING_LENGTH] + "..."
+    return data
+
+
+def _prompt_data(data: Dict[str, Any]) -> str:
+    """Analytics data summarized and serialized for a prompt"""
+    return _serialize(_summarize_for_llm(data))
 
 
 class LLMAnalyzer:
     """
     Uses LLMs to provide qualitative assessment of game fun and engagement.
-    Implements structured prompting and iterative refinement for reliable JSON outputs.
+    JSON outputs are requested in the API's JSON mode, with one corrective follow-up
+    if a response still fails to parse (e.g. when cut off at max_tokens).
+    Successful responses are cached on disk by prompt hash, so repeating an analysis
+    of identical data skips the API call; ttl_seconds (None keeps them forever)
+    limits how long a cached response is reused.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, use_cache: bool = True,
+                 cache_dir: str = LLM_CACHE_DIR, ttl_seconds: Optional[float] = None):
+        self.use_cache = use_cache
+        self._cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.model = get_llm_model()
+        # Created on first query, once the API key is settled; the async client is
+        # shared by concurrent queries on one event loop so they pool connections
+        self._client = None
+        self._async_client = None
         if api_key:
             openai.api_key = api_key
         else:
@@ -26,6 +104,33 @@ class LLMAnalyzer:
                 # Warning: This might fail at runtime if not set
                 pass 
     
+    def _cache_path(self, system_prompt: str, user_prompt: str, expected_format: str) -> Path:
+        key = hashlib.blake2b(
+            f"{self.model}|{expected_format}|{system_prompt}|{user_prompt}".encode(), digest_size=16
+        ).hexdigest()
+        return self._cache_dir / f"{key}.json"
+    
+    def _load_cached(self, path: Path) -> Optional[Union[Dict[str, Any], str]]:
+        """Cached response at path, or None when missing, expired or unreadable"""
+        try:
+            if self.ttl_seconds is not None and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return _loads(f.read())['response']
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def _store_cached(self, path: Path, response: Union[Dict[str, Any], str]):
+        """Write the response atomically so concurrent readers never see a partial file"""
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(_serialize({'response': response}))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not cache LLM response: {e}")
+    
     def _query_llm_with_retry(self, 
                               system_prompt: str, 
                               user_prompt: str, 
@@ -34,40 +139,120 @@ class LLMAnalyzer:
         """
         Execute LLM query with iterative refinement for JSON validation.
         """
+        cache_path = None
+        if self.use_cache:
+            cache_path = self._cache_path(system_prompt, user_prompt, expected_format)
+            cached = self._load_cached(cache_path)
+            if cached is not None:
+                return cached
+        
+        result = self._query_llm(system_prompt, user_prompt, max_retries, expected_format)
+        # Errors are not cached so the next run retries the API
+        if cache_path is not None and not (isinstance(result, dict) and 'error' in result):
+            self._store_cached(cache_path, result)
+        return result
+    
+    async def _aquery_llm_with_retry(self,
+                                     system_prompt: str,
+                                     user_prompt: str,
+                                     max_retries: int = 3,
+                                     expected_format: str = "json") -> Union[Dict[str, Any], str]:
+        """Async version of _query_llm_with_retry, sharing its response cache"""
+        cache_path = None
+        if self.use_cache:
+            cache_path = self._cache_path(system_prompt, user_prompt, expected_format)
+            cached = self._load_cached(cache_path)
+            if cached is not None:
+                return cached
+        
+        result = await self._aquery_llm(system_prompt, user_prompt, max_retries, expected_format)
+        if cache_path is not None and not (isinstance(result, dict) and 'error' in result):
+            self._store_cached(cache_path, result)
+        return result
+    
+    def _new_request(self, system_prompt: str, user_prompt: str, expected_format: str):
+        """Initial messages and the completion parameters of a query"""
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ]
+        request = {"model": self.model, "max_tokens": 1000, "temperature": 0.7}
+        if expected_format == "json":
+            # JSON mode guarantees syntactically valid JSON output
+            request["response_format"] = {"type": "json_object"}
+        return messages, request
+    
+    @staticmethod
+    def _refine(messages: List[Dict[str, str]], content: str, error: json.JSONDecodeError):
+        """Iterative Refinement: Feed the JSON error back to the LLM"""
+        error_message = f"Your previous response was not valid JSON. Error: {str(error)}. \nPlease correct your output to be valid JSON matching the requested format.\n\nPrevious Output:\n{content}"
+        messages.append({"role": "assistant", "content": content})
+        messages.append({"role": "user", "content": error_message})
+    
+    def _query_llm(self, system_prompt: str, user_prompt: str, max_retries: int,
+                   expected_format: str) -> Union[Dict[str, Any], str]:
+        """
+        Query the API, retrying API errors for up to max_retries attempts. A JSON
+        response that fails to parse gets one follow-up with the error fed back.
+        """
+        messages, request = self._new_request(system_prompt, user_prompt, expected_format)
+        refined = False
 
         for attempt in range(max_retries):
             try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=messages,
-                    max_tokens=1000,
-                    temperature=0.7
-                )
+                if self._client is None:
+                    self._client = openai.OpenAI(api_key=openai.api_key)
+                response = self._client.chat.completions.create(messages=messages, **request)
                 content = response.choices[0].message.content.strip()
+            except Exception as e:
+                print(f"LLM API Error on attempt {attempt + 1}: {str(e)}")
+                if attempt == max_retries - 1:
+                    return {"error": f"LLM query failed after {max_retries} attempts", "details": str(e)}
+                time.sleep(1)
+                continue
 
-                if expected_format == "json":
-                    try:
-                        # Attempt to parse JSON
-                        parsed_content = json.loads(content)
-                        return parsed_content
-                    except json.JSONDecodeError as e:
-                        print(f"Attempt {attempt + 1} failed JSON validation: {e}")
-                        # Iterative Refinement: Feed error back to LLM
-                        error_message = f"Your previous response was not valid JSON. Error: {str(e)}. \nPlease correct your output to be valid JSON matching the requested format.\n\nPrevious Output:\n{content}"
-                        messages.append({"role": "assistant", "content": content})
-                        messages.append({"role": "user", "content": error_message})
-                else:
-                    return content
+            if expected_format != "json":
+                return content
+            try:
+                return _loads(content)
+            except json.JSONDecodeError as e:
+                print(f"Attempt {attempt + 1} failed JSON validation: {e}")
+                if refined:
+                    break
+                refined = True
+                self._refine(messages, content, e)
 
+        return {"error": "Failed to generate valid JSON response"}
+    
+    async def _aquery_llm(self, system_prompt: str, user_prompt: str, max_retries: int,
+                          expected_format: str) -> Union[Dict[str, Any], str]:
+        """Async version of _query_llm on the shared AsyncOpenAI client"""
+        messages, request = self._new_request(system_prompt, user_prompt, expected_format)
+        refined = False
+
+        for attempt in range(max_retries):
+            try:
+                if self._async_client is None:
+                    self._async_client = openai.AsyncOpenAI(api_key=openai.api_key)
+                response = await self._async_client.chat.completions.create(messages=messages, **request)
+                content = response.choices[0].message.content.strip()
             except Exception as e:
                 print(f"LLM API Error on attempt {attempt + 1}: {str(e)}")
                 if attempt == max_retries - 1:
                     return {"error": f"LLM query failed after {max_retries} attempts", "details": str(e)}
-                time.sleep(1)
+                await asyncio.sleep(1)
+                continue
+
+            if expected_format != "json":
+                return content
+            try:
+                return _loads(content)
+            except json.JSONDecodeError as e:
+                print(f"Attempt {attempt + 1} failed JSON validation: {e}")
+                if refined:
+                    break
+                refined = True
+                self._refine(messages, content, e)
 
         return {"error": "Failed to generate valid JSON response"}
 
@@ -76,13 +261,22 @@ class LLMAnalyzer:
         Use LLM to assess the fun factor based on structured analytics data.
         Returns a structured dictionary.
         """
+        return self._query_llm_with_retry(*self._fun_factor_prompts(_prompt_data(structured_data)), expected_format="json")
+    
+    async def assess_fun_factor_async(self, structured_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of assess_fun_factor"""
+        return await self._aquery_llm_with_retry(*self._fun_factor_prompts(_prompt_data(structured_data)), expected_format="json")
+    
+    @staticmethod
+    def _fun_factor_prompts(data_str: str):
+        """System and user prompts of assess_fun_factor for serialized data"""
         system_prompt = "You are an expert Game Design Analyst specialized in interpreting telemetry data."
         
         user_prompt = f"""
         TASK: Analyze the provided playtest data to quantify 'Fun Factor' and 'Engagement'.
         
         DATA:
-        {json.dumps(structured_data, indent=2)}
+        {data_str}
 
         CONSTRAINTS:
         1. Output MUST be valid JSON.
@@ -99,21 +293,29 @@ class LLMAnalyzer:
             "ux_issues": ["<str>"]
         }}
         """
-        
-        return self._query_llm_with_retry(system_prompt, user_prompt, expected_format="json")
+        return system_prompt, user_prompt
     
     def suggest_improvements(self, structured_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Use LLM to suggest game improvements based on issues found.
         Returns a structured dictionary.
         """
+        return self._query_llm_with_retry(*self._improvements_prompts(_prompt_data(structured_data)), expected_format="json")
+    
+    async def suggest_improvements_async(self, structured_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of suggest_improvements"""
+        return await self._aquery_llm_with_retry(*self._improvements_prompts(_prompt_data(structured_data)), expected_format="json")
+    
+    @staticmethod
+    def _improvements_prompts(data_str: str):
+        """System and user prompts of suggest_improvements for serialized data"""
         system_prompt = "You are a Senior Gameplay Engineer providing technical feedback."
         
         user_prompt = f"""
         TASK: Review the playtest data and suggest actionable improvements.
         
         DATA:
-        {json.dumps(structured_data, indent=2)}
+        {data_str}
         
         CONSTRAINTS:
         1. Output MUST be valid JSON.
@@ -131,20 +333,28 @@ class LLMAnalyzer:
             "retention_mechanics": ["<str>"]
         }}
         """
-        
-        return self._query_llm_with_retry(system_prompt, user_prompt, expected_format="json")
+        return system_prompt, user_prompt
     
     def generate_narrative_report(self, analytics_data: Dict[str, Any]) -> str:
         """
         Generate a narrative report using LLM to explain the findings in story form.
         """
+        return self._query_llm_with_retry(*self._narrative_prompts(_prompt_data(analytics_data)), expected_format="text")
+    
+    async def generate_narrative_report_async(self, analytics_data: Dict[str, Any]) -> str:
+        """Async version of generate_narrative_report"""
+        return await self._aquery_llm_with_retry(*self._narrative_prompts(_prompt_data(analytics_data)), expected_format="text")
+    
+    @staticmethod
+    def _narrative_prompts(data_str: str):
+        """System and user prompts of generate_narrative_report for serialized data"""
         system_prompt = "You are a creative Game Journalist writing a review based on AI bot experiences."
         
         user_prompt = f"""
         TASK: Convert the raw telemetry below into a compelling narrative story.
         
         DATA:
-        {json.dumps(analytics_data, indent=2)}
+        {data_str}
         
         GUIDELINES:
         1. Write from the perspective of the AI agents.
@@ -152,5 +362,38 @@ class LLMAnalyzer:
         3. Keep it under 300 words.
         4. Use a witty, slightly cynical tone.
         """
-        
-        return self._query_llm_with_retry(system_prompt, user_prompt, expected_format="text")
\ No newline at end of file
+        return system_prompt, user_prompt
+    
+    async def analyze_report_async(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the fun factor, improvement and narrative analyses concurrently, so the
+        report waits for the slowest query rather than the sum of all three.
+        The data is summarized and serialized once and shared by the three prompts.
+        """
+        data_str = _prompt_data(report_data)
+        fun_assessment, improvements, narrative_report = await asyncio.gather(
+            self._aquery_llm_with_retry(*self._fun_factor_prompts(data_str), expected_format="json"),
+            self._aquery_llm_with_retry(*self._improvements_prompts(data_str), expected_format="json"),
+            self._aquery_llm_with_retry(*self._narrative_prompts(data_str), expected_format="text")
+        )
+        return {
+            "fun_assessment": fun_assessment,
+            "improvements": improvements,
+            "narrative_report": narrative_report
+        }
+    
+    def analyze_report(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Blocking analyze_report_async for callers outside an event loop"""
+        async def run():
+            try:
+                return await self.analyze_report_async(report_data)
+            finally:
+                # The client's connections belong to this event loop, which asyncio.run closes
+                await self.close_async()
+        return asyncio.run(run())
+    
+    async def close_async(self):
+        """Close the shared async client; the next async query creates a new one"""
+        if self._async_client is not None:
+            client, self._async_client = self._async_client, None
+            await client.close()
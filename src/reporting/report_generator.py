@@ -3,20 +3,103 @@ Report Generator - Creates structured reports with JSON and human-readable forma
 """
 import json
 import os
+from collections import Counter
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from ..analytics.analytics_engine import AnalyticsEngine
+from ..utils.game_state import StateSnapshot
 from .llm_analyzer import LLMAnalyzer
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, reports are written with the stdlib encoder without it
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Encode types neither JSON encoder knows; logged game state snapshots become dicts"""
+    if isinstance(obj, StateSnapshot):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(obj: Any) -> bytes:
+    """Indented JSON bytes, for files meant to be read by people"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                            | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2, default=_default).encode('utf-8')
+
+
+def _dumps_line(obj: Any) -> bytes:
+    """Compact JSON bytes, for report files and streamed report elements"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+# Issue types reported as anomalies
+ANOMALY_TYPES = frozenset({'softlock', 'infinite_loop', 'crash', 'performance_issue'})
+
+# Report lists that grow with the number of agents or issues; streamed one element at a time
+_STREAMED_LISTS = ('individual_agent_reports', 'detected_issues', 'anomalies')
+
+# Bytes written around streamed report members:
+# (first member, next member, after key, list start, between items, list end, document end)
+_COMPACT_LAYOUT = (b'', b',', b':', b'[', b',', b']', b'}\n')
+_PRETTY_LAYOUT = (b'\n  ', b',\n  ', b': ', b'[\n    ', b',\n    ', b'\n  ]', b'\n}\n')
+
+
+def _stream_json_report(f, report: Dict[str, Any], pretty: bool = False):
+    """
+    Write the report one member at a time, and its per-agent and per-issue lists one
+    element at a time, so the whole document is never serialized in memory at once.
+    Compact by default; pretty indents members and puts each list element on its own line.
+    """
+    first, member_sep, key_sep, list_start, item_sep, list_end, end = _PRETTY_LAYOUT if pretty else _COMPACT_LAYOUT
+    f.write(b'{')
+    for i, (key, value) in enumerate(report.items()):
+        f.write(member_sep if i else first)
+        f.write(_dumps_line(key) + key_sep)
+        if key in _STREAMED_LISTS and value:
+            separator = list_start
+            for item in value:
+                f.write(separator)
+                f.write(_dumps_line(item))
+                separator = item_sep
+            f.write(list_end)
+        elif pretty:
+            f.write(_dumps(value).replace(b'\n', b'\n  '))
+        else:
+            f.write(_dumps_line(value))
+    f.write(end)
+
+
+def _llm_view(report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Shallow view of the report for the LLM: the aggregates, issues and anomalies
+    without the per-agent results, which would dominate the prompt for large swarms
+    """
+    return {key: value for key, value in report.items() if key != 'individual_agent_reports'}
+
+
+def _write_file(path: str, payload: bytes):
+    """Write a fully serialized report file with a single write() call"""
+    with open(path, 'wb') as f:
+        f.write(payload)
+
 
 class ReportGenerator:
     """
     Generates comprehensive reports from playtesting data
     """
     
-    def __init__(self, output_dir: str = "./reports", llm_analyzer: Optional[LLMAnalyzer] = None):
+    def __init__(self, output_dir: str = "./reports", llm_analyzer: Optional[LLMAnalyzer] = None,
+                 pretty_json: bool = False):
         self.output_dir = output_dir
         self.llm_analyzer = llm_analyzer
+        # Also write an indented structured_report.pretty.json for debugging
+        self.pretty_json = pretty_json
         self.ensure_output_directory()
         
     def ensure_output_directory(self):
@@ -25,16 +108,20 @@ class ReportGenerator:
         
     def generate_comprehensive_report(self, test_results: List[Dict[str, Any]]):
         """Generate a comprehensive report from test results"""
-        # Create timestamped report directory
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Create timestamped report directory; the report metadata shares the same time
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         report_dir = os.path.join(self.output_dir, f"report_{timestamp}")
         os.makedirs(report_dir, exist_ok=True)
         
-        # Generate structured JSON report
-        json_report = self.create_json_report(test_results)
+        # Generate structured JSON report, compact since it is read by tools
+        json_report = self.create_json_report(test_results, now)
         json_path = os.path.join(report_dir, "structured_report.json")
-        with open(json_path, 'w') as f:
-            json.dump(json_report, f, indent=2)
+        with open(json_path, 'wb') as f:
+            _stream_json_report(f, json_report)
+        if self.pretty_json:
+            with open(os.path.join(report_dir, "structured_report.pretty.json"), 'wb') as f:
+                _stream_json_report(f, json_report, pretty=True)
         
         # Generate LLM insights if analyzer is available
         llm_insights = {}
@@ -43,21 +130,13 @@ class ReportGenerator:
         if self.llm_analyzer:
             print("Generating LLM insights...")
             try:
-                # Generate structured assessments
-                fun_assessment = self.llm_analyzer.assess_fun_factor(json_report)
-                improvements = self.llm_analyzer.suggest_improvements(json_report)
-                narrative_report = self.llm_analyzer.generate_narrative_report(json_report)
-                
-                llm_insights = {
-                    "fun_assessment": fun_assessment,
-                    "improvements": improvements,
-                    "narrative_report": narrative_report
-                }
+                # Generate structured assessments, querying the LLM concurrently
+                llm_insights = self.llm_analyzer.analyze_report(_llm_view(json_report))
+                narrative_report = llm_insights["narrative_report"]
                 
                 # Save structured LLM insights
                 insights_path = os.path.join(report_dir, "llm_insights.json")
-                with open(insights_path, 'w') as f:
-                    json.dump(llm_insights, f, indent=2)
+                _write_file(insights_path, _dumps_line(llm_insights))
                     
             except Exception as e:
                 print(f"Error generating LLM insights: {e}")
@@ -65,21 +144,29 @@ class ReportGenerator:
         # Generate human-readable report (including LLM narrative if available)
         human_readable_report = self.create_human_readable_report(json_report, narrative_report)
         text_path = os.path.join(report_dir, "human_readable_report.txt")
-        with open(text_path, 'w') as f:
-            f.write(human_readable_report)
+        # Encoded once and written in binary mode, skipping text-mode newline translation
+        _write_file(text_path, human_readable_report.encode('utf-8'))
         
         print(f"Reports generated in: {report_dir}")
         
-    def create_json_report(self, test_results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Create a structured JSON report"""
-        # Aggregate results from all agents
+    def create_json_report(self, test_results: List[Dict[str, Any]],
+                           now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Create a structured JSON report, generated at now (the current time by default)"""
+        # Aggregate results from all agents, counting and partitioning issues in the same pass
         all_issues = []
+        issues_by_type = Counter()
+        anomalies = []
         total_deaths = 0
         total_retries = 0
         total_time = 0
         
         for agent_result in test_results:
-            all_issues.extend(agent_result.get('issues_detected', []))
+            for issue in agent_result.get('issues_detected', ()):
+                all_issues.append(issue)
+                issue_type = issue.get('type', 'unknown')
+                issues_by_type[issue_type] += 1
+                if issue_type in ANOMALY_TYPES:
+                    anomalies.append(issue)
             total_deaths += agent_result.get('deaths', 0)
             total_retries += agent_result.get('retries', 0)
             total_time += agent_result.get('time_spent', 0)
@@ -87,7 +174,7 @@ class ReportGenerator:
         # Create the report structure
         report = {
             'metadata': {
-                'generated_at': datetime.now().isoformat(),
+                'generated_at': (now or datetime.now()).isoformat(),
                 'total_agents': len(test_results),
                 'total_test_time': total_time,
                 'total_deaths': total_deaths,
@@ -96,109 +183,88 @@ class ReportGenerator:
             'individual_agent_reports': test_results,
             'aggregated_metrics': {
                 'total_issues_detected': len(all_issues),
-                'issues_by_type': self._categorize_issues(all_issues),
+                'issues_by_type': dict(issues_by_type),
                 'average_retries_per_agent': total_retries / max(1, len(test_results)),
                 'average_deaths_per_agent': total_deaths / max(1, len(test_results))
             },
             'detected_issues': all_issues,
-            'anomalies': self._extract_anomalies(all_issues)
+            'anomalies': anomalies
         }
         
         return report
     
     def _categorize_issues(self, issues: List[Dict[str, Any]]) -> Dict[str, int]:
         """Count issues by type"""
-        categories = {}
-        for issue in issues:
-            issue_type = issue.get('type', 'unknown')
-            categories[issue_type] = categories.get(issue_type, 0) + 1
-        return categories
+        return dict(Counter(issue.get('type', 'unknown') for issue in issues))
     
     def _extract_anomalies(self, issues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Extract anomalies from issues"""
-        anomalies = []
-        anomaly_types = {'softlock', 'infinite_loop', 'crash', 'performance_issue'}
-        
-        for issue in issues:
-            if issue.get('type') in anomaly_types:
-                anomalies.append(issue)
-        
-        return anomalies
+        return [issue for issue in issues if issue.get('type') in ANOMALY_TYPES]
     
     def create_human_readable_report(self, json_report: Dict[str, Any], narrative_report: str = "") -> str:
         """Create a human-readable report from JSON data"""
-        report_lines = []
-        report_lines.append("AI Playtesting System - Human-Readable Report")
-        report_lines.append("=" * 50)
-        report_lines.append("")
-        
-        # Add metadata
+        # Each section is one multi-line block; a single join builds the report
         metadata = json_report['metadata']
-        report_lines.append("Test Session Summary")
-        report_lines.append("-" * 20)
-        report_lines.append(f"Generated At: {metadata['generated_at']}")
-        report_lines.append(f"Total Agents: {metadata['total_agents']}")
-        report_lines.append(f"Total Test Time: {metadata['total_test_time']:.2f} seconds")
-        report_lines.append(f"Total Deaths: {metadata['total_deaths']}")
-        report_lines.append(f"Total Retries: {metadata['total_retries']}")
-        report_lines.append("")
-        
-        # Add aggregated metrics
         agg_metrics = json_report['aggregated_metrics']
-        report_lines.append("Aggregated Metrics")
-        report_lines.append("-" * 18)
-        report_lines.append(f"Total Issues Detected: {agg_metrics['total_issues_detected']}")
-        report_lines.append(f"Average Retries per Agent: {agg_metrics['average_retries_per_agent']:.2f}")
-        report_lines.append(f"Average Deaths per Agent: {agg_metrics['average_deaths_per_agent']:.2f}")
-        report_lines.append("")
+        parts = [
+            "AI Playtesting System - Human-Readable Report\n"
+            f"{'=' * 50}\n",
+            # Add metadata
+            "Test Session Summary\n"
+            f"{'-' * 20}\n"
+            f"Generated At: {metadata['generated_at']}\n"
+            f"Total Agents: {metadata['total_agents']}\n"
+            f"Total Test Time: {metadata['total_test_time']:.2f} seconds\n"
+            f"Total Deaths: {metadata['total_deaths']}\n"
+            f"Total Retries: {metadata['total_retries']}\n",
+            # Add aggregated metrics
+            "Aggregated Metrics\n"
+            f"{'-' * 18}\n"
+            f"Total Issues Detected: {agg_metrics['total_issues_detected']}\n"
+            f"Average Retries per Agent: {agg_metrics['average_retries_per_agent']:.2f}\n"
+            f"Average Deaths per Agent: {agg_metrics['average_deaths_per_agent']:.2f}\n"
+        ]
         
         # Add issue breakdown
         if agg_metrics['issues_by_type']:
-            report_lines.append("Issues by Type")
-            report_lines.append("-" * 15)
-            for issue_type, count in agg_metrics['issues_by_type'].items():
-                report_lines.append(f"  {issue_type}: {count}")
-            report_lines.append("")
+            parts.append(f"Issues by Type\n{'-' * 15}")
+            parts.extend(f"  {issue_type}: {count}" for issue_type, count in agg_metrics['issues_by_type'].items())
+            parts.append("")
         
         # Add anomalies
         anomalies = json_report['anomalies']
         if anomalies:
-            report_lines.append("Anomalies Detected")
-            report_lines.append("-" * 18)
-            for i, anomaly in enumerate(anomalies, 1):
-                report_lines.append(f"{i}. Type: {anomaly.get('type', 'unknown')}")
-                report_lines.append(f"   Timestamp: {anomaly.get('timestamp', 'unknown')}")
-                report_lines.append(f"   Details: {anomaly.get('details', 'N/A')}")
-                report_lines.append("")
+            parts.append(f"Anomalies Detected\n{'-' * 18}")
+            parts.extend(
+                f"{i}. Type: {anomaly.get('type', 'unknown')}\n"
+                f"   Timestamp: {anomaly.get('timestamp', 'unknown')}\n"
+                f"   Details: {anomaly.get('details', 'N/A')}\n"
+                for i, anomaly in enumerate(anomalies, 1)
+            )
         
         # Add high-level assessment
-        report_lines.append("High-Level Assessment")
-        report_lines.append("-" * 21)
         total_issues = agg_metrics['total_issues_detected']
         if total_issues == 0:
-            report_lines.append("No issues were detected during testing.")
+            issues_assessment = "No issues were detected during testing."
         elif total_issues < 5:
-            report_lines.append("Few issues detected, game appears stable.")
+            issues_assessment = "Few issues detected, game appears stable."
         elif total_issues < 15:
-            report_lines.append("Moderate number of issues detected, review recommended.")
+            issues_assessment = "Moderate number of issues detected, review recommended."
         else:
-            report_lines.append("High number of issues detected, significant review needed.")
+            issues_assessment = "High number of issues detected, significant review needed."
         
         # Add engagement assessment
         avg_retries = agg_metrics['average_retries_per_agent']
         if avg_retries > 3:
-            report_lines.append("High retry rate suggests potential frustration points in the game.")
+            retry_assessment = "High retry rate suggests potential frustration points in the game."
         elif avg_retries > 1:
-            report_lines.append("Moderate retry rate, some challenges may be appropriately difficult.")
+            retry_assessment = "Moderate retry rate, some challenges may be appropriately difficult."
         else:
-            report_lines.append("Low retry rate, game may be too easy or lacking challenge.")
+            retry_assessment = "Low retry rate, game may be too easy or lacking challenge."
+        parts.append(f"High-Level Assessment\n{'-' * 21}\n{issues_assessment}\n{retry_assessment}")
         
         # Append LLM Narrative if available
         if narrative_report:
-            report_lines.append("")
-            report_lines.append("AI Experience Narrative")
-            report_lines.append("-" * 23)
-            report_lines.append(narrative_report)
-            report_lines.append("")
+            parts.append(f"\nAI Experience Narrative\n{'-' * 23}\n{narrative_report}\n")
 
-        return "\n".join(report_lines)
\ No newline at end of file
+        return "\n".join(parts)
\ No newline at end of file
@@ -3,7 +3,60 @@ Swarm Manager - Coordinates agent behavior for realistic multiplayer simulation
 """
 import time
 from typing import List, Dict, Any
+import numpy as np
 from ..agents.base_agent import BaseAgent
+from ..analytics.spatial_hash import SpatialHashGrid
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional, nearby agents are then found with NumPy
+    njit = None
+    prange = range
+
+# Without numba, swarms at least this large find nearby agents through a spatial hash instead of checking every pair
+SWARM_GRID_MIN_AGENTS = 50
+
+
+def _pairs_within(positions, r2):
+    """
+    Index pairs (i < j) of rows of positions closer than sqrt(r2), and their squared
+    distances, in row-major order. Counts each row's hits first so the rows can then
+    be filled in parallel without sharing an output list.
+    """
+    n = positions.shape[0]
+    counts = np.zeros(n, dtype=np.int64)
+    for i in prange(n):
+        hits = 0
+        for j in range(i + 1, n):
+            dx = positions[i, 0] - positions[j, 0]
+            dy = positions[i, 1] - positions[j, 1]
+            dz = positions[i, 2] - positions[j, 2]
+            if dx * dx + dy * dy + dz * dz < r2:
+                hits += 1
+        counts[i] = hits
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(counts)
+    first = np.empty(offsets[n], dtype=np.int64)
+    second = np.empty(offsets[n], dtype=np.int64)
+    d2 = np.empty(offsets[n], dtype=positions.dtype)
+    for i in prange(n):
+        k = offsets[i]
+        for j in range(i + 1, n):
+            dx = positions[i, 0] - positions[j, 0]
+            dy = positions[i, 1] - positions[j, 1]
+            dz = positions[i, 2] - positions[j, 2]
+            dist2 = dx * dx + dy * dy + dz * dz
+            if dist2 < r2:
+                first[k] = i
+                second[k] = j
+                d2[k] = dist2
+                k += 1
+    return first, second, d2
+
+
+if njit is not None:
+    # Compiled on first use and cached on disk so later runs skip the compile
+    _pairs_within = njit(parallel=True, fastmath=True, cache=True)(_pairs_within)
 
 
 class SwarmManager:
@@ -15,14 +68,22 @@ class SwarmManager:
         self.agents = agents
         self.agent_count = len(agents)
         self.interaction_radius = 10.0  # Units within which agents interact
-        self.last_interaction_check = time.time()
+        self.last_interaction_check = time.monotonic()
         self.interaction_interval = 2.0  # Check for interactions every 2 seconds
+        # Latest position of each agent, one row per agent in self.agents order
+        self._positions = np.zeros((self.agent_count, 3), dtype=np.float32)
+        self._grid = SpatialHashGrid(self.interaction_radius)
+        for i in range(self.agent_count):
+            self._grid.insert(i, (0.0, 0.0, 0.0))
+        if njit is not None:
+            # Compile (or load from the disk cache) the pair kernel before the first tick
+            _pairs_within(self._positions[:0], np.float32(1.0))
         
     def update_swarm_state(self):
         """
         Update the state of the swarm considering interactions between agents
         """
-        current_time = time.time()
+        current_time = time.monotonic()
         
         # Only check for interactions periodically to save computation
         if current_time - self.last_interaction_check > self.interaction_interval:
@@ -33,34 +94,49 @@ class SwarmManager:
         """
         Detect when agents are close enough to potentially interact
         """
-        # Get current positions of all agents
-        agent_positions = []
-        for i, agent in enumerate(self.agents):
-            # In a real implementation, this would get actual positions from game state
-            # For now, we'll use a placeholder
-            pos = self._get_agent_position(agent)
-            agent_positions.append((i, pos))
+        first, second, d2 = self._close_pairs()
+        for a, b, distance in zip(first.tolist(), second.tolist(), np.sqrt(d2).tolist()):
+            # Agents are close enough to potentially interact
+            self._handle_agent_interaction(a, b, distance)
+    
+    def _close_pairs(self):
+        """
+        Index pairs (i < j) of agents within the interaction radius and their squared distances
+        """
+        r2 = self.interaction_radius ** 2
+        if njit is not None:
+            return _pairs_within(self._positions, np.float32(r2))
+        
+        if self.agent_count >= SWARM_GRID_MIN_AGENTS:
+            first, second = self._grid_candidate_pairs()
+        else:
+            first, second = np.triu_indices(self.agent_count, k=1)
         
-        # Check for nearby agents
-        for i in range(len(agent_positions)):
-            for j in range(i + 1, len(agent_positions)):
-                agent_idx_1, pos_1 = agent_positions[i]
-                agent_idx_2, pos_2 = agent_positions[j]
-                
-                # Calculate distance between agents
-                distance = self._calculate_distance(pos_1, pos_2)
-                
-                if distance < self.interaction_radius:
-                    # Agents are close enough to potentially interact
-                    self._handle_agent_interaction(agent_idx_1, agent_idx_2, distance)
+        # Distances for all candidate pairs at once
+        diff = self._positions[first] - self._positions[second]
+        d2 = np.einsum('ij,ij->i', diff, diff)
+        close = d2 < r2
+        return first[close], second[close], d2[close]
+    
+    def _grid_candidate_pairs(self):
+        """
+        Index pairs (i < j) whose x/z distance is within the interaction radius,
+        which covers every pair within that radius in 3D
+        """
+        first, second = [], []
+        for i, position in enumerate(self._positions.tolist()):
+            for j in sorted(self._grid.query_radius(position, self.interaction_radius)):
+                if j > i:
+                    first.append(i)
+                    second.append(j)
+        return np.array(first, dtype=np.intp), np.array(second, dtype=np.intp)
     
-    def _get_agent_position(self, agent: BaseAgent) -> tuple:
+    def set_agent_position(self, agent_idx: int, position: tuple):
         """
-        Get the current position of an agent
+        Record an agent's new position; agents call this as they move
         """
-        # In a real implementation, this would interface with Unity to get position
-        # For now, returning a placeholder
-        return (0, 0, 0)
+        self._positions[agent_idx] = position
+        self._grid.move(agent_idx, self._positions[agent_idx].tolist())
     
     def _calculate_distance(self, pos1: tuple, pos2: tuple) -> float:
         """
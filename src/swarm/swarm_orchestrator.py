@@ -24,6 +24,7 @@ class SwarmOrchestrator:
         self.agents: List[BaseAgent] = []
         self.results: List[Dict[str, Any]] = []
         self.running = False
+        self._stop_event = threading.Event()
         
     def initialize_agents(self):
         """Initialize the required number of agents for swarm testing"""
@@ -53,24 +54,30 @@ class SwarmOrchestrator:
         print(f"Starting swarm test with {self.num_agents} agents")
         self.initialize_agents()
         self.running = True
+        self._stop_event.clear()
         
         # Start all agents in separate threads
         threads = []
         for agent in self.agents:
-            thread = threading.Thread(target=agent.run)
+            thread = threading.Thread(target=agent.run, daemon=True)
             thread.start()
             threads.append(thread)
         
-        # Let agents run for the specified duration
+        # Let agents run for the specified duration, or until stop_agents is called
         print(f"Running swarm test for {self.duration} seconds...")
-        time.sleep(self.duration)
+        self._stop_event.wait(self.duration)
         
-        # Stop all agents
+        # Stop all agents and close the connection so no worker stays blocked on Unity
         self.stop_agents()
+        self.unity_manager.cleanup()
         
-        # Wait for all threads to finish
+        # Agents exit on their next tick; join them all against one shared deadline
+        deadline = time.time() + 5
         for thread in threads:
-            thread.join()
+            thread.join(max(0.0, deadline - time.time()))
+        stragglers = sum(1 for thread in threads if thread.is_alive())
+        if stragglers:
+            print(f"Warning: {stragglers} agent threads did not finish gracefully")
         
         # Collect results
         self.results = [agent.get_results() for agent in self.agents]
@@ -92,6 +99,7 @@ class SwarmOrchestrator:
     def stop_agents(self):
         """Stop all running agents"""
         self.running = False
+        self._stop_event.set()
         for agent in self.agents:
             agent.stop()
     
@@ -2,7 +2,15 @@ import unittest
 from unittest.mock import Mock, patch
 import sys
 import os
+import asyncio
+import json
+import pickle
+import socket
+import tempfile
+import threading
 import time
+from collections import deque
+from itertools import islice
 
 # Add src to path to import modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -13,8 +21,20 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.game_state import GameState
 from agents.base_agent import BaseAgent
+from agents.process_fleet import build_agent_configs
+from utils.action_log import ActionLogWriter, read_action_log
 from analytics.analytics_engine import AnalyticsEngine
+from analytics.realtime_detector import RealtimeDetector
+try:
+    from agents.async_agent_manager import AsyncAgentManager
+except ImportError:  # websockets is optional outside the async runner
+    AsyncAgentManager = None
 from unity_integration.unity_connector import UnityConnector
+from unity_integration.protocol import (
+    encode_frame, decode_frames, decode_json_stream, encode_envelope_frame, encode_payload, BufferPool,
+    CODEC_JSON, CODEC_MSGPACK, msgpack
+)
+from unity_integration.schemas import TYPE_DECODERS
 
 
 class TestGameState(unittest.TestCase):
@@ -73,7 +93,9 @@ class TestGameState(unittest.TestCase):
             self.game_state.previous_positions.append((0.1 * i, 0, 0))
         
         # Should not be stuck if we don't have enough positions
-        self.game_state.previous_positions = self.game_state.previous_positions[:5]
+        self.game_state.previous_positions = deque(
+            islice(self.game_state.previous_positions, 5), maxlen=self.game_state.max_stuck_positions
+        )
         self.assertFalse(self.game_state.is_stuck())
         
         # Should be stuck if positions are close together
@@ -124,6 +146,15 @@ class TestGameState(unittest.TestCase):
         self.assertIn('current_area', data)
         self.assertIn('puzzle_active', data)
 
+    def test_snapshot(self):
+        """Test that a snapshot keeps the state at capture time"""
+        snapshot = self.game_state.snapshot()
+        self.game_state.health = 10
+        self.assertEqual(snapshot['health'], 100)
+        self.assertEqual(dict(snapshot), snapshot.to_dict())
+        self.assertEqual(pickle.loads(pickle.dumps(snapshot)), snapshot)
+        self.assertEqual(json.loads(json.dumps(snapshot.to_dict()))['health'], 100)
+
 
 class TestBaseAgent(unittest.TestCase):
     """Unit tests for BaseAgent class"""
@@ -174,6 +205,87 @@ class TestBaseAgent(unittest.TestCase):
         self.base_agent.stop()
         self.assertFalse(self.base_agent.is_running)
 
+    def test_select_action_in_combat(self):
+        """Test that combat selection only returns combat actions"""
+        self.base_agent.game_state.in_combat = True
+        self.base_agent.game_state.health = 30
+        possible_actions = self.base_agent._get_actions_for_context('combat')
+        for _ in range(50):
+            action = self.base_agent._select_action_with_strategy(possible_actions, 'combat')
+            self.assertIn(action, possible_actions)
+
+    def test_tuning_writes_apply_to_decisions(self):
+        """Test that tuning assigned directly on the agent drives the next decisions"""
+        self.base_agent.game_state.health = 10  # critical health: cautious strategy
+        self.base_agent.caution_level = 1.0
+        self.base_agent.exploration_bias = 0.0
+        for _ in range(50):
+            self.assertNotIn(self.base_agent.decide_action(), {'attack', 'move_forward', 'jump'})
+
+    def test_pipelined_effects_follow_send_result(self):
+        """Test that a pipelined action's effects are recorded only after its send succeeded"""
+        unity_manager = Mock()
+        unity_manager.get_game_state.return_value = {}
+        unity_manager.send_action_to_unity.side_effect = [RuntimeError("down"), True]
+        agent = BaseAgent(agent_id=2, game_path="/test/path", analytics_engine=self.analytics_engine,
+                          unity_manager=unity_manager, pipeline_io=True)
+        agent._record_action_effects = Mock()
+        agent._step(time.monotonic())
+        agent._step(time.monotonic())  # consumes the failed send
+        agent._record_action_effects.assert_not_called()
+        agent._drain_io()  # consumes the successful one
+        agent._record_action_effects.assert_called_once()
+
+    def test_step_logs_error_records(self):
+        """Test that a failed step is logged as a tagged error record"""
+        self.base_agent.update_game_state = Mock(side_effect=RuntimeError("boom"))
+        self.base_agent._step(time.monotonic())
+        record = self.base_agent.get_results()['actions'][0]
+        self.assertTrue(record['is_error'])
+        self.assertEqual(record['error'], "boom")
+
+    def test_results_keep_logged_records(self):
+        """Test that results share the logged records and their snapshots serialize as dicts"""
+        self.analytics_engine.get_agent_metrics.return_value = {}
+        for _ in range(3):
+            self.base_agent._step(time.monotonic())
+        record = self.base_agent.get_results()['actions'][0]
+        self.assertIs(record, self.base_agent._actions_log[0])
+        encoded = json.dumps(record, default=lambda snapshot: snapshot.to_dict())
+        self.assertEqual(json.loads(encoded)['game_state']['health'], 100)
+
+    def test_returned_records_unchanged_after_wrap(self):
+        """Test that records already handed out survive the action log wrapping around"""
+        self.base_agent._actions_log = deque(maxlen=2)
+        self.base_agent._log_action('jump', 0.1)
+        first = self.base_agent.results['actions'][0]
+        for i in range(3):
+            self.base_agent._log_action('attack', 1.0 + i)
+        self.assertEqual(first['action'], 'jump')
+        self.assertEqual(first['timestamp'], 0.1)
+
+    @unittest.skipIf(msgpack is None, "msgpack not installed")
+    def test_action_log_round_trip(self):
+        """Test that streamed action records read back in the in-memory shape"""
+        with tempfile.TemporaryDirectory() as log_dir:
+            path = os.path.join(log_dir, "actions.msgpack")
+            writer = ActionLogWriter(path)
+            writer.write(0.5, 'jump', self.base_agent.game_state.snapshot().as_tuple())
+            writer.write(0.6, None, self.base_agent.game_state.snapshot().as_tuple(), 'boom')
+            writer.close()
+
+            records = list(read_action_log(path))
+            self.assertEqual(records[0]['action'], 'jump')
+            self.assertEqual(records[0]['game_state']['health'], 100)
+            self.assertTrue(records[1]['is_error'])
+
+    def test_process_fleet_configs(self):
+        """Test that worker configs can be sent to another process"""
+        configs = build_agent_configs("/test/path", 5, 10)
+        self.assertEqual(len(configs), 5)
+        self.assertEqual(pickle.loads(pickle.dumps(configs)), configs)
+        self.assertEqual(configs[0]['personality'], configs[4]['personality'])
+
 
 class TestAnalyticsEngine(unittest.TestCase):
     """Unit tests for AnalyticsEngine class"""
@@ -187,6 +299,16 @@ class TestAnalyticsEngine(unittest.TestCase):
         self.assertEqual(len(self.analytics_engine.global_events), 0)
         self.assertEqual(len(self.analytics_engine.issue_logs), 0)
     
+    def test_movement_views(self):
+        """Test that agent_positions / agent_stuck_times read and write the movement trackers"""
+        engine = self.analytics_engine
+        engine.log_agent_action(0, "move", {"position": (1, 2, 3)})
+        self.assertEqual(engine.agent_positions[0], (1.0, 2.0, 3.0))
+        self.assertEqual(list(engine.agent_stuck_times), [0])
+        
+        engine.agent_stuck_times[0] = time.time() - engine.session_start_time - 35
+        self.assertTrue(engine.should_stop_test())
+    
     def test_log_agent_action(self):
         """Test logging agent actions"""
         self.analytics_engine.log_agent_action(1, 'move_forward', {'position': (1, 2, 3)})
@@ -207,7 +329,17 @@ class TestAnalyticsEngine(unittest.TestCase):
         self.assertEqual(len(self.analytics_engine.global_events), 1)
         self.assertEqual(self.analytics_engine.global_events[0]['event'], 'retry')
         self.assertEqual(self.analytics_engine.global_events[0]['agent_id'], 1)
-    
+
+    def test_global_events_merged_across_shards(self):
+        """Test events of agents on different lock shards are merged in time order"""
+        self.analytics_engine.log_agent_death(1)
+        self.analytics_engine.log_retry(2)
+        self.analytics_engine.log_agent_death(1)
+
+        events = self.analytics_engine.global_events
+        self.assertEqual([e['agent_id'] for e in events], [1, 2, 1])
+        self.assertEqual([e['event'] for e in events], ['death', 'retry', 'death'])
+
     def test_get_agent_metrics(self):
         """Test retrieving agent metrics"""
         # Log some data first
@@ -222,7 +354,63 @@ class TestAnalyticsEngine(unittest.TestCase):
         self.assertEqual(metrics['retries'], 1)
         self.assertGreater(metrics['total_actions'], 0)
         self.assertGreater(metrics['high_engagement_actions'], 0)
-    
+
+    def test_log_batch(self):
+        """Test logging a batch of buffered engagement events"""
+        now = time.time()
+        self.analytics_engine.log_batch(1, [
+            ('high_engagement', 'attack', now),
+            ('progression', 'explore', now),
+            ('high_engagement', 'jump', now)
+        ])
+
+        self.assertEqual(len(self.analytics_engine.engagement_data[1]), 2)
+        self.assertEqual(self.analytics_engine.engagement_data[1][1]['action'], 'jump')
+        self.assertEqual(self.analytics_engine.agents_data[1][0]['event_type'], 'progression')
+
+    def test_action_distribution(self):
+        """Test actions and progression events are counted by interned action"""
+        self.analytics_engine.log_agent_action(1, 'move_forward', {'position': (1, 2, 3)})
+        self.analytics_engine.log_agent_action(2, 'move_forward', {'position': (1, 2, 3)})
+        self.analytics_engine.log_progression(2, 'explore')
+
+        distribution = self.analytics_engine._get_action_distribution()
+        self.assertEqual(distribution['counts'], {'move_forward': 2, 'explore': 1})
+        self.assertEqual(distribution['total_actions'], 3)
+
+    def test_action_ids_past_int16(self):
+        """Test that actions interned after the first 32768 names are still counted"""
+        for i in range(40000):
+            self.analytics_engine._intern(f"action_{i}")
+        self.analytics_engine.log_agent_action(1, 'action_39999', {'position': (1, 2, 3)})
+
+        distribution = self.analytics_engine._get_action_distribution()
+        self.assertEqual(distribution['counts'], {'action_39999': 1})
+
+    def test_soft_lock_detection(self):
+        """Test an agent that stops moving is reported as soft-locked"""
+        self.analytics_engine.stuck_threshold = -1.0  # Any stay in place counts
+        self.analytics_engine.log_agent_action(1, 'move_forward', {'position': (1, 2, 3)})
+        self.analytics_engine.log_agent_action(2, 'move_forward', {'position': (0, 0, 0)})
+        self.analytics_engine.log_agent_action(1, 'move_forward', {'position': (1, 2, 3)})
+        self.analytics_engine.log_agent_action(2, 'move_forward', {'position': (5, 0, 0)})
+
+        self.assertTrue(self.analytics_engine.should_stop_test())
+        self.assertEqual(len(self.analytics_engine.anomalies), 1)
+        self.assertEqual(self.analytics_engine.anomalies[0]['type'], 'soft_lock')
+        self.assertEqual(self.analytics_engine.anomalies[0]['agent_id'], 1)
+
+    def test_cached_analytics_refresh_after_logging(self):
+        """Test cached aggregates are reused until more records are logged"""
+        self.analytics_engine.log_agent_death(1)
+        first = self.analytics_engine._get_action_distribution()
+        self.assertIs(self.analytics_engine._get_action_distribution(), first)
+        self.assertEqual(self.analytics_engine.generate_comprehensive_analytics()['total_deaths'], 1)
+
+        self.analytics_engine.log_agent_death(2)
+        self.assertIsNot(self.analytics_engine._get_action_distribution(), first)
+        self.assertEqual(self.analytics_engine.generate_comprehensive_analytics()['total_deaths'], 2)
+
     def test_generate_advanced_analytics(self):
         """Test generating advanced analytics"""
         # Log some data first
@@ -240,6 +428,72 @@ class TestAnalyticsEngine(unittest.TestCase):
         self.assertIn('recommendations', advanced_analytics)
 
 
+class TestRealtimeDetector(unittest.TestCase):
+    """Unit tests for RealtimeDetector class"""
+
+    def test_update_batch_flags_stuck_agents(self):
+        """Test agents that stay in place past the threshold are flagged in one batch"""
+        detector = RealtimeDetector(stuck_threshold=5.0)
+        detector.update_batch(['a', 'b', 'c'], [(0, 0, 0), (0, 0, 0), (0, 0, 0)], current_time=0.0)
+        flagged = detector.update_batch(['a', 'b', 'c'], [(0, 0, 0), (1, 0, 0), (0, 0.05, 0)],
+                                        current_time=10.0)
+
+        self.assertEqual(flagged.tolist(), [True, False, True])
+        self.assertEqual([a['agent_id'] for a in detector.anomalies], ['a', 'c'])
+        self.assertEqual(detector.agent_states['b'].stuck_duration, 0.0)
+        self.assertTrue(detector.should_stop_test())
+
+    def test_update_agent_grows_past_capacity(self):
+        """Test the per-agent API keeps tracking agents beyond the initial capacity"""
+        detector = RealtimeDetector()
+        for i in range(200):
+            self.assertFalse(detector.update_agent(f"agent_{i}", (i, 0, 0)))
+        self.assertEqual(len(detector.agent_states), 200)
+        self.assertEqual(detector.agent_states['agent_199'].position, (199.0, 0.0, 0.0))
+        self.assertFalse(detector.should_stop_test())
+
+    def test_nearby_stuck(self):
+        """Test the spatial hash finds other stuck agents within the radius"""
+        detector = RealtimeDetector(stuck_threshold=5.0)
+        ids = ['a', 'b', 'c', 'd']
+        positions = [(0, 0, 0), (3, 0, 4), (-12, 0, 0), (0.5, 0, -0.5)]
+        detector.update_batch(ids, positions, current_time=0.0)
+        detector.update_batch(ids, positions, current_time=10.0)
+
+        self.assertEqual(sorted(detector.nearby_stuck('a', 5.0)), ['b', 'd'])
+        detector.update_batch(['d'], [(100, 0, 100)], current_time=11.0)
+        self.assertEqual(detector.nearby_stuck('a', 5.0), ['b'])
+        self.assertEqual(detector.nearby_stuck('unknown', 5.0), [])
+
+    
+    @unittest.skipIf(AsyncAgentManager is None, "websockets is not installed")
+    def test_async_tick_feeds_agent_positions(self):
+        """Test that each swarm tick hands every agent's latest position to the detector"""
+        game_client = Mock(sent=[])
+        positions = {'agent_0': [0.0, 0.0, 0.0], 'agent_1': [5.0, 0.0, 5.0]}
+        async def get_states(agent_ids):
+            return [{'agent_id': agent_id, 'player_position': positions[agent_id]} for agent_id in agent_ids]
+        async def send_action(action):
+            game_client.sent.append(action)
+        game_client.get_states = get_states
+        game_client.send_action = send_action
+        
+        agents = []
+        for i in range(2):
+            agent = Mock(agent_id=f"agent_{i}")
+            agent.decide_action.return_value = {'agent_id': agent.agent_id, 'type': 'move'}
+            agents.append(agent)
+        
+        detector = Mock()
+        detector.should_stop_test.return_value = False
+        manager = AsyncAgentManager(agents, game_client)
+        manager.set_detector(detector)
+        asyncio.run(manager.run_tick())
+        
+        detector.update_batch.assert_called_once_with(['agent_0', 'agent_1'], [(0.0, 0.0, 0.0), (5.0, 0.0, 5.0)])
+        self.assertEqual(len(game_client.sent), 2)
+
+
 class TestUnityConnector(unittest.TestCase):
     """Unit tests for UnityConnector class"""
     
@@ -262,13 +516,118 @@ class TestUnityConnector(unittest.TestCase):
         mock_socket_instance = Mock()
         mock_socket.return_value = mock_socket_instance
         mock_socket_instance.connect.return_value = None
-        mock_socket_instance.recv.return_value = b'{"id": "test", "type": "test"}'
+        # The listener reads one frame, then blocks until the test is done
+        frames = [encode_frame({'id': 'test', 'type': 'test'}, CODEC_JSON)]
+        done = threading.Event()
+        def recv_into(buffer):
+            if frames:
+                frame = frames.pop()
+                buffer[:len(frame)] = frame
+                return len(frame)
+            done.wait()
+            return 0
+        mock_socket_instance.recv_into.side_effect = recv_into
         
         # Test connection
         result = connector.connect()
         self.assertTrue(result)
         self.assertTrue(connector.is_connected)
         mock_socket_instance.connect.assert_called_once()
+        done.set()
+
+    
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_codec_switches_after_peer_sends_msgpack(self):
+        """Test that frames go out as JSON until Unity has sent a msgpack frame"""
+        connector = UnityConnector()
+        connector.socket, unity_side = socket.socketpair()
+        connector.is_connected = True
+        self.assertEqual(connector.codec, CODEC_JSON)
+        
+        listener = threading.Thread(target=connector._listen_for_messages, daemon=True)
+        listener.start()
+        unity_side.sendall(encode_frame({'type': 'game_state_update'}, CODEC_MSGPACK))
+        unity_side.close()
+        listener.join(5)
+        self.assertEqual(connector.codec, CODEC_MSGPACK)
+
+
+class TestProtocol(unittest.TestCase):
+    """Unit tests for the length-prefixed wire protocol"""
+    
+    def test_round_trip_split_frames(self):
+        """Test that frames split across recv calls are reassembled"""
+        stream = encode_frame({'id': 'a', 'type': 'get_state'}) + encode_frame({'id': 'b', 'type': 'action'})
+        buf = bytearray(stream[:7])
+        self.assertEqual(decode_frames(buf), [])
+        
+        buf += stream[7:]
+        messages = decode_frames(buf)
+        self.assertEqual([m['id'] for m in messages], ['a', 'b'])
+        self.assertEqual(len(buf), 0)
+    
+    def test_invalid_frame_is_skipped(self):
+        """Test that a corrupt payload does not drop the following frames"""
+        bad = b'{not json'
+        buf = bytearray(len(bad).to_bytes(4, 'little') + bad + encode_frame({'id': 'ok'}))
+        errors = []
+        messages = decode_frames(buf, errors.append)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(messages, [{'id': 'ok'}])
+    
+    def test_codec_id_is_reported_per_frame(self):
+        """Test that JSON frames keep a plain length header and report their codec"""
+        frame = encode_frame({'id': 'a'}, CODEC_JSON)
+        self.assertEqual(int.from_bytes(frame[:4], 'little'), len(frame) - 4)
+        self.assertEqual(decode_frames(bytearray(frame), with_codec=True), [(CODEC_JSON, {'id': 'a'})])
+    
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_and_json_frames_mix(self):
+        """Test that msgpack and JSON frames can share one stream"""
+        buf = bytearray(encode_frame({'id': 'a'}, CODEC_MSGPACK) + encode_frame({'id': 'b'}, CODEC_JSON))
+        self.assertEqual(decode_frames(buf, with_codec=True),
+                         [(CODEC_MSGPACK, {'id': 'a'}), (CODEC_JSON, {'id': 'b'})])
+    
+    def test_envelope_frame_wraps_encoded_data(self):
+        """Test that a pre-encoded data body decodes like a normally encoded response"""
+        codecs = [CODEC_JSON] + ([CODEC_MSGPACK] if msgpack is not None else [])
+        for codec in codecs:
+            data = {'level_name': 'L', 'bounds': [1, 2]}
+            frame = encode_envelope_frame('r"1', 'level_data_response', encode_payload(data, codec), codec)
+            self.assertEqual(decode_frames(bytearray(frame)),
+                             [{'id': 'r"1', 'type': 'level_data_response', 'data': data}])
+    
+    def test_unframed_json_stream(self):
+        """Test that bare JSON objects are split on their outer braces, even when cut mid-string"""
+        stream = b'{"id":"a","details":"} {"}\n{"id":"b","data":{"x":"\\""}}'
+        buf = bytearray(stream[:22])
+        self.assertEqual(decode_json_stream(buf), [])
+        
+        buf += stream[22:]
+        messages = decode_json_stream(buf)
+        self.assertEqual(messages, [{'id': 'a', 'details': '} {'}, {'id': 'b', 'data': {'x': '"'}}])
+        self.assertEqual(len(buf), 0)
+    
+    def test_generated_decoders_fill_defaults(self):
+        """Test that schema decoders unpack present fields and default the missing ones"""
+        decode_action = TYPE_DECODERS['action']
+        message = {'id': 'r1', 'type': 'action', 'data': {'agent_id': 3, 'action': 'jump'}}
+        self.assertEqual(decode_action(message), ('r1', 3, 'jump', {}))
+        
+        # Mutable defaults must not be shared between calls
+        self.assertIsNot(decode_action({})[3], decode_action({})[3])
+    
+    def test_buffer_pool_reuses_buffers(self):
+        """Test that released buffers are handed out again and surplus ones are dropped"""
+        pool = BufferPool(buffer_size=16, max_buffers=1)
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertEqual(len(first), 16)
+        
+        pool.release(first)
+        pool.release(second)
+        self.assertIs(pool.acquire(), first)
+        self.assertIsNot(pool.acquire(), second)
 
 
 class TestIntegration(unittest.TestCase):
@@ -283,6 +642,7 @@ class TestIntegration(unittest.TestCase):
         agent.handle_action_effects('attack')
         agent.handle_action_effects('died')  # This should increment death count
         agent.handle_action_effects('retry')  # This should increment retry count
+        agent._flush_logs()  # Deaths and retries are buffered with the engagement events
         
         # Check that analytics were logged
         metrics = analytics_engine.get_agent_metrics(1)
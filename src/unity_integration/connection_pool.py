@@ -0,0 +1,43 @@
+"""
+Unity Connection Pool - A small fixed set of Unity connections shared by every agent
+"""
+from typing import List, Optional
+from ..utils.config import get_unity_connection_settings
+from .unity_connector import UnityConnector
+
+
+class UnityConnectionPool:
+    """
+    Holds K Unity connections (K much smaller than the number of agents).
+    Each connection multiplexes the requests of its agents by message id and
+    has a single listener thread that routes responses back to the waiting caller.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        if size is None:
+            size = get_unity_connection_settings()['pool_size']
+        self.size = max(1, size)
+        self.connections: List[UnityConnector] = [UnityConnector() for _ in range(self.size)]
+
+    @property
+    def primary(self) -> UnityConnector:
+        """Connection used for requests that do not belong to a single agent"""
+        return self.connections[0]
+
+    def connect(self, max_retries: int = 3) -> bool:
+        """Open every pooled connection; fails if any of them cannot connect"""
+        for connector in self.connections:
+            if not connector.connect(max_retries):
+                self.disconnect()
+                return False
+        return True
+
+    def disconnect(self):
+        """Close every pooled connection"""
+        for connector in self.connections:
+            if connector.is_connected:
+                connector.disconnect()
+
+    def connection_for(self, agent_id: int) -> UnityConnector:
+        """Connection an agent's requests go through; an agent always uses the same one"""
+        return self.connections[agent_id % self.size]
@@ -0,0 +1,240 @@
+"""
+Protocol - Wire encoding shared by the Unity connector and the mock Unity server
+"""
+import socket
+import threading
+from collections import deque
+from typing import Any, Callable, List, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+    import json
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON frames are used without it
+    msgpack = None
+
+
+if orjson is not None:
+    # orjson encodes straight to bytes and decodes bytes/memoryview without a utf-8 step
+    dumps = orjson.dumps
+    loads = orjson.loads
+else:
+    def dumps(obj: Any) -> bytes:
+        """Serialize a message to compact UTF-8 JSON bytes"""
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(data) -> Any:
+        """Deserialize a message from JSON bytes, str or memoryview"""
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+# orjson and msgpack both raise ValueError subclasses; catch that for every codec
+DecodeError = ValueError
+
+
+# Every message on the socket is prefixed with a 4-byte little-endian header so
+# TCP coalescing/splitting cannot break parsing. The low 3 bytes hold the payload
+# length and the high byte the codec id, so JSON frames keep the plain length header.
+HEADER_SIZE = 4
+MAX_FRAME_SIZE = (1 << 24) - 1  # Largest length the header can carry; guards against desync
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+# Connections start in JSON, which every peer (including the Unity plugin) understands.
+# A sender moves to msgpack only once its peer has sent a msgpack frame itself;
+# receivers accept both and reply in kind.
+DEFAULT_CODEC = CODEC_JSON
+RECV_SIZE = 65536
+SOCKET_BUFFER_SIZE = 1 << 20
+
+
+def tune_socket(sock: socket.socket):
+    """
+    Configure a TCP socket for small request/response traffic: disable Nagle so
+    replies are not held back, and enlarge the kernel buffers for swarm bursts.
+    """
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    except OSError:
+        pass  # Not a TCP socket, or the option is not supported on this platform
+
+
+def encode_payload(message: Any, codec: int = DEFAULT_CODEC) -> bytes:
+    """Serialize a message with the given codec"""
+    if codec == CODEC_MSGPACK:
+        return msgpack.packb(message, use_bin_type=True)
+    return dumps(message)
+
+
+def decode_payload(payload, codec: int = CODEC_JSON) -> Any:
+    """Deserialize a frame payload with the given codec"""
+    if codec == CODEC_JSON:
+        return loads(payload)
+    if codec == CODEC_MSGPACK and msgpack is not None:
+        return msgpack.unpackb(payload, raw=False)
+    raise DecodeError(f"Unsupported codec id {codec}")
+
+
+def parse_header(header) -> Tuple[int, int]:
+    """Split a frame header into (codec, payload length)"""
+    value = int.from_bytes(header, 'little')
+    return value >> 24, value & MAX_FRAME_SIZE
+
+
+def encode_frame(message: Any, codec: int = DEFAULT_CODEC) -> bytes:
+    """Serialize a message and prepend its length/codec header"""
+    payload = encode_payload(message, codec)
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ValueError(f"Message of {len(payload)} bytes exceeds {MAX_FRAME_SIZE} bytes")
+    return (len(payload) | codec << 24).to_bytes(HEADER_SIZE, 'little') + payload
+
+
+class RawResponse(bytes):
+    """A response that is already a complete encoded frame and is sent as-is"""
+
+
+def encode_envelope_frame(msg_id: str, msg_type: str, encoded_data: bytes,
+                          codec: int = DEFAULT_CODEC) -> RawResponse:
+    """
+    Build the frame for {'id', 'type', 'data'} around a data payload that was
+    encoded earlier with the same codec, so cached data is never re-serialized.
+    """
+    if codec == CODEC_MSGPACK:
+        pack = msgpack.packb
+        payload = b''.join((b'\x83', pack('id'), pack(msg_id), pack('type'), pack(msg_type),
+                            pack('data'), encoded_data))
+    else:
+        payload = b''.join((b'{"id":', dumps(msg_id), b',"type":', dumps(msg_type),
+                            b',"data":', encoded_data, b'}'))
+    return RawResponse((len(payload) | codec << 24).to_bytes(HEADER_SIZE, 'little') + payload)
+
+
+def decode_frames(buf: bytearray, on_error: Callable[[Exception], None] = None,
+                  with_codec: bool = False) -> List[Any]:
+    """
+    Decode every complete frame in the receive buffer and drop the consumed bytes.
+    Incomplete trailing frames are left in the buffer for the next recv.
+    With with_codec=True each entry is a (codec, message) tuple so replies can use
+    the sender's codec.
+    """
+    messages = []
+    offset = 0
+    size = len(buf)
+    view = memoryview(buf)
+    try:
+        while size - offset >= HEADER_SIZE:
+            codec, length = parse_header(view[offset:offset + HEADER_SIZE])
+            if codec not in (CODEC_JSON, CODEC_MSGPACK):
+                # The stream is out of sync, nothing after this point can be trusted
+                offset = size
+                error = DecodeError(f"Frame header has unknown codec id {codec}")
+                if on_error is None:
+                    raise error
+                on_error(error)
+                break
+            end = offset + HEADER_SIZE + length
+            if end > size:
+                break
+            payload = view[offset + HEADER_SIZE:end]
+            offset = end
+            try:
+                message = decode_payload(payload, codec)
+                messages.append((codec, message) if with_codec else message)
+            except DecodeError as e:
+                if on_error is None:
+                    raise
+                on_error(e)
+            finally:
+                payload.release()
+    finally:
+        view.release()
+        if offset:
+            del buf[:offset]
+    return messages
+
+
+def decode_json_stream(buf: bytearray, on_error: Callable[[Exception], None] = None) -> List[Any]:
+    """
+    Decode every complete JSON object in an unframed receive buffer and drop the
+    consumed bytes. Objects are delimited by matching their outermost braces,
+    ignoring braces inside strings; an incomplete trailing object stays buffered.
+    """
+    messages = []
+    consumed = 0
+    depth = 0
+    start = 0
+    in_string = escaped = False
+    for i, byte in enumerate(buf):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif byte == 0x5C:  # backslash
+                escaped = True
+            elif byte == 0x22:  # closing quote
+                in_string = False
+        elif byte == 0x22:
+            in_string = True
+        elif byte == 0x7B:  # {
+            if depth == 0:
+                start = i
+            depth += 1
+        elif byte == 0x7D and depth:  # }
+            depth -= 1
+            if depth == 0:
+                consumed = i + 1
+                try:
+                    messages.append(loads(bytes(buf[start:consumed])))
+                except DecodeError as e:
+                    if on_error is None:
+                        raise
+                    on_error(e)
+    if depth == 0 and not in_string:
+        # Whatever follows the last object is whitespace or stray bytes
+        consumed = len(buf)
+    elif len(buf) - consumed > MAX_FRAME_SIZE:
+        # No object ends within the largest message size, the stream is out of sync
+        consumed = len(buf)
+        error = DecodeError("Unframed message exceeds the maximum message size")
+        if on_error is None:
+            raise error
+        on_error(error)
+    del buf[:consumed]
+    return messages
+
+
+class BufferPool:
+    """
+    Thread-safe pool of fixed-size receive buffers.
+    Listener loops recv_into a pooled buffer instead of allocating a new bytes object per recv.
+    """
+    
+    def __init__(self, buffer_size: int = RECV_SIZE, max_buffers: int = 64):
+        self.buffer_size = buffer_size
+        self.max_buffers = max_buffers
+        self._buffers = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> bytearray:
+        """Take a buffer from the pool, allocating a new one if it is empty"""
+        with self._lock:
+            if self._buffers:
+                return self._buffers.pop()
+        return bytearray(self.buffer_size)
+    
+    def release(self, buf: bytearray):
+        """Return a buffer to the pool; surplus or resized buffers are dropped"""
+        if len(buf) != self.buffer_size:
+            return
+        with self._lock:
+            if len(self._buffers) < self.max_buffers:
+                self._buffers.append(buf)
+
+
+# Shared by every socket listener in the process
+recv_buffer_pool = BufferPool()
@@ -0,0 +1,39 @@
+"""
+Schemas - Field layouts of the agent RPC messages and the decoders generated from them
+"""
+from typing import Any, Callable, Dict, Tuple
+
+# Data fields of each request type with the default used when a field is missing
+MESSAGE_SCHEMAS: Dict[str, Tuple[Tuple[str, Any], ...]] = {
+    'action': (('agent_id', -1), ('action', ''), ('params', {})),
+    'get_state': (('agent_id', -1),),
+    'get_states': (('agent_ids', []),),
+    'set_setting': (('setting', ''), ('value', None)),
+    'get_level_data': (('level_name', 'default_level'),),
+}
+
+
+def _generate_decoder(msg_type: str, fields: Tuple[Tuple[str, Any], ...]) -> Callable:
+    """
+    Compile a decoder that unpacks a message into (msg_id, field, ...) with the
+    field names and defaults inlined, instead of looping over the schema per message.
+    Defaults are emitted as literals so mutable ones are fresh on every call.
+    """
+    name = f"decode_{msg_type}"
+    getters = ''.join(f", data.get({field!r}, {default!r})" for field, default in fields)
+    source = (
+        f"def {name}(message):\n"
+        f"    data = message.get('data', {{}})\n"
+        f"    return (message.get('id', ''){getters})\n"
+    )
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, f"<schema {msg_type}>", 'exec'), namespace)
+    decoder = namespace[name]
+    decoder.__doc__ = f"Unpack a '{msg_type}' message into (msg_id, {', '.join(f for f, _ in fields)})"
+    return decoder
+
+
+# Generated once at import time
+TYPE_DECODERS: Dict[str, Callable[[Dict[str, Any]], tuple]] = {
+    msg_type: _generate_decoder(msg_type, fields) for msg_type, fields in MESSAGE_SCHEMAS.items()
+}
@@ -1,12 +1,16 @@
 """
 Unity Connector - Handles communication between the AI system and Unity games
 """
-import json
+import itertools
 import socket
 import threading
 import time
-from typing import Dict, Any, Optional, Callable, Tuple
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from ..utils.config import get_unity_connection_settings
+from .protocol import (
+    CODEC_JSON, CODEC_MSGPACK, dumps, encode_frame, decode_frames, decode_json_stream,
+    recv_buffer_pool, tune_socket
+)
 
 
 class UnityConnector:
@@ -19,12 +23,19 @@ class UnityConnector:
         self.host = settings['host']
         self.port = settings['port']
         self.timeout = settings['timeout']
+        # Unframed mode sends and parses bare JSON objects, for plugin builds without framing
+        self.framed = settings['framed']
+        # Frames are sent as JSON until Unity sends a msgpack frame, showing it can read them
+        self.codec = CODEC_JSON
         self.socket: Optional[socket.socket] = None
         self.is_connected = False
         self.message_handlers: Dict[str, Callable] = {}
         # response_callbacks maps request_id to (threading.Event, result_container_dict)
         self.response_callbacks: Dict[str, Tuple[threading.Event, Dict]] = {}
-        self.request_id_counter = 0
+        # Agents share connections from several threads: ids must stay unique and
+        # frames must not interleave on the socket
+        self._request_ids = itertools.count(1)
+        self._send_lock = threading.Lock()
         
     def connect(self, max_retries: int = 3) -> bool:
         """Establish connection to Unity game with retry logic"""
@@ -33,10 +44,13 @@ class UnityConnector:
                 self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                tune_socket(self.socket)
                 self.socket.settimeout(self.timeout)
                 
                 self.socket.connect((self.host, self.port))
                 self.is_connected = True
+                # A new peer has not shown it reads msgpack yet
+                self.codec = CODEC_JSON
                 
                 # Start message listening thread
                 self.listener_thread = threading.Thread(target=self._listen_for_messages, daemon=True)
@@ -65,16 +79,28 @@ class UnityConnector:
         self.is_connected = False
         if self.socket:
             self.socket.close()
+        # Wake requests still waiting for a response; they fall back to defaults
+        for response_event, _ in list(self.response_callbacks.values()):
+            response_event.set()
         print("Disconnected from Unity game")
     
+    def _next_request_id(self) -> str:
+        """Return a request id that is unique on this connection"""
+        return f"req_{next(self._request_ids)}"
+    
+    def _send_frame(self, message: Dict[str, Any]):
+        """Encode and send one message; the lock keeps concurrent frames whole"""
+        frame = encode_frame(message, self.codec) if self.framed else dumps(message)
+        with self._send_lock:
+            self.socket.sendall(frame)
+    
     def send_message(self, message_type: str, data: Dict[str, Any]) -> str:
         """Send a message to the Unity game with auto-reconnect"""
         if not self.is_connected:
             if not self.connect():
                 raise ConnectionError("Cannot establish connection to Unity game")
         
-        self.request_id_counter += 1
-        request_id = f"req_{self.request_id_counter}"
+        request_id = self._next_request_id()
         
         message = {
             'id': request_id,
@@ -84,16 +110,14 @@ class UnityConnector:
         }
         
         try:
-            serialized_message = json.dumps(message, separators=(',', ':'))
-            self.socket.send(serialized_message.encode('utf-8'))
+            self._send_frame(message)
             return request_id
         except (BrokenPipeError, ConnectionResetError):
             # Connection lost, try to reconnect once
             print("Connection lost, attempting to reconnect...")
             self.is_connected = False
             if self.connect():
-                serialized_message = json.dumps(message, separators=(',', ':'))
-                self.socket.send(serialized_message.encode('utf-8'))
+                self._send_frame(message)
                 return request_id
             else:
                 raise ConnectionError("Failed to reconnect to Unity game")
@@ -113,7 +137,7 @@ class UnityConnector:
     def get_game_state(self, agent_id: int) -> Dict[str, Any]:
         """Request current game state for an agent"""
         # Prepare request
-        request_id = f"req_{int(time.time() * 1000000)}"  # unique request ID based on microseconds
+        request_id = self._next_request_id()
         message = {
             'id': request_id,
             'type': 'get_state',
@@ -130,8 +154,7 @@ class UnityConnector:
         
         # Send the message
         try:
-            serialized_message = json.dumps(message)
-            self.socket.send(serialized_message.encode('utf-8'))
+            self._send_frame(message)
         except Exception as e:
             print(f"Failed to send get_state message: {str(e)}")
             # Cleanup callback
@@ -154,6 +177,35 @@ class UnityConnector:
             
         return self._get_default_game_state()
 
+    def get_game_states(self, agent_ids: List[int]) -> List[Dict[str, Any]]:
+        """Request the current game state of several agents in a single round trip"""
+        request_id = self._next_request_id()
+        message = {
+            'id': request_id,
+            'type': 'get_states',
+            'data': {'agent_ids': list(agent_ids)},
+            'timestamp': time.time()
+        }
+        
+        response_event = threading.Event()
+        result_container = {}
+        self.response_callbacks[request_id] = (response_event, result_container)
+        
+        try:
+            self._send_frame(message)
+            if response_event.wait(self.timeout):
+                states = result_container.get('response', {}).get('data', {}).get('states')
+                if states is not None and len(states) == len(message['data']['agent_ids']):
+                    return states
+            else:
+                print(f"Warning: No response received for get_states request {request_id}")
+        except Exception as e:
+            print(f"Failed to send get_states message: {str(e)}")
+        finally:
+            self.response_callbacks.pop(request_id, None)
+        
+        return [self._get_default_game_state() for _ in agent_ids]
+
     def _get_default_game_state(self) -> Dict[str, Any]:
         """Return a default game state when actual state can't be retrieved"""
         return {
@@ -174,39 +226,31 @@ class UnityConnector:
     
     def _listen_for_messages(self):
         """Listen for messages from the Unity game"""
+        buf = bytearray()
+        chunk = recv_buffer_pool.acquire()
+        chunk_view = memoryview(chunk)
+        
+        def on_invalid(error: Exception):
+            print(f"Received invalid message from Unity: {str(error)}")
+        
         while self.is_connected:
             try:
-                data = self.socket.recv(4096)
-                if not data:
+                # The kernel writes straight into the pooled chunk
+                n = self.socket.recv_into(chunk)
+                if not n:
                     print("Unity connection closed by remote end")
                     break
                 
-                message_str = data.decode('utf-8')
-                
-                # Handle potential partial messages by accumulating until we get complete JSON
-                if not message_str.strip():
-                    continue
-                
-                try:
-                    message = json.loads(message_str)
-                except json.JSONDecodeError as je:
-                    print(f"Received invalid JSON from Unity: {str(je)}. Message: {message_str[:100]}...")
-                    continue
-                
-                # Handle response to a request
-                if 'id' in message and message['id'] in self.response_callbacks:
-                    response_event, result_container = self.response_callbacks[message['id']]
-                    result_container['response'] = message
-                    response_event.set()
-                    # The waiting thread will delete the callback entry
-                    
-                # Handle incoming message
-                elif 'type' in message and message['type'] in self.message_handlers:
-                    handler = self.message_handlers[message['type']]
-                    try:
-                        handler(message)
-                    except Exception as h_error:
-                        print(f"Error in message handler for type {message['type']}: {str(h_error)}")
+                # Frames may be split or coalesced by TCP; keep partial frames buffered
+                buf += chunk_view[:n]
+                if self.framed:
+                    for codec, message in decode_frames(buf, on_invalid, with_codec=True):
+                        if codec == CODEC_MSGPACK:
+                            self.codec = CODEC_MSGPACK
+                        self._dispatch_message(message)
+                else:
+                    for message in decode_json_stream(buf, on_invalid):
+                        self._dispatch_message(message)
                 
             except socket.timeout:
                 # This is normal, just continue
@@ -222,6 +266,9 @@ class UnityConnector:
                     print(f"Unexpected error receiving message from Unity: {str(e)}")
                 break
         
+        chunk_view.release()
+        recv_buffer_pool.release(chunk)
+        
         # Clean up if the connection is no longer active
         if self.is_connected:
             print("Unity connection closed, cleaning up...")
@@ -232,6 +279,23 @@ class UnityConnector:
                 except:
                     pass  # Socket might already be closed
     
+    def _dispatch_message(self, message: Dict[str, Any]):
+        """Route a decoded message to its waiting request or registered handler"""
+        # Handle response to a request
+        if 'id' in message and message['id'] in self.response_callbacks:
+            response_event, result_container = self.response_callbacks[message['id']]
+            result_container['response'] = message
+            response_event.set()
+            # The waiting thread will delete the callback entry
+            
+        # Handle incoming message
+        elif 'type' in message and message['type'] in self.message_handlers:
+            handler = self.message_handlers[message['type']]
+            try:
+                handler(message)
+            except Exception as h_error:
+                print(f"Error in message handler for type {message['type']}: {str(h_error)}")
+    
     def set_game_setting(self, setting_name: str, value: Any):
         """Change a game setting in Unity"""
         data = {
@@ -243,7 +307,7 @@ class UnityConnector:
     def get_level_data(self, level_name: str) -> Dict[str, Any]:
         """Get level-specific data from Unity"""
         # Prepare request
-        request_id = f"req_{int(time.time() * 1000000)}"  # unique request ID based on microseconds
+        request_id = self._next_request_id()
         message = {
             'id': request_id,
             'type': 'get_level_data',
@@ -259,8 +323,7 @@ class UnityConnector:
         
         # Send the message
         try:
-            serialized_message = json.dumps(message)
-            self.socket.send(serialized_message.encode('utf-8'))
+            self._send_frame(message)
         except Exception as e:
             print(f"Failed to send get_level_data message: {str(e)}")
             if request_id in self.response_callbacks:
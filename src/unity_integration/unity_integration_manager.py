@@ -2,8 +2,8 @@
 Unity Integration Manager - Main interface for connecting AI agents to Unity games
 """
 import time
-from typing import Dict, Any, Optional
-from .unity_connector import UnityConnector
+from typing import Dict, Any, List, Optional
+from .connection_pool import UnityConnectionPool
 from ..agents.base_agent import BaseAgent
 from ..analytics.analytics_engine import AnalyticsEngine
 
@@ -16,7 +16,9 @@ class UnityIntegrationManager:
     def __init__(self, game_path: str = None, analytics_engine: AnalyticsEngine = None):
         self.game_path = game_path
         self.analytics_engine = analytics_engine
-        self.unity_connector = UnityConnector()
+        self.connection_pool = UnityConnectionPool()
+        # Requests that are not tied to one agent go through the primary connection
+        self.unity_connector = self.connection_pool.primary
         self.is_initialized = False
         
     def initialize(self) -> bool:
@@ -25,7 +27,7 @@ class UnityIntegrationManager:
         
         try:
             # Connect to the Unity game
-            if not self.unity_connector.connect():
+            if not self.connection_pool.connect():
                 print("Failed to connect to Unity game")
                 return False
             
@@ -56,14 +58,21 @@ class UnityIntegrationManager:
         if not self.is_initialized:
             raise RuntimeError("Unity integration not initialized")
         
-        return self.unity_connector.get_game_state(agent_id)
+        return self.connection_pool.connection_for(agent_id).get_game_state(agent_id)
+    
+    def get_game_states(self, agent_ids: List[int]) -> List[Dict[str, Any]]:
+        """Get the current game state for several agents in one request"""
+        if not self.is_initialized:
+            raise RuntimeError("Unity integration not initialized")
+        
+        return self.unity_connector.get_game_states(agent_ids)
     
     def send_action_to_unity(self, agent_id: int, action: str, params: Dict[str, Any] = None) -> bool:
         """Send an action to Unity for execution"""
         if not self.is_initialized:
             raise RuntimeError("Unity integration not initialized")
         
-        request_id = self.unity_connector.send_action(agent_id, action, params)
+        request_id = self.connection_pool.connection_for(agent_id).send_action(agent_id, action, params)
         return len(request_id) > 0
     
     def run_playtesting_session(self, agents: list, duration: int):
@@ -96,10 +105,9 @@ class UnityIntegrationManager:
     
     def _monitor_agents(self, agents: list):
         """Monitor agents and collect data during the playtesting session"""
-        for agent in agents:
-            # Update agent's view of the game state
-            game_state = self.get_game_state(agent.agent_id)
-            
+        # One batched request covers every agent's view of the game state
+        game_states = self.get_game_states([agent.agent_id for agent in agents])
+        for agent, game_state in zip(agents, game_states):
             # Log agent position for heatmap generation
             if self.analytics_engine and 'position' in game_state:
                 self.analytics_engine.log_position(
@@ -117,6 +125,6 @@ class UnityIntegrationManager:
     
     def cleanup(self):
         """Clean up Unity integration resources"""
-        self.unity_connector.disconnect()
+        self.connection_pool.disconnect()
         self.is_initialized = False
         print("Unity integration cleaned up")
\ No newline at end of file
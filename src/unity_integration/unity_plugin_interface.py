@@ -1,11 +1,11 @@
 """
 Unity Plugin Interface - Python module that would be mirrored in Unity C# code
 """
-import json
 import socket
 import threading
 import time
 from typing import Dict, Any, Callable
+from .protocol import encode_frame, decode_frames, recv_buffer_pool, tune_socket
 
 
 class UnityPluginInterface:
@@ -19,7 +19,8 @@ class UnityPluginInterface:
         self.port = port
         self.socket = None
         self.is_running = False
-        self.clients = []  # Connected AI system clients
+        # Connected AI system clients in connection order; dict keys so disconnects are O(1)
+        self.clients: Dict[socket.socket, None] = {}
         self.game_state_callbacks = []
         self.action_handlers = {}
         
@@ -50,8 +51,12 @@ class UnityPluginInterface:
         while self.is_running:
             try:
                 client_socket, address = self.socket.accept()
+                tune_socket(client_socket)
                 print(f"New connection from {address}")
                 
+                # Register before the handler thread starts so its removal cannot run first
+                self.clients[client_socket] = None
+                
                 # Start a thread to handle this client
                 client_thread = threading.Thread(
                     target=self._handle_client,
@@ -60,37 +65,42 @@ class UnityPluginInterface:
                 )
                 client_thread.start()
                 
-                self.clients.append(client_socket)
-                
             except Exception as e:
                 if self.is_running:
                     print(f"Error accepting connections: {str(e)}")
     
     def _handle_client(self, client_socket: socket.socket, address: tuple):
         """Handle communication with a single AI system client"""
+        buf = bytearray()
+        chunk = recv_buffer_pool.acquire()
+        chunk_view = memoryview(chunk)
+        
+        def on_invalid(error: Exception):
+            print(f"Received invalid message from client {address}: {error}")
+        
         while self.is_running:
             try:
-                data = client_socket.recv(4096)
-                if not data:
+                n = client_socket.recv_into(chunk)
+                if not n:
                     break
                 
-                message_str = data.decode('utf-8')
-                message = json.loads(message_str)
-                
-                response = self._process_message(message)
-                
-                if response:
-                    client_socket.send(json.dumps(response).encode('utf-8'))
+                buf += chunk_view[:n]
+                for codec, message in decode_frames(buf, on_invalid, with_codec=True):
+                    response = self._process_message(message)
+                    
+                    if response:
+                        # Reply with the codec the client used
+                        client_socket.sendall(encode_frame(response, codec))
                     
-            except json.JSONDecodeError:
-                print(f"Received invalid JSON from client {address}")
             except Exception as e:
                 print(f"Error handling client {address}: {str(e)}")
                 break
         
+        chunk_view.release()
+        recv_buffer_pool.release(chunk)
+        
         # Remove client when connection is closed
-        if client_socket in self.clients:
-            self.clients.remove(client_socket)
+        self.clients.pop(client_socket, None)
         client_socket.close()
     
     def _process_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
@@ -102,6 +112,8 @@ class UnityPluginInterface:
             return self._handle_action(data)
         elif msg_type == 'get_state':
             return self._handle_get_state(data)
+        elif msg_type == 'get_states':
+            return self._handle_get_states(data)
         elif msg_type == 'set_setting':
             return self._handle_set_setting(data)
         elif msg_type == 'get_level_data':
@@ -151,6 +163,19 @@ class UnityPluginInterface:
             }
         }
     
+    def _handle_get_states(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle a batched state request for several agents"""
+        agent_ids = data.get('agent_ids', [])
+        
+        return {
+            'id': data.get('request_id', ''),
+            'type': 'states_response',
+            'data': {
+                'agent_ids': agent_ids,
+                'states': [self._get_current_game_state(agent_id) for agent_id in agent_ids]
+            }
+        }
+    
     def _handle_set_setting(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle a request to change a game setting"""
         setting_name = data.get('setting', '')
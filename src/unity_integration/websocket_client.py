@@ -1,8 +1,9 @@
 import asyncio
+import itertools
 import websockets
-import json
 import logging
 from typing import Optional, Callable
+from .protocol import CODEC_JSON, CODEC_MSGPACK, msgpack, decode_payload, encode_payload, tune_socket
 
 class WebSocketClient:
     def __init__(self, host: str = "localhost", port: int = 8080):
@@ -10,12 +11,16 @@ class WebSocketClient:
         self.websocket: Optional[websockets.WebSocketServerProtocol] = None
         self.retry_count = 0
         self.max_retries = 5
+        # Text JSON until the server sends a binary frame, then msgpack in kind
+        self.codec = CODEC_JSON
+        self._request_ids = itertools.count()
         
     async def connect(self):
         """Connect with exponential backoff retry"""
         while self.retry_count < self.max_retries:
             try:
                 self.websocket = await websockets.connect(self.uri)
+                self._tune_transport()
                 self.retry_count = 0
                 return True
             except Exception as e:
@@ -25,16 +30,36 @@ class WebSocketClient:
                 await asyncio.sleep(wait_time)
         return False
     
+    def _tune_transport(self):
+        """Apply TCP_NODELAY and larger kernel buffers to the underlying socket if exposed"""
+        transport = getattr(self.websocket, 'transport', None)
+        sock = transport.get_extra_info('socket') if transport else None
+        if sock is not None:
+            tune_socket(sock)
+    
     async def send_action(self, action: dict):
-        """Send action with auto-reconnect"""
+        """Send one agent's action"""
+        await self._send({'type': 'action', 'data': action})
+    
+    async def get_states(self, agent_ids: list) -> list:
+        """Request the current state of several agents and wait for the matching reply"""
+        request_id = str(next(self._request_ids))
+        await self._send({'id': request_id, 'type': 'get_states', 'data': {'agent_ids': list(agent_ids)}})
+        while True:
+            response = await self.receive_state()
+            if response.get('type') == 'states_response' and response.get('id') == request_id:
+                return response['data']['states']
+    
+    async def _send(self, message: dict):
+        """Send a message with auto-reconnect"""
         if not self.websocket:
             await self.connect()
         
         try:
-            await self.websocket.send(json.dumps(action))
+            await self.websocket.send(self._encode(message))
         except websockets.exceptions.ConnectionClosed:
             await self.connect()
-            await self.websocket.send(json.dumps(action))
+            await self.websocket.send(self._encode(message))
     
     async def receive_state(self) -> dict:
         """Receive game state with auto-reconnect"""
@@ -43,8 +68,21 @@ class WebSocketClient:
         
         try:
             data = await self.websocket.recv()
-            return json.loads(data)
+            return self._decode(data)
         except websockets.exceptions.ConnectionClosed:
             await self.connect()
             data = await self.websocket.recv()
-            return json.loads(data)
+            return self._decode(data)
+    
+    def _encode(self, message: dict):
+        """Encode a message as a text JSON frame or a binary msgpack frame"""
+        if self.codec == CODEC_MSGPACK:
+            return encode_payload(message, CODEC_MSGPACK)
+        return encode_payload(message, CODEC_JSON).decode('utf-8')
+    
+    def _decode(self, data) -> dict:
+        """Decode a frame; binary frames are msgpack and switch sends to msgpack too"""
+        if isinstance(data, bytes) and msgpack is not None:
+            self.codec = CODEC_MSGPACK
+            return decode_payload(data, CODEC_MSGPACK)
+        return decode_payload(data, CODEC_JSON)
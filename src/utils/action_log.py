@@ -0,0 +1,70 @@
+"""
+Action Log - Append-only msgpack file of an agent's action records
+"""
+import os
+from typing import Any, Dict, Iterator, Optional
+from .game_state import SNAPSHOT_FIELDS
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, needed only when streaming action logs
+    msgpack = None
+
+
+# Records packed between explicit flushes of the file buffer
+ACTION_LOG_FLUSH_EVERY = 256
+
+
+def action_log_path(log_dir: str, agent_id: int) -> str:
+    """Conventional location of an agent's action log inside log_dir"""
+    return os.path.join(log_dir, f"agent_{agent_id}_actions.msgpack")
+
+
+class ActionLogWriter:
+    """
+    Streams action records to disk as they are logged, so a session's full
+    history is kept even though the in-memory log only holds the newest records.
+    Each record is packed as [timestamp, action, state values, error] with the
+    state values in SNAPSHOT_FIELDS order; read it back with read_action_log().
+    """
+
+    def __init__(self, path: str, flush_every: int = ACTION_LOG_FLUSH_EVERY):
+        if msgpack is None:
+            raise RuntimeError("Streaming the action log requires the msgpack package")
+        self.path = path
+        self.flush_every = flush_every
+        self._packer = msgpack.Packer(use_bin_type=True)
+        self._file = None
+        self._pending = 0
+
+    def write(self, timestamp: float, action: Optional[str], state: tuple, error: Optional[str] = None):
+        """Append one record; the file is (re)opened in append mode on first use"""
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        self._file.write(self._packer.pack((timestamp, action, state, error)))
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        """Flush and close the file; a later write reopens it"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._pending = 0
+
+
+def read_action_log(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the records of an action log in the in-memory record shape"""
+    if msgpack is None:
+        raise RuntimeError("Reading the action log requires the msgpack package")
+    with open(path, 'rb') as f:
+        for timestamp, action, state, error in msgpack.Unpacker(f, raw=False, use_list=False):
+            record = {'timestamp': timestamp, 'game_state': dict(zip(SNAPSHOT_FIELDS, state)),
+                      'is_error': error is not None}
+            if error is None:
+                record['action'] = action
+            else:
+                record['error'] = error
+            yield record
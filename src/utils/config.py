@@ -25,6 +25,13 @@ def get_api_key() -> Optional[str]:
     return None
 
 
+def get_llm_model() -> str:
+    """
+    Get the chat model used for LLM analysis, overridable via OPENAI_MODEL
+    """
+    return os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+
+
 def get_unity_connection_settings() -> dict:
     """
     Get Unity connection settings from config
@@ -33,7 +40,9 @@ def get_unity_connection_settings() -> dict:
     settings = {
         'host': 'localhost',
         'port': 8080,
-        'timeout': 30
+        'timeout': 30,
+        'pool_size': 4,  # Connections shared by all agents
+        'framed': True  # Length-prefixed frames; False for plugin builds that send bare JSON
     }
     
     # Try to load from environment or config file
@@ -49,4 +58,12 @@ def get_unity_connection_settings() -> dict:
     if timeout:
         settings['timeout'] = int(timeout)
     
+    pool_size = os.environ.get('UNITY_POOL_SIZE')
+    if pool_size:
+        settings['pool_size'] = max(1, int(pool_size))
+    
+    framed = os.environ.get('UNITY_FRAMED')
+    if framed:
+        settings['framed'] = framed.lower() not in ('0', 'false', 'no')
+    
     return settings
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Event loop utilities for the asyncio based agent and server loops
+"""
+import asyncio
+
+
+def use_uvloop() -> bool:
+    """
+    Make asyncio create libuv-backed uvloop event loops when uvloop is installed.
+    Returns False and keeps the default loop when it is not (e.g. on Windows).
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    
+    if not isinstance(asyncio.get_event_loop_policy(), uvloop.EventLoopPolicy):
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+class Ticker:
+    """
+    Fixed-rate clock shared by many coroutines. One timer drives the whole group:
+    every waiter is released on the same tick instead of scheduling its own sleep.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.running = False
+        self._tick = asyncio.Event()
+    
+    async def run(self):
+        """Fire a tick every interval until stopped"""
+        self.running = True
+        self._tick.clear()
+        while self.running:
+            await asyncio.sleep(self.interval)
+            if not self.running:
+                # stop() already released the waiters; clearing would strand later ones
+                break
+            # Waiters are released by set(); clearing right away arms the next tick
+            self._tick.set()
+            self._tick.clear()
+    
+    async def wait(self):
+        """Wait for the next tick"""
+        await self._tick.wait()
+    
+    def stop(self):
+        """Stop ticking and release anyone still waiting"""
+        self.running = False
+        self._tick.set()
@@ -1,9 +1,61 @@
 """
 Game State - Represents the current state of the game as perceived by an AI agent
 """
+from collections import deque
+from collections.abc import Mapping
+from itertools import islice
 from typing import Dict, Any, Tuple
 
 
+# Fields captured in logs, in to_dict() order
+SNAPSHOT_FIELDS = ('position', 'health', 'in_combat', 'current_objective', 'level_progress',
+                   'time_in_level', 'is_dead', 'current_area', 'puzzle_active')
+
+
+class StateSnapshot(Mapping):
+    """
+    Read-only capture of a GameState's logged fields, stored as one tuple.
+    The dict form is only built if the snapshot is actually read.
+    """
+    __slots__ = ('_values', '_dict')
+    
+    def __init__(self, values: tuple):
+        self._values = values
+        self._dict = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialize the snapshot as a new plain dict"""
+        return dict(zip(SNAPSHOT_FIELDS, self._values))
+    
+    def as_tuple(self) -> tuple:
+        """The captured values in SNAPSHOT_FIELDS order"""
+        return self._values
+    
+    def _as_dict(self) -> Dict[str, Any]:
+        if self._dict is None:
+            self._dict = self.to_dict()
+        return self._dict
+    
+    def __getitem__(self, key):
+        return self._as_dict()[key]
+    
+    def __iter__(self):
+        return iter(SNAPSHOT_FIELDS)
+    
+    def __len__(self):
+        return len(SNAPSHOT_FIELDS)
+    
+    def __repr__(self):
+        return f"StateSnapshot({self._as_dict()!r})"
+    
+    def __getstate__(self):
+        return self._values
+    
+    def __setstate__(self, values):
+        self._values = values
+        self._dict = None
+
+
 class GameState:
     """
     Represents the game state as observed by an AI agent
@@ -21,8 +73,9 @@ class GameState:
         self.current_area = "unknown"
         self.puzzle_active = False
         self.stuck_counter = 0
-        self.previous_positions = []
         self.max_stuck_positions = 10  # Number of positions to track for stuck detection
+        # Bounded history: appending past the limit evicts the oldest position in O(1)
+        self.previous_positions = deque(maxlen=self.max_stuck_positions)
         
     def update_from_game(self):
         """
@@ -35,8 +88,6 @@ class GameState:
         
         # Add current position to tracking list
         self.previous_positions.append(self.position)
-        if len(self.previous_positions) > self.max_stuck_positions:
-            self.previous_positions.pop(0)
     
     def update_from_unity(self, unity_state: dict):
         """
@@ -56,8 +107,6 @@ class GameState:
         
         # Add current position to tracking list
         self.previous_positions.append(self.position)
-        if len(self.previous_positions) > self.max_stuck_positions:
-            self.previous_positions.pop(0)
         
     def get_position(self) -> Tuple[float, float, float]:
         """Get the current position of the agent"""
@@ -71,13 +120,13 @@ class GameState:
             return False
         
         # Check if most recent positions are similar (indicating no movement)
-        recent_positions = self.previous_positions[-5:]  # Check last 5 positions
-        if not recent_positions:
+        positions = self.previous_positions
+        if not positions:
             return False
             
-        # Calculate distance between first and last of recent positions
-        first_pos = recent_positions[0]
-        last_pos = recent_positions[-1]
+        # Calculate distance between first and last of the last 5 positions
+        first_pos = positions[-min(5, len(positions))]
+        last_pos = positions[-1]
         
         # Calculate squared distance to avoid expensive sqrt operation
         dist_squared = (first_pos[0] - last_pos[0])**2 + (first_pos[1] - last_pos[1])**2 + (first_pos[2] - last_pos[2])**2
@@ -107,7 +156,8 @@ class GameState:
             return False
             
         # Check if the agent is oscillating between positions
-        recent_positions = self.previous_positions[-10:]
+        positions = self.previous_positions
+        recent_positions = islice(positions, max(0, len(positions) - 10), None)
         unique_positions = len(set(recent_positions))
         
         # If too few unique positions in recent history, might be a loop
@@ -207,16 +257,26 @@ class GameState:
         else:
             return "idle"
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the game state to a dictionary for logging"""
-        return {
-            'position': self.position,
-            'health': self.health,
-            'in_combat': self.in_combat,
-            'current_objective': self.current_objective,
-            'level_progress': self.level_progress,
-            'time_in_level': self.time_in_level,
-            'is_dead': self.is_dead,
-            'current_area': self.current_area,
-            'puzzle_active': self.puzzle_active
-        }
\ No newline at end of file
+    def snapshot(self) -> StateSnapshot:
+        """Cheap per-tick capture for the action log; see StateSnapshot"""
+        return StateSnapshot((self.position, self.health, self.in_combat, self.current_objective,
+                              self.level_progress, self.time_in_level, self.is_dead,
+                              self.current_area, self.puzzle_active))
+    
+    def to_dict(self, into: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Convert the game state to a dictionary for logging.
+        Passing an existing dict refills it in place instead of allocating a new one.
+        """
+        if into is None:
+            into = {}
+        into['position'] = self.position
+        into['health'] = self.health
+        into['in_combat'] = self.in_combat
+        into['current_objective'] = self.current_objective
+        into['level_progress'] = self.level_progress
+        into['time_in_level'] = self.time_in_level
+        into['is_dead'] = self.is_dead
+        into['current_area'] = self.current_area
+        into['puzzle_active'] = self.puzzle_active
+        return into
\ No newline at end of file
@@ -13,6 +13,8 @@ public class PythonConnector : MonoBehaviour
     [Header("Connection Settings")]
     public string ipAddress = "127.0.0.1";
     public int port = 8080;
+    // Length-prefix every message like the Python side; turn off only when Python runs with UNITY_FRAMED=0
+    public bool useFraming = true;
     
     [Header("Game State Settings")]
     public bool sendPosition = true;
@@ -28,6 +30,12 @@ public class PythonConnector : MonoBehaviour
     private Queue<string> messageQueue = new Queue<string>();
     private object lockObject = new object();
     
+    // Frame header shared with the Python protocol module: 4 bytes little-endian,
+    // payload length in the low 3 bytes and codec id in the high byte
+    private const int HeaderSize = 4;
+    private const int MaxFrameSize = (1 << 24) - 1;
+    private const int CodecJson = 0;
+    
     // Game state data that will be sent to Python
     private Dictionary<string, object> gameStateData;
     
@@ -88,21 +96,28 @@ public class PythonConnector : MonoBehaviour
     
     private void ReceiveMessages()
     {
+        byte[] buffer = new byte[4096];
+        // Received bytes not yet parsed into complete frames; TCP may split or coalesce them
+        List<byte> pending = new List<byte>();
+        
         while (isConnected && client != null && client.Connected)
         {
             try
             {
                 if (stream.DataAvailable)
                 {
-                    byte[] buffer = new byte[4096];
                     int bytesRead = stream.Read(buffer, 0, buffer.Length);
                     
                     if (bytesRead > 0)
                     {
-                        string message = Encoding.UTF8.GetString(buffer, 0, bytesRead);
-                        lock (lockObject)
+                        if (useFraming)
+                        {
+                            pending.AddRange(new ArraySegment<byte>(buffer, 0, bytesRead));
+                            ExtractFrames(pending);
+                        }
+                        else
                         {
-                            messageQueue.Enqueue(message);
+                            EnqueueMessage(Encoding.UTF8.GetString(buffer, 0, bytesRead));
                         }
                     }
                 }
@@ -117,6 +132,43 @@ public class PythonConnector : MonoBehaviour
         }
     }
     
+    // Queue every complete frame in pending and drop the consumed bytes;
+    // a partial trailing frame stays buffered until the rest arrives
+    private void ExtractFrames(List<byte> pending)
+    {
+        int offset = 0;
+        while (pending.Count - offset >= HeaderSize)
+        {
+            int header = pending[offset] | pending[offset + 1] << 8 | pending[offset + 2] << 16 | pending[offset + 3] << 24;
+            int length = header & MaxFrameSize;
+            int codec = (header >> 24) & 0xFF;
+            if (pending.Count - offset - HeaderSize < length)
+            {
+                break;
+            }
+            
+            if (codec == CodecJson)
+            {
+                byte[] payload = pending.GetRange(offset + HeaderSize, length).ToArray();
+                EnqueueMessage(Encoding.UTF8.GetString(payload));
+            }
+            else
+            {
+                Debug.LogWarning("Skipping frame with unsupported codec id " + codec);
+            }
+            offset += HeaderSize + length;
+        }
+        pending.RemoveRange(0, offset);
+    }
+    
+    private void EnqueueMessage(string message)
+    {
+        lock (lockObject)
+        {
+            messageQueue.Enqueue(message);
+        }
+    }
+    
     public void SendToPython(string message)
     {
         if (!isConnected || stream == null)
@@ -127,7 +179,25 @@ public class PythonConnector : MonoBehaviour
         
         try
         {
-            byte[] data = Encoding.UTF8.GetBytes(message);
+            byte[] payload = Encoding.UTF8.GetBytes(message);
+            byte[] data = payload;
+            if (useFraming)
+            {
+                if (payload.Length > MaxFrameSize)
+                {
+                    Debug.LogError("Message of " + payload.Length + " bytes is too large to send to Python");
+                    return;
+                }
+                
+                // Header and payload go out in one write so frames never interleave
+                data = new byte[HeaderSize + payload.Length];
+                int header = payload.Length | CodecJson << 24;
+                data[0] = (byte)header;
+                data[1] = (byte)(header >> 8);
+                data[2] = (byte)(header >> 16);
+                data[3] = (byte)(header >> 24);
+                Buffer.BlockCopy(payload, 0, data, HeaderSize, payload.Length);
+            }
             stream.Write(data, 0, data.Length);
             stream.Flush();
         }
@@ -1,4 +1,6 @@
 using System;
+using System.Collections.Generic;
+using System.IO;
 using System.Net;
 using System.Net.WebSockets;
 using System.Text;
@@ -6,11 +8,14 @@ using System.Threading;
 using System.Threading.Tasks;
 using UnityEngine;
 using Newtonsoft.Json;
+using Newtonsoft.Json.Linq;
 
 public class WebSocketServer : MonoBehaviour
 {
     private HttpListener httpListener;
     private CancellationTokenSource cancellationToken;
+    // Player each agent id drives, bound on the agent's first request
+    private readonly Dictionary<string, PlayerController> agentPlayers = new Dictionary<string, PlayerController>();
     
     [SerializeField] private int port = 8080;
     
@@ -45,36 +50,46 @@ public class WebSocketServer : MonoBehaviour
         var webSocket = wsContext.WebSocket;
         
         var buffer = new byte[1024 * 4];
+        var message = new MemoryStream();
         
         while (webSocket.State == WebSocketState.Open)
         {
             try
             {
-                // Send game state
-                var gameState = GetGameState();
-                var stateJson = JsonConvert.SerializeObject(gameState);
-                var stateBytes = Encoding.UTF8.GetBytes(stateJson);
-                
-                await webSocket.SendAsync(
-                    new ArraySegment<byte>(stateBytes),
-                    WebSocketMessageType.Text,
-                    true,
-                    cancellationToken.Token
-                );
-                
-                // Receive actions
+                // Read one whole request, which may span several receives
                 var result = await webSocket.ReceiveAsync(
                     new ArraySegment<byte>(buffer),
                     cancellationToken.Token
                 );
                 
-                if (result.MessageType == WebSocketMessageType.Text)
+                if (result.MessageType == WebSocketMessageType.Close)
                 {
-                    var actionJson = Encoding.UTF8.GetString(buffer, 0, result.Count);
-                    ProcessAction(actionJson);
+                    break;
                 }
                 
-                await Task.Delay(100); // 10 FPS
+                message.Write(buffer, 0, result.Count);
+                if (!result.EndOfMessage)
+                {
+                    continue;
+                }
+                
+                var messageJson = Encoding.UTF8.GetString(message.GetBuffer(), 0, (int)message.Length);
+                message.SetLength(0);
+                
+                if (result.MessageType == WebSocketMessageType.Text)
+                {
+                    var reply = ProcessMessage(messageJson);
+                    if (reply != null)
+                    {
+                        var replyBytes = Encoding.UTF8.GetBytes(JsonConvert.SerializeObject(reply));
+                        await webSocket.SendAsync(
+                            new ArraySegment<byte>(replyBytes),
+                            WebSocketMessageType.Text,
+                            true,
+                            cancellationToken.Token
+                        );
+                    }
+                }
             }
             catch (Exception e)
             {
@@ -84,11 +99,51 @@ public class WebSocketServer : MonoBehaviour
         }
     }
     
-    object GetGameState()
+    object ProcessMessage(string messageJson)
+    {
+        var message = JObject.Parse(messageJson);
+        var data = message["data"] as JObject;
+        
+        switch ((string)message["type"])
+        {
+            case "get_states":
+                var states = new List<object>();
+                foreach (var agentId in data?["agent_ids"] ?? new JArray())
+                {
+                    states.Add(GetGameState(agentId.ToString()));
+                }
+                return new
+                {
+                    id = (string)message["id"],
+                    type = "states_response",
+                    data = new { states }
+                };
+            case "action":
+                ProcessAction(data);
+                return null;
+            default:
+                Debug.LogWarning($"Unknown message type: {message["type"]}");
+                return null;
+        }
+    }
+    
+    PlayerController PlayerFor(string agentId)
+    {
+        if (!agentPlayers.TryGetValue(agentId, out var player) || player == null)
+        {
+            var players = FindObjectsOfType<PlayerController>();
+            player = players[agentPlayers.Count % players.Length];
+            agentPlayers[agentId] = player;
+        }
+        return player;
+    }
+    
+    object GetGameState(string agentId)
     {
-        var player = FindObjectOfType<PlayerController>();
+        var player = PlayerFor(agentId);
         return new
         {
+            agent_id = agentId,
             player_position = new float[] { 
                 player.transform.position.x,
                 player.transform.position.y,
@@ -99,10 +154,10 @@ public class WebSocketServer : MonoBehaviour
         };
     }
     
-    void ProcessAction(string actionJson)
+    void ProcessAction(JObject action)
     {
         // Process received action
-        Debug.Log($"Received action: {actionJson}");
+        Debug.Log($"Received action: {action}");
     }
     
     void OnDestroy()